@@ -0,0 +1,331 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from dataset_io import FORMATS, read_table
+from schema import TABLES, data_file
+
+# -------------------------------------------------------
+# In-process analytics engine for the queries/ catalog
+#   - Each catalog query has a vectorized pandas/NumPy twin that returns the
+#     same columns and ordering, straight from the generated data
+#   - Tables come from DataFrames (e.g. a what-if run of the generator) or
+#     from the dataset files; only the columns a query needs are read, and
+#     Parquet/Arrow files are memory-mapped
+#   - --verify loads the same data into an in-memory SQLite and checks every
+#     engine result against the SQL catalog run through query_runner; results
+#     of ORDER BY queries must also come back in the same order (the catalog
+#     and the twins break ties on a key column); tests/test_analytics.py runs
+#     the same check per query on a seeded dataset
+#
+# Results follow the SQLite stand-in: AVG is a float average and weekdays are
+# numbered like SQL Server's default DATEPART(WEEKDAY) (Sunday = 1).
+# -------------------------------------------------------
+
+
+class AnalyticsEngine:
+    def __init__(self, frames=None, fmt="csv", directory="."):
+        self.fmt = fmt
+        self.directory = directory
+        self._frames = dict(frames or {})
+        self._given = set(self._frames)
+        self._dates = {}
+
+    def table(self, name, columns):
+        # Read missing columns from the dataset file on first use
+        df = self._frames.get(name)
+        missing = [c for c in columns if df is None or c not in df.columns]
+        if missing:
+            path = os.path.join(self.directory, data_file(name, self.fmt))
+            loaded = _coerce(read_table(path, columns=missing, fmt=self.fmt))
+            df = loaded if df is None else pd.concat([df, loaded], axis=1)
+            self._frames[name] = df
+        return df[columns]
+
+    def dates(self, name, column="date"):
+        # Parsed once per table and shared by every query
+        key = (name, column)
+        if key not in self._dates:
+            self._dates[key] = pd.to_datetime(self.table(name, [column])[column]).to_numpy("datetime64[D]")
+        return self._dates[key]
+
+    def full_table(self, name):
+        # Every column, for loading the same data somewhere else
+        if name in self._given:
+            return self._frames[name]
+        return read_table(os.path.join(self.directory, data_file(name, self.fmt)), fmt=self.fmt)
+
+    def run(self, query):
+        return QUERIES[query](self)
+
+
+def _coerce(df):
+    # The legacy generator writes price as text; numbers are compared the
+    # way the loader stores them (see bulk_loader.prepare_table)
+    if "price" in df.columns:
+        df["price"] = pd.to_numeric(df["price"], errors="coerce").fillna(0).round(2)
+    if "member_id" in df.columns and df["member_id"].dtype == object:
+        df["member_id"] = pd.to_numeric(df["member_id"], errors="coerce").astype("Int64")
+    return df
+
+
+def _sorted(df, by, ascending, limit=None):
+    df = df.sort_values(by, ascending=ascending, kind="stable").reset_index(drop=True)
+    return df.head(limit) if limit else df
+
+
+def _month_labels(days):
+    return pd.Series(days.astype("datetime64[M]").astype(str), dtype=object)
+
+
+def _months_back(months):
+    # First day of the month `months` before this one, like the catalog's
+    # DATEADD(MONTH, -n, DATETRUNC(MONTH, GETDATE())); UTC, as SQLite's 'now'
+    return (np.datetime64("today", "M") - months).astype("datetime64[D]")
+
+
+def active_vs_inactive_members(engine):
+    members = engine.table("Members", ["is_active"])
+    out = members.groupby("is_active").size().reset_index(name="total_members")
+    out["is_active"] = out["is_active"].astype(int)
+    return out
+
+
+def average_days_between_visits(engine):
+    visits = engine.table("Visits", ["member_id"])
+    days = engine.dates("Visits").astype(np.int64)
+    member_ids = visits["member_id"].to_numpy()
+    # One sort by (member, date), then gaps between neighbours of the same member
+    order = np.lexsort((days, member_ids))
+    member_ids, days = member_ids[order], days[order]
+    same_member = member_ids[1:] == member_ids[:-1]
+    gaps = pd.DataFrame({"member_id": member_ids[1:][same_member], "gap": np.diff(days)[same_member]})
+    avg = gaps.groupby("member_id")["gap"].mean()
+    out = pd.DataFrame({"member_id": np.unique(member_ids)})
+    out["avg_days_between_visits"] = out["member_id"].map(avg)
+    return _sorted(out, ["avg_days_between_visits", "member_id"], [True, True])
+
+
+def avg_visit_duration(engine):
+    visits = engine.table("Visits", ["member_id", "duration"])
+    out = visits.groupby("member_id")["duration"].mean().reset_index(name="avg_duration")
+    return _sorted(out, ["avg_duration", "member_id"], [False, True], limit=10)
+
+
+def buyers_who_never_visited(engine):
+    sales = engine.table("Sales", ["customer_id"])
+    visitors = engine.table("Visits", ["member_id"])["member_id"].unique()
+    buyers = sales["customer_id"].unique()
+    return pd.DataFrame({"customer_id": np.setdiff1d(buyers, visitors)})
+
+
+def day_pass_vs_member_usage(engine):
+    return pd.DataFrame({
+        "total_member_visits": [len(engine.table("Visits", ["visit_id"]))],
+        "total_day_pass_visits": [len(engine.table("Day_Passes", ["day_pass_id"]))],
+    })
+
+
+AGE_BINS = [4, 17, 25, 35, 45, np.inf]
+AGE_LABELS = ["Under 18", "18-25", "26-35", "36-45", "46+"]
+
+
+def members_by_age_group(engine):
+    ages = engine.table("Members", ["age"])["age"]
+    groups = pd.cut(ages, bins=AGE_BINS, labels=AGE_LABELS)
+    out = groups.value_counts(sort=False).reset_index()
+    out.columns = ["age_group", "total_members"]
+    out["age_group"] = out["age_group"].astype(object)
+    out = out[out["total_members"] > 0]
+    return _sorted(out, ["total_members", "age_group"], [False, True])
+
+
+def _weekdays(days):
+    # 1970-01-01 was a Thursday, which is 5 when Sunday = 1
+    return (days.astype(np.int64) + 4) % 7 + 1
+
+
+def day_pass_guests_by_weekday(engine):
+    passes = engine.table("Day_Passes", ["day_pass_id", "pass_type"])
+    guests = engine.table("Day_Pass_Guests", ["day_pass_id"])["day_pass_id"].value_counts()
+    df = pd.DataFrame({
+        "pass_type": passes["pass_type"].astype(str).to_numpy(),
+        "weekday": _weekdays(engine.dates("Day_Passes")),
+        "guests": passes["day_pass_id"].map(guests).to_numpy(),
+    }).dropna(subset=["guests"])  # inner join: passes with guests
+    out = df.groupby(["pass_type", "weekday"])["guests"].agg(["size", "sum"]).reset_index()
+    out.columns = ["pass_type", "weekday", "passes", "guests"]
+    out["guests"] = out["guests"].astype(int)
+    out["avg_group_size"] = out["guests"] / out["passes"]
+    return _sorted(out, ["pass_type", "weekday"], [True, True])
+
+
+def day_pass_guest_age_groups(engine):
+    guests = engine.table("Day_Pass_Guests", ["day_pass_id", "age"])
+    pass_types = engine.table("Day_Passes", ["day_pass_id", "pass_type"]).set_index("day_pass_id")["pass_type"]
+    df = pd.DataFrame({
+        "pass_type": guests["day_pass_id"].map(pass_types.astype(str)).to_numpy(),
+        "age_group": pd.cut(guests["age"], bins=AGE_BINS, labels=AGE_LABELS).astype(object).to_numpy(),
+    }).dropna()
+    out = df.groupby(["pass_type", "age_group"]).size().reset_index(name="guests")
+    return _sorted(out, ["pass_type", "guests", "age_group"], [True, False, True])
+
+
+def revenue_by_month(engine):
+    price = engine.table("Sales", ["price"])["price"].to_numpy()
+    month = _month_labels(engine.dates("Sales"))
+    out = pd.Series(price).groupby(month).sum().reset_index()
+    out.columns = ["sales_month", "total_revenue"]
+    return _sorted(out, ["sales_month"], [False])
+
+
+def recent_sales_by_item(engine):
+    days = engine.dates("Sales")
+    recent = (days >= _months_back(1)) & (days < _months_back(-1))
+    sales = engine.table("Sales", ["item", "price"])[recent]
+    out = sales.groupby(sales["item"].astype(str))["price"].agg(["size", "sum"]).reset_index()
+    out.columns = ["item", "times_sold", "revenue"]
+    return _sorted(out, ["revenue", "item"], [False, True])
+
+
+def sales_by_item(engine):
+    items = engine.table("Sales", ["item"])["item"].astype(str)
+    out = items.value_counts().reset_index()
+    out.columns = ["item", "times_sold"]
+    return _sorted(out, ["times_sold", "item"], [False, True])
+
+
+def spending_vs_visits(engine):
+    # Visits and sales are counted per member separately, then joined
+    # through the member's customer_id
+    members = engine.table("Members", ["member_id", "customer_id"])
+    visits = engine.table("Visits", ["member_id"]).groupby("member_id").size().rename("total_visits")
+    spent = engine.table("Sales", ["customer_id", "price"]).groupby("customer_id")["price"].sum().rename("total_spent")
+    out = members.join(visits, on="member_id", how="inner").join(spent, on="customer_id", how="inner")
+    return _sorted(out[["member_id", "total_visits", "total_spent"]], ["total_spent", "member_id"], [False, True])
+
+
+def top_buyers(engine):
+    sales = engine.table("Sales", ["customer_id", "price"])
+    out = sales.groupby("customer_id")["price"].agg(["size", "sum"]).reset_index()
+    out.columns = ["customer_id", "total_purchases", "total_spent"]
+    return _sorted(out, ["total_spent", "customer_id"], [False, True], limit=10)
+
+
+def visits_per_month(engine):
+    visits = engine.table("Visits", ["member_id"])
+    keys = pd.DataFrame({"visit_month": _month_labels(engine.dates("Visits")), "member_id": visits["member_id"].to_numpy()})
+    out = keys.groupby(["visit_month", "member_id"]).size().reset_index(name="total_visits")
+    return _sorted(out, ["visit_month", "total_visits", "member_id"], [False, False, True])
+
+
+def weekday_popularity(engine):
+    out = pd.Series(_weekdays(engine.dates("Visits"))).value_counts().reset_index()
+    out.columns = ["weekday", "visit_count"]
+    return _sorted(out, ["visit_count", "weekday"], [False, True])
+
+
+QUERIES = {
+    "active_vs_inactive_members": active_vs_inactive_members,
+    "average_days_between_visits": average_days_between_visits,
+    "avg_visit_duration": avg_visit_duration,
+    "buyers_who_never_visited": buyers_who_never_visited,
+    "day_pass_vs_member_usage": day_pass_vs_member_usage,
+    "day_pass_guests_by_weekday": day_pass_guests_by_weekday,
+    "day_pass_guest_age_groups": day_pass_guest_age_groups,
+    "members_by_age_group": members_by_age_group,
+    "recent_sales_by_item": recent_sales_by_item,
+    "revenue_by_month": revenue_by_month,
+    "sales_by_item": sales_by_item,
+    "spending_vs_visits": spending_vs_visits,
+    "top_buyers": top_buyers,
+    "visits_per_month": visits_per_month,
+    "weekday_popularity": weekday_popularity,
+}
+
+
+# ---------- equivalence check against SQL ----------
+
+def frames_match(expected, actual, ordered=False, rtol=1e-6):
+    # Same rows; unless ordered, regardless of order (compared after
+    # sorting by every column)
+    if list(expected.columns) != list(actual.columns) or len(expected) != len(actual):
+        return False
+    if expected.empty:
+        return True
+    columns = list(expected.columns)
+    if not ordered:
+        expected = expected.sort_values(columns, na_position="first")
+        actual = actual.sort_values(columns, na_position="first")
+    expected, actual = expected.reset_index(drop=True), actual.reset_index(drop=True)
+    for column in columns:
+        left, right = expected[column], actual[column]
+        if pd.api.types.is_numeric_dtype(left) and pd.api.types.is_numeric_dtype(right):
+            if not np.allclose(left.astype(float), right.astype(float), rtol=rtol, equal_nan=True):
+                return False
+        elif not (left.astype(str).to_numpy() == right.astype(str).to_numpy()).all():
+            return False
+    return True
+
+
+def is_ordered(sql):
+    # Queries with an ORDER BY (every one breaks ties on a key column) are
+    # compared row by row, so LIMIT picks the same rows in both engines
+    return "ORDER BY" in sql.upper()
+
+
+def sqlite_results(engine, queries=None):
+    # Load the engine's tables into an in-memory SQLite and run the catalog:
+    # {name: (sql, frame)}
+    from bulk_loader import insert_dataframe, prepare_table
+    from db import ConnectionPool
+    from query_runner import QueryRunner
+    from member_features import build_member_features
+    from rollups import rebuild_rollups
+    from schema import create_tables
+
+    with ConnectionPool("sqlite", ":memory:", size=1) as pool:
+        with pool.connection() as conn:
+            create_tables(conn)
+            for table in TABLES:
+                insert_dataframe(conn, table, prepare_table(table, engine.full_table(table).copy()))
+            rebuild_rollups(conn)
+            build_member_features(conn)
+        runner = QueryRunner(pool)
+        return {name: (runner.catalog[name], runner.run(name, use_cache=False).frame) for name in queries or QUERIES}
+
+
+def verify_against_sqlite(engine, queries=None):
+    return {name: frames_match(expected, engine.run(name), ordered=is_ordered(sql))
+            for name, (sql, expected) in sqlite_results(engine, queries).items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute catalog queries in-process from the generated data.")
+    parser.add_argument("queries", nargs="*", help="catalog names (default: all supported)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--directory", default=".", help="where the generated data files are")
+    parser.add_argument("--show", type=int, default=5, help="rows of each result to print")
+    parser.add_argument("--verify", action="store_true", help="check results against the SQL catalog on SQLite")
+    args = parser.parse_args()
+
+    engine = AnalyticsEngine(fmt=args.format, directory=args.directory)
+    queries = args.queries or list(QUERIES)
+    if args.verify:
+        results = verify_against_sqlite(engine, queries)
+        for name, ok in results.items():
+            print(f"{'✅' if ok else '❌'} {name}")
+        raise SystemExit(0 if all(results.values()) else 1)
+
+    for name in queries:
+        started = time.perf_counter()
+        result = engine.run(name)
+        print(f"{name}: {len(result)} rows in {(time.perf_counter() - started) * 1000:.1f} ms")
+        if args.show:
+            print(result.head(args.show).to_string(index=False))
+            print()
+
+
+if __name__ == "__main__":
+    main()
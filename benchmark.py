@@ -0,0 +1,100 @@
+import argparse
+import json
+import math
+import statistics
+import time
+from bulk_loader import DEFAULT_BATCH_SIZE, load_table_files
+from dataset_io import FORMATS
+from db import BACKENDS, DEFAULT_BACKEND, ConnectionPool
+from member_features import build_member_features
+from query_runner import QueryRunner
+from rollups import rebuild_rollups
+from schema import SCHEMA_PROFILES, create_indexes, create_tables, drop_tables
+
+# -------------------------------------------------------
+# Per-query latency of the queries/ catalog under each schema profile
+#   - For every profile the tables are recreated and bulk loaded from the
+#     generated files, then the profile's indexes are built (timed apart)
+#   - Each query gets one warm-up run, then --repeat timed runs without the
+#     result cache; the report shows the median per profile
+#   - Reloads the target database: point it at a scratch database
+# -------------------------------------------------------
+
+
+def build_profile(conn, profile, fmt="csv", batch_size=DEFAULT_BATCH_SIZE):
+    drop_tables(conn)
+    create_tables(conn, profile=profile)
+    started = time.perf_counter()
+    load_table_files(conn, batch_size=batch_size, fmt=fmt)
+    load_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    create_indexes(conn, profile)
+    index_seconds = time.perf_counter() - started
+    rebuild_rollups(conn, batch_size)
+    build_member_features(conn)
+    return {"load_seconds": load_seconds, "index_seconds": index_seconds}
+
+
+def percentile(samples, pct):
+    # Nearest-rank percentile
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def time_queries(runner, queries, repeat=5):
+    timings = {}
+    for name in queries:
+        runner.run(name, use_cache=False)
+        samples = [runner.run(name, use_cache=False).seconds * 1000 for _ in range(repeat)]
+        timings[name] = {"median_ms": statistics.median(samples), "min_ms": min(samples),
+                         "p95_ms": percentile(samples, 95)}
+    return timings
+
+
+def benchmark_profiles(backend, database, profiles=SCHEMA_PROFILES, queries=None, repeat=5,
+                       fmt="csv", batch_size=DEFAULT_BATCH_SIZE):
+    results = {}
+    with ConnectionPool(backend, database, size=1) as pool:
+        runner = QueryRunner(pool)
+        queries = queries or list(runner.catalog)
+        for profile in profiles:
+            print(f"--- {profile} ---")
+            with pool.connection() as conn:
+                results[profile] = build_profile(conn, profile, fmt, batch_size)
+            results[profile]["queries"] = time_queries(runner, queries, repeat)
+    return results
+
+
+def print_report(results):
+    profiles = list(results)
+    queries = list(results[profiles[0]]["queries"])
+    width = max(len(name) for name in queries + ["index build (s)"])
+    print(f"{'query':<{width}}" + "".join(f"{profile:>14}" for profile in profiles))
+    for name in queries:
+        print(f"{name:<{width}}" + "".join(f"{results[p]['queries'][name]['median_ms']:>11.1f} ms" for p in profiles))
+    print(f"{'index build (s)':<{width}}" + "".join(f"{results[p]['index_seconds']:>14.2f}" for p in profiles))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the query catalog under each schema profile.")
+    parser.add_argument("queries", nargs="*", help="catalog names (default: the whole catalog)")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--database", default=None, help="scratch database; its tables are dropped and reloaded")
+    parser.add_argument("--profiles", nargs="+", choices=SCHEMA_PROFILES, default=list(SCHEMA_PROFILES))
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per query")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--output", default=None, help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = benchmark_profiles(args.backend, args.database, args.profiles, args.queries or None,
+                                 args.repeat, args.format, args.batch_size)
+    print()
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
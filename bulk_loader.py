@@ -0,0 +1,101 @@
+import os
+import time
+from datetime import time as time_of_day
+import pandas as pd
+from db import backend_name
+from dataset_io import read_table
+from schema import TABLES, data_file
+from table_versions import bump_table_versions
+
+# -------------------------------------------------------
+# Batched bulk insert
+#   - One executemany per batch instead of one execute per row
+#   - SQL Server: pyodbc fast_executemany sends each batch as a parameter array
+#   - DuckDB: each batch is inserted straight from the DataFrame
+#   - Commit after every batch, report rows/sec per table
+#   - Optional load_telemetry.LoadTelemetry gets per-stage / per-batch timings
+# -------------------------------------------------------
+
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def dataframe_rows(df, backend="sqlserver"):
+    # Plain Python values with None for missing: what every DB-API driver accepts
+    if backend == "sqlite":
+        # sqlite3 can't bind timestamps/times read from Parquet/Arrow files
+        df = df.copy()
+        for column in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[column]):
+                df[column] = df[column].dt.strftime("%Y-%m-%d")
+            elif df[column].dtype == object and isinstance(df[column].dropna().head(1).squeeze(), time_of_day):
+                df[column] = df[column].map(lambda v: None if v is None else v.strftime("%H:%M"))
+    return df.astype(object).where(df.notna(), None).values.tolist()
+
+
+def prepare_table(table, df):
+    # Only Sales needs extra handling for optional member_id & numeric price
+    if table == "Sales":
+        # Blank/invalid 'member_id' becomes <NA>, which is sent as SQL NULL
+        df["member_id"] = pd.to_numeric(df["member_id"], errors="coerce").astype("Int64")
+        # Convert 'price' to numeric, fill invalid with 0
+        df["price"] = pd.to_numeric(df["price"], errors="coerce").fillna(0).round(2)
+    return df
+
+
+def insert_dataframe(conn, table, df, batch_size=DEFAULT_BATCH_SIZE, telemetry=None, suffix=""):
+    # suffix inserts into a staging copy of table; telemetry still says table
+    backend = backend_name(conn)
+    columns = ", ".join(df.columns)
+    cursor = conn.cursor()
+    if backend == "sqlserver":
+        cursor.fast_executemany = True
+    sql = f"INSERT INTO {table}{suffix} ({columns}) VALUES ({', '.join('?' for _ in df.columns)})"
+
+    for start in range(0, len(df), batch_size):
+        batch = df.iloc[start:start + batch_size]
+        t0 = time.perf_counter()
+        if backend == "duckdb":
+            conn.register("bulk_batch", batch)
+            t1 = time.perf_counter()
+            conn.execute(f"INSERT INTO {table}{suffix} ({columns}) SELECT {columns} FROM bulk_batch")
+            conn.unregister("bulk_batch")
+        else:
+            rows = dataframe_rows(batch, backend)
+            t1 = time.perf_counter()
+            cursor.executemany(sql, rows)
+        t2 = time.perf_counter()
+        conn.commit()
+        if telemetry is not None:
+            telemetry.batch(table, len(batch), {"convert": t1 - t0, "send": t2 - t1,
+                                                "commit": time.perf_counter() - t2})
+    cursor.close()
+    return len(df)
+
+
+def load_table_files(conn, tables=TABLES, batch_size=DEFAULT_BATCH_SIZE, prepare=True, fmt="csv", directory=".",
+                     telemetry=None, frames=None, suffix=""):
+    # frames: {table: DataFrame} already read and prepared, instead of the
+    # files; suffix loads into staging tables (see swap_reload.py)
+    stats = {}
+    for table in tables:
+        if frames is not None:
+            df = frames[table]
+        else:
+            started = time.perf_counter()
+            df = read_table(os.path.join(directory, data_file(table, fmt)), fmt=fmt)
+            read_done = time.perf_counter()
+            if prepare:
+                df = prepare_table(table, df)
+            if telemetry is not None:
+                telemetry.stage(table, "read", read_done - started)
+                telemetry.stage(table, "prepare", time.perf_counter() - read_done)
+        if telemetry is not None:
+            telemetry.expect(table, len(df))
+        started = time.perf_counter()
+        rows = insert_dataframe(conn, table, df, batch_size, telemetry, suffix)
+        seconds = time.perf_counter() - started
+        stats[table] = {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds else None}
+        print(f"Loading {table}: {rows} rows in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/sec)")
+    if not suffix:
+        bump_table_versions(conn, tables)
+    return stats
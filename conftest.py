@@ -0,0 +1,2 @@
+# test_db.py is the connection-check script, not a test module
+collect_ignore = ["test_db.py"]
@@ -1,104 +1,132 @@
-# Corrected Data Simulation Script with Defined `visits`
-
-import pandas as pd
-import random
-from datetime import datetime, timedelta
-import numpy as np
-
-
-# Configurations
-num_members = 1000  # Total members
-num_customers = 10000  # Total unique customers (members + non-members)
-num_non_members = num_customers - num_members
-
-# Expanded Name Pools
-american_first_names = ["James", "Michael", "Emma", "Olivia", "William", "Sophia", "Ethan", "Ava", "Benjamin", "Charlotte", "Bill", "Marshall", "Audrey", "Julia"]
-chinese_first_names = ["Xiao", "Wei", "Jing", "Li", "Zhang", "Chen", "Hao", "Mei", "Yuan", "Wen", "Xia"]
-international_first_names = ["Mateo", "Isabella", "Liam", "Santiago", "Amara", "Johannes", "Fatima", "Omar", "Anya", "Ivan", "Lux"]
-last_names = ["Smith", "Johnson", "Lee", "Chen", "Garcia", "Schmidt", "Patel", "Nguyen", "Brown", "Takahashi", "Skleegore", "Banks", "Gates", "Aeterna"]
-
-# Function to generate unique names
-def generate_unique_names(num_people):
-    first_names = (
-        random.sample(american_first_names, len(american_first_names)) * (num_people // 3) +
-        random.sample(chinese_first_names, len(chinese_first_names)) * (num_people // 6) +
-        random.sample(international_first_names, len(international_first_names)) * (num_people // 6)
-    )
-    last_names_shuffled = random.sample(last_names, len(last_names)) * (num_people // len(last_names) + 1)
-
-    random.shuffle(first_names)
-    random.shuffle(last_names_shuffled)
-
-    return [f"{first_names[i]} {last_names_shuffled[i]}" for i in range(num_people)]
-
-# Generate Unique Customers
-customer_names = generate_unique_names(num_customers)
-customers = [{"customer_id": i, "name": customer_names[i - 1], "age": random.randint(5, 60)} for i in range(1, num_customers + 1)]
-df_customers = pd.DataFrame(customers)
-
-# Generate Members
-members = [{"member_id": i, "customer_id": i, "name": customers[i - 1]["name"], "age": customers[i - 1]["age"],
-            "join_date": (datetime.today() - timedelta(days=random.randint(30, 730))).strftime('%Y-%m-%d'),
-            "is_active": int(random.choices([1, 0], weights=[0.8, 0.2])[0])}
-           for i in range(1, num_members + 1)]
-df_members = pd.DataFrame(members)
-
-# Generate Visits
-visits = []
-visit_id = 1  # Ensuring unique sequential IDs
-for member in members:
-    visit_count = random.randint(20, 300)  # Random visits per member
-    for _ in range(visit_count):
-        visits.append({
-            "visit_id": visit_id,
-            "member_id": member["member_id"],
-            "date": (datetime.today() - timedelta(days=random.randint(1, 730))).strftime('%Y-%m-%d'),
-            "time": f"{random.randint(6, 22)}:00",
-            "duration": random.randint(30, 180)
-        })
-        visit_id += 1  # Increment visit ID
-df_visits = pd.DataFrame(visits)
-
-# Generate Day Pass Purchases
-day_passes = []
-day_pass_id = 1
-for _ in range(random.randint(5000, 15000)):
-    purchaser = random.choice(customers)
-    num_passes = random.randint(1, 6)
-    group_ages = [purchaser["age"]] + [random.randint(5, 60) for _ in range(num_passes - 1)]
-    day_passes.append({"day_pass_id": day_pass_id, "purchaser_id": purchaser["customer_id"],
-                       "date": (datetime.today() - timedelta(days=random.randint(1, 730))).strftime('%Y-%m-%d'),
-                       "pass_type": random.choice(["Single", "Family", "Student"]),
-                       "group_ages": ','.join(map(str, group_ages))})
-    day_pass_id += 1
-df_day_passes = pd.DataFrame(day_passes)
-
-# Generate Sales
-items = ['Chalk Bag', 'Shoes Rental', 'Protein Bar', 'Water Bottle', 'T-Shirt', 'Gatorade', 'Celsius']
-sales = [{"sale_id": sale_id, "customer_id": customer["customer_id"],
-          "member_id": next((m["member_id"] for m in members if m["customer_id"] == customer["customer_id"]), None),
-          "date": (datetime.today() - timedelta(days=random.randint(1, 730))).strftime('%Y-%m-%d'),
-          "item": random.choice(items), "price":"{:.2f}".format(random.uniform(5, 50))}
-         for sale_id, customer in enumerate(random.choices(customers, k=random.randint(3000, 7000)), start=1)]
-df_sales = pd.DataFrame(sales)
-df_sales["member_id"] = df_sales["member_id"].astype("Int64")
-
-
-df_sales.replace({np.inf: np.nan, -np.inf: np.nan}, inplace=True)
-df_sales = df_sales.fillna(0)
-# df_sales['price'] = df_sales['price'].fillna(0)  # only fill price
-# but do NOT fillna() on df_sales['member_id']
-
-
-# Save to CSV
-df_customers.to_csv('customers.csv', index=False)
-df_members.to_csv('members.csv', index=False)
-df_visits.to_csv('visits.csv', index=False)
-df_day_passes.to_csv('day_passes.csv', index=False)
-df_sales.to_csv("sales.csv", index=False)
-
-# # Display sample data for validation
-# import ace_tools as tools
-# tools.display_dataframe_to_user(name="Updated Visits Data Sample", dataframe=df_visits)
-
-print("✅ Data generation complete: Customers, Members, Visits, Sales, and Day Passes generated.")
+# Corrected Data Simulation Script with Defined `visits`
+
+import argparse
+import random
+from datetime import date
+import numpy as np
+from dataset_io import (CATEGORIES, EXTENSIONS, FORMATS, batch_rows, column_buffer, epoch_day, side_chunks,
+                        write_chunks, peak_rss_mb)
+
+
+# Configurations
+num_members = 1000  # Total members
+num_customers = 10000  # Total unique customers (members + non-members)
+num_non_members = num_customers - num_members
+
+# Dates are kept as days since 1970-01-01 and only formatted when written
+today = epoch_day(date.today())
+
+# Expanded Name Pools
+american_first_names = ["James", "Michael", "Emma", "Olivia", "William", "Sophia", "Ethan", "Ava", "Benjamin", "Charlotte", "Bill", "Marshall", "Audrey", "Julia"]
+chinese_first_names = ["Xiao", "Wei", "Jing", "Li", "Zhang", "Chen", "Hao", "Mei", "Yuan", "Wen", "Xia"]
+international_first_names = ["Mateo", "Isabella", "Liam", "Santiago", "Amara", "Johannes", "Fatima", "Omar", "Anya", "Ivan", "Lux"]
+last_names = ["Smith", "Johnson", "Lee", "Chen", "Garcia", "Schmidt", "Patel", "Nguyen", "Brown", "Takahashi", "Skleegore", "Banks", "Gates", "Aeterna"]
+
+# Names are drawn per person with the same 2:1:1 pool mix as before, so a
+# name doesn't depend on how many customers are generated at once
+first_name_pool = american_first_names * 2 + chinese_first_names + international_first_names
+
+def generate_unique_names(num_people, rnd=random):
+    return [f"{rnd.choice(first_name_pool)} {rnd.choice(last_names)}" for _ in range(num_people)]
+
+# Each table draws from its own random.Random, seeded from --seed if given
+def table_random(seed, table):
+    return random.Random(f"{seed}:{table}") if seed is not None else random.Random()
+
+# Generate Unique Customers (only names/ages of members and all ages are kept)
+def customer_rows(rnd, customer_ages, member_names):
+    for i in range(1, num_customers + 1):
+        name = generate_unique_names(1, rnd)[0]
+        if i <= num_members:
+            member_names.append(name)
+        yield {"customer_id": i, "name": name, "age": int(customer_ages[i - 1])}
+
+# Generate Members
+def member_rows(rnd, customer_ages, member_names):
+    for i in range(1, num_members + 1):
+        yield {"member_id": i, "customer_id": i, "name": member_names[i - 1], "age": int(customer_ages[i - 1]),
+               "join_date": today - rnd.randint(30, 730),
+               "is_active": int(rnd.choices([1, 0], weights=[0.8, 0.2])[0])}
+
+# Generate Visits
+def visit_rows(rnd):
+    visit_id = 1  # Ensuring unique sequential IDs
+    for member_id in range(1, num_members + 1):
+        visit_count = rnd.randint(20, 300)  # Random visits per member
+        for _ in range(visit_count):
+            yield {
+                "visit_id": visit_id,
+                "member_id": member_id,
+                "date": today - rnd.randint(1, 730),
+                "time": rnd.randint(6, 22),  # hour
+                "duration": rnd.randint(30, 180)
+            }
+            visit_id += 1  # Increment visit ID
+
+# Generate Day Pass Purchases (with a `guests` column buffer, everyone in
+# the group, purchaser first, goes into it for Day_Pass_Guests)
+def day_pass_rows(rnd, customer_ages, guests=None):
+    for day_pass_id in range(1, rnd.randint(5000, 15000) + 1):
+        purchaser_id = rnd.randint(1, num_customers)
+        num_passes = rnd.randint(1, 6)
+        group_ages = [int(customer_ages[purchaser_id - 1])] + [rnd.randint(5, 60) for _ in range(num_passes - 1)]
+        if guests is not None:
+            for guest_number, age in enumerate(group_ages, start=1):
+                guests["day_pass_id"].append(day_pass_id)
+                guests["guest_number"].append(guest_number)
+                guests["age"].append(age)
+        yield {"day_pass_id": day_pass_id, "purchaser_id": purchaser_id,
+               "date": today - rnd.randint(1, 730),
+               "pass_type": rnd.randrange(len(CATEGORIES["pass_type"]))}  # code; same draw as rnd.choice
+
+# Generate Sales (members are customers 1..num_members, so no lookup is needed)
+items = CATEGORIES["item"]
+
+def sale_rows(rnd):
+    for sale_id in range(1, rnd.randint(3000, 7000) + 1):
+        customer_id = rnd.randint(1, num_customers)
+        yield {"sale_id": sale_id, "customer_id": customer_id,
+               "member_id": customer_id if customer_id <= num_members else 0,
+               "date": today - rnd.randint(1, 730),
+               "item": rnd.randrange(len(items)), "price": float("{:.2f}".format(rnd.uniform(5, 50)))}
+
+def clean_sales(df_sales):
+    # Non-members are stored as member_id 0, as the fillna(0) used to produce
+    df_sales["price"] = df_sales["price"].replace({np.inf: np.nan, -np.inf: np.nan}).fillna(0)
+    return df_sales
+
+
+parser = argparse.ArgumentParser(description="Generate simulated climbing gym data as CSV files.")
+parser.add_argument("--seed", type=int, default=None, help="seed every random stream so runs are reproducible")
+parser.add_argument("--chunk-size", type=int, default=None,
+                    help="stream each table to its CSV in chunks of this many rows to bound memory")
+parser.add_argument("--format", choices=FORMATS, default="csv", help="csv, or typed columnar parquet / arrow files")
+args = parser.parse_args()
+
+ages_rnd = table_random(args.seed, "ages")
+customer_ages = np.array([ages_rnd.randint(5, 60) for _ in range(num_customers)], dtype=np.int8)
+member_names = []
+# Day_Pass_Guests replays the Day_Passes draws from a copy of its stream,
+# one chunk of guests at a time
+guests = column_buffer(("day_pass_id", "guest_number", "age"))
+day_pass_rnd = table_random(args.seed, "day_passes")
+guest_rnd = random.Random()
+guest_rnd.setstate(day_pass_rnd.getstate())
+
+# Save to CSV/Parquet/Arrow, one chunk at a time (customers first: members reuse their names)
+for stem, chunks in [
+    ('customers', batch_rows(customer_rows(table_random(args.seed, "customers"), customer_ages, member_names), args.chunk_size)),
+    ('members', batch_rows(member_rows(table_random(args.seed, "members"), customer_ages, member_names), args.chunk_size)),
+    ('visits', batch_rows(visit_rows(table_random(args.seed, "visits")), args.chunk_size)),
+    ('day_passes', batch_rows(day_pass_rows(day_pass_rnd, customer_ages), args.chunk_size)),
+    ('day_pass_guests', side_chunks(day_pass_rows(guest_rnd, customer_ages, guests), guests, args.chunk_size, "guest_id")),
+    ("sales", (clean_sales(chunk) for chunk in batch_rows(sale_rows(table_random(args.seed, "sales")), args.chunk_size)))]:
+    write_chunks(stem + EXTENSIONS[args.format], chunks, args.format)
+
+# # Display sample data for validation
+# import ace_tools as tools
+# tools.display_dataframe_to_user(name="Updated Visits Data Sample", dataframe=df_visits)
+
+if args.chunk_size:
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB")
+print("✅ Data generation complete: Customers, Members, Visits, Sales, Day Passes and their guests generated.")
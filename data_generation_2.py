@@ -1,7 +1,12 @@
+import argparse
+import os
+import time
 import pandas as pd
 import random
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import numpy as np
+from dataset_io import (CATEGORIES, EXTENSIONS, FORMATS, batch_rows, column_buffer, epoch_day,
+                        side_chunks, write_chunks, peak_rss_mb)
 
 # -------------------------------------------------------
 # Comprehensive Simulation Script
@@ -9,11 +14,33 @@ import numpy as np
 #   - Active members skip day passes
 #   - Use customer_id in [1..num_customers] for all Sales rows
 #   - member_id=0 if not a member (never 0 for customer_id!)
+#   - --vectorized samples all visits at once with NumPy
+#   - --chunk-size streams every table to disk in fixed-size chunks
+#   - --scale-factor multiplies every table size (SF1 = the sizes below)
+#   - --shards generates in parallel processes (see parallel_generation.py)
+#   - Rows hold typed values (dates as epoch days, times as the hour, item /
+#     pass type as category codes); text is produced only when writing CSV
+#   - --events DAYS writes a time-ordered stream of check-ins, check-outs,
+#     day passes and sales instead (see live_events.py)
 # -------------------------------------------------------
 
-# CONFIGURATIONS
+# CONFIGURATIONS (scale factor 1)
 num_members = 1000
 num_customers = 10000
+day_pass_purchases = (5000, 15000)  # purchase attempts, drawn per run
+sale_count = (3000, 7000)
+
+BASE_SIZES = (num_members, num_customers, day_pass_purchases, sale_count)
+
+def apply_scale_factor(scale_factor):
+    # Members, customers, day passes and sales grow linearly; visits follow
+    # the member count. SF1 draws exactly what the unscaled generator did.
+    global num_members, num_customers, day_pass_purchases, sale_count
+    members, customers, passes, sales = BASE_SIZES
+    num_members = members * scale_factor
+    num_customers = customers * scale_factor
+    day_pass_purchases = (passes[0] * scale_factor, passes[1] * scale_factor)
+    sale_count = (sales[0] * scale_factor, sales[1] * scale_factor)
 
 american_first_names = ["James", "Michael", "Emma", "Olivia", "William", "Sophia", "Ethan", "Ava",
                         "Benjamin", "Charlotte", "Bill", "Marshall", "Audrey", "Julia"]
@@ -23,45 +50,53 @@ international_first_names = ["Mateo", "Isabella", "Liam", "Santiago", "Amara", "
 last_names = ["Smith", "Johnson", "Lee", "Chen", "Garcia", "Schmidt", "Patel", "Nguyen",
               "Brown", "Takahashi", "Skleegore", "Banks", "Gates", "Aeterna"]
 
-def generate_unique_names(num_people):
-    fn = (
-        american_first_names * (num_people // 3) +
-        chinese_first_names  * (num_people // 6) +
-        international_first_names * (num_people // 6)
-    )
-    ln = last_names * (num_people // len(last_names) + 1)
-    random.shuffle(fn)
-    random.shuffle(ln)
-    return [f"{fn[i]} {ln[i]}" for i in range(num_people)]
+# Names are drawn per person (American names twice as likely as each of the
+# other pools) so a customer's name doesn't depend on how many are generated
+# at once; this keeps chunked and non-chunked runs identical.
+first_name_pool = american_first_names * 2 + chinese_first_names + international_first_names
+
+def generate_unique_names(num_people, rnd=random):
+    return [f"{rnd.choice(first_name_pool)} {rnd.choice(last_names)}" for _ in range(num_people)]
+
+# Each table draws from its own random.Random so tables can be streamed in any
+# order; with --seed every stream is reproducible.
+def table_random(seed, table):
+    return random.Random(f"{seed}:{table}") if seed is not None else random.Random()
 
 # 1. CREATE CUSTOMERS
-customer_names = generate_unique_names(num_customers)
-customers = [
-    {
-        "customer_id": i,
-        "name": customer_names[i - 1],
-        "age": random.randint(5, 60)
-    }
-    for i in range(1, num_customers + 1)
-]
-df_customers = pd.DataFrame(customers)
+# Only the compact lookups later tables need are kept in memory: every
+# customer's age and the names of the customers who become members.
+def customer_rows(rnd, customer_ages, member_names):
+    for i in range(1, num_customers + 1):
+        name = generate_unique_names(1, rnd)[0]
+        if i <= num_members:
+            member_names.append(name)
+        yield {
+            "customer_id": i,
+            "name": name,
+            "age": int(customer_ages[i - 1])
+        }
+
+def draw_customer_ages(rnd):
+    return np.array([rnd.randint(5, 60) for _ in range(num_customers)], dtype=np.int8)
 
 # 2. CREATE MEMBERS
-members = []
-for i in range(1, num_members + 1):
-    join_date_obj = datetime.today() - timedelta(days=random.randint(30, 730))
-    membership_length_days = random.randint(90, 365)
-    end_date_obj = join_date_obj + timedelta(days=membership_length_days)
-    is_active_flag = 1 if end_date_obj > datetime.today() else 0
-    members.append({
-        "member_id": i,
-        "customer_id": i,  # guaranteed valid in [1..num_members]
-        "name": customers[i - 1]["name"],
-        "age": customers[i - 1]["age"],
-        "join_date": join_date_obj.strftime('%Y-%m-%d'),
-        "is_active": is_active_flag
-    })
-df_members = pd.DataFrame(members)
+def member_rows(rnd, customer_ages, member_names, member_active):
+    today = epoch_day(date.today())
+    for i in range(1, num_members + 1):
+        days_since_join = rnd.randint(30, 730)
+        membership_length_days = rnd.randint(90, 365)
+        # still running if it ends after today
+        is_active_flag = 1 if membership_length_days > days_since_join else 0
+        member_active[i - 1] = is_active_flag
+        yield {
+            "member_id": i,
+            "customer_id": i,  # guaranteed valid in [1..num_members]
+            "name": member_names[i - 1],
+            "age": int(customer_ages[i - 1]),
+            "join_date": today - days_since_join,
+            "is_active": is_active_flag
+        }
 
 # 3. DAY-OF-WEEK & TIME-OF-DAY WEIGHTS FOR VISITS
 dow_weights = {
@@ -114,107 +149,489 @@ time_distributions = {
     },
 }
 
-def pick_day_of_week():
-    rnd = random.random() * total_dow_weight
+def pick_day_of_week(rnd=random):
+    r = rnd.random() * total_dow_weight
     cumulative = 0
     for wday, w in dow_weights.items():
         cumulative += w
-        if rnd <= cumulative:
+        if r <= cumulative:
             return wday
     return 6
 
-def pick_hour_for_day(wday):
+def pick_hour_for_day(wday, rnd=random):
     distribution = time_distributions[wday]
     sub_total = sum(v[1] for v in distribution.values())
-    r = random.random() * sub_total
+    r = rnd.random() * sub_total
     c = 0.0
     for label, (hours_range, sub_weight) in distribution.items():
         c += sub_weight
         if r <= c:
-            return random.choice(list(hours_range))
+            return rnd.choice(list(hours_range))
     return 12
 
+# Probability tables equivalent to pick_day_of_week() / pick_hour_for_day():
+# a sub-range is picked by weight, then an hour uniformly inside it.
+def dow_probabilities():
+    weights = np.array([dow_weights[d] for d in range(7)], dtype=float)
+    return weights / weights.sum()
+
+def hour_probabilities(wday):
+    distribution = time_distributions[wday]
+    sub_total = sum(v[1] for v in distribution.values())
+    probs = np.zeros(24)
+    for hours_range, sub_weight in distribution.values():
+        probs[list(hours_range)] += sub_weight / sub_total / len(hours_range)
+    return probs
+
 # 4. VISITS
-visits = []
-visit_id = 1
-start_date = datetime.today() - timedelta(days=730)
-
-for m in members:
-    total_visits = random.randint(50, 250)
-    for _ in range(total_visits):
-        wday = pick_day_of_week()
-        while True:
-            candidate_date = start_date + timedelta(days=random.randint(0, 729))
-            if candidate_date.weekday() == wday:
-                break
-        chosen_hour = pick_hour_for_day(wday)
-        visits.append({
-            "visit_id": visit_id,
-            "member_id": m["member_id"],
-            "date": candidate_date.strftime('%Y-%m-%d'),
-            "time": f"{chosen_hour}:00",
-            "duration": random.randint(30, 180)
-        })
-        visit_id += 1
-df_visits = pd.DataFrame(visits)
+def visit_rows(rnd, member_ids):
+    visit_id = 1
+    start_day = epoch_day(date.today()) - 730
 
-# 5. DAY PASS PURCHASES (Skip if membership is active)
-day_passes = []
-day_pass_id = 1
-for _ in range(random.randint(5000, 15000)):
-    purchaser = random.choice(customers)
-    cust_id = purchaser["customer_id"]  # always 1..num_customers
-    if cust_id <= num_members:
-        if members[cust_id - 1]["is_active"] == 1:
-            continue
-    num_passes = random.randint(1, 6)
-    group_ages = [purchaser["age"]] + [random.randint(5, 60) for _ in range(num_passes - 1)]
-    purchase_date = datetime.today() - timedelta(days=random.randint(1, 730))
-    day_passes.append({
-        "day_pass_id": day_pass_id,
-        "purchaser_id": cust_id,  # valid in [1..num_customers]
-        "date": purchase_date.strftime('%Y-%m-%d'),
-        "pass_type": random.choice(["Single", "Family", "Student"]),
-        "group_ages": ",".join(map(str, group_ages))
+    for member_id in member_ids:
+        total_visits = rnd.randint(50, 250)
+        for _ in range(total_visits):
+            wday = pick_day_of_week(rnd)
+            while True:
+                candidate_day = start_day + rnd.randint(0, 729)
+                if (candidate_day + 3) % 7 == wday:  # 1970-01-01 was a Thursday
+                    break
+            chosen_hour = pick_hour_for_day(wday, rnd)
+            yield {
+                "visit_id": visit_id,
+                "member_id": int(member_id),
+                "date": candidate_day,
+                "time": chosen_hour,
+                "duration": rnd.randint(30, 180)
+            }
+            visit_id += 1
+
+# The original per-visit path: datetime arithmetic and a dict of formatted
+# strings for every row. Kept only as the baseline the vectorized generator
+# is timed against.
+def visit_rows_strftime(rnd, member_ids):
+    visits = []
+    visit_id = 1
+    start_date = datetime.today() - timedelta(days=730)
+
+    for member_id in member_ids:
+        total_visits = rnd.randint(50, 250)
+        for _ in range(total_visits):
+            wday = pick_day_of_week(rnd)
+            while True:
+                candidate_date = start_date + timedelta(days=rnd.randint(0, 729))
+                if candidate_date.weekday() == wday:
+                    break
+            chosen_hour = pick_hour_for_day(wday, rnd)
+            visits.append({
+                "visit_id": visit_id,
+                "member_id": int(member_id),
+                "date": candidate_date.strftime('%Y-%m-%d'),
+                "time": f"{chosen_hour}:00",
+                "duration": rnd.randint(30, 180)
+            })
+            visit_id += 1
+    return pd.DataFrame(visits)
+
+# One NumPy stream per visit column. Only doubles are drawn from each stream,
+# in row order, so the output doesn't depend on how members are chunked.
+visit_columns = ("count", "weekday", "date", "hour", "duration")
+
+def visit_streams(seed=None):
+    children = np.random.SeedSequence(seed).spawn(len(visit_columns))
+    return {column: np.random.default_rng(child) for column, child in zip(visit_columns, children)}
+
+def draw_integers(stream, low, high, size):
+    # inclusive on both ends, like random.randint
+    return low + (stream.random(size) * (high - low + 1)).astype(np.int64)
+
+def draw_weighted(stream, probs, size=None, uniforms=None):
+    cdf = np.cumsum(probs)
+    u = stream.random(size) if uniforms is None else uniforms
+    return np.searchsorted(cdf / cdf[-1], u, side="right")
+
+# Batched version of visit_rows(): same distributions, but every visit's
+# weekday, date, hour and duration is drawn in one NumPy call per column.
+def generate_visits_vectorized(member_ids, streams=None, first_visit_id=1, today=None):
+    streams = visit_streams() if streams is None else streams
+    start_day = epoch_day(today or date.today()) - 730
+
+    member_ids = np.asarray(member_ids, dtype=np.int64)
+    counts = draw_integers(streams["count"], 50, 250, len(member_ids))
+    total = int(counts.sum())
+
+    wdays = draw_weighted(streams["weekday"], dow_probabilities(), total)
+    date_u = streams["date"].random(total)
+    hour_u = streams["hour"].random(total)
+
+    # Day offsets in [0, 729] grouped by weekday replace the rejection loop
+    offsets = np.arange(730)
+    offset_wdays = (start_day + offsets + 3) % 7  # 1970-01-01 was a Thursday
+    day_offsets = np.empty(total, dtype=np.int64)
+    hours = np.empty(total, dtype=np.int64)
+    for wday in range(7):
+        mask = wdays == wday
+        candidates = offsets[offset_wdays == wday]
+        day_offsets[mask] = candidates[(date_u[mask] * len(candidates)).astype(np.int64)]
+        hours[mask] = draw_weighted(None, hour_probabilities(wday), uniforms=hour_u[mask])
+
+    return pd.DataFrame({
+        "visit_id": np.arange(first_visit_id, first_visit_id + total, dtype=np.int32),
+        "member_id": np.repeat(member_ids, counts).astype(np.int32),
+        "date": (start_day + day_offsets).astype(np.int32),
+        "time": hours.astype(np.uint8),
+        "duration": draw_integers(streams["duration"], 30, 180, total).astype(np.int16)
     })
-    day_pass_id += 1
-df_day_passes = pd.DataFrame(day_passes)
+
+def visit_chunks_vectorized(member_ids, streams, chunk_size=None, first_visit_id=1, today=None):
+    # ~150 visits per member on average, so size member batches to match chunk_size rows
+    per_chunk = max(1, chunk_size // 150) if chunk_size else len(member_ids)
+    next_visit_id = first_visit_id
+    for start in range(0, len(member_ids), per_chunk):
+        chunk = generate_visits_vectorized(member_ids[start:start + per_chunk], streams, next_visit_id, today)
+        next_visit_id += len(chunk)
+        yield chunk
+
+# Weekday / hour shares of a visits frame, used to check that both
+# generators produce the same distributions. Dates are epoch days or
+# 'YYYY-MM-DD' text, times the hour or 'H:00' text.
+def visit_histograms(df_visits):
+    if pd.api.types.is_integer_dtype(df_visits["date"]):
+        weekday = (df_visits["date"] + 3) % 7  # 1970-01-01 was a Thursday
+    else:
+        weekday = pd.to_datetime(df_visits["date"]).dt.weekday
+    hour = df_visits["time"]
+    if not pd.api.types.is_integer_dtype(hour):
+        hour = hour.astype(str).str.split(":").str[0].astype(int)
+    weekday, hour = weekday.value_counts(normalize=True), hour.value_counts(normalize=True)
+    return weekday.reindex(range(7), fill_value=0), hour.reindex(range(24), fill_value=0)
+
+def compare_visit_generators(member_ids, seed=None):
+    # Max weekday / hour share differences and the speedup over the original
+    # strftime loop; the vectorized time is the best of three runs
+    started = time.perf_counter()
+    df_loop = visit_rows_strftime(random.Random(seed), member_ids)
+    loop_seconds = time.perf_counter() - started
+
+    vec_seconds = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        df_vec = generate_visits_vectorized(member_ids, visit_streams(seed))
+        vec_seconds = min(vec_seconds, time.perf_counter() - started)
+
+    loop_weekday, loop_hour = visit_histograms(df_loop)
+    vec_weekday, vec_hour = visit_histograms(df_vec)
+    weekday_diff = (loop_weekday - vec_weekday).abs().max()
+    hour_diff = (loop_hour - vec_hour).abs().max()
+
+    print(f"Loop generator:       {len(df_loop):>9} visits in {loop_seconds:.3f}s")
+    print(f"Vectorized generator: {len(df_vec):>9} visits in {vec_seconds:.3f}s "
+          f"({loop_seconds / vec_seconds:.0f}x faster)")
+    print(f"Max weekday share difference: {weekday_diff:.4f}")
+    print(f"Max hour share difference:    {hour_diff:.4f}")
+    return weekday_diff, hour_diff, loop_seconds / vec_seconds
+
+# 5. DAY PASS PURCHASES (Skip if membership is active)
+pass_types = CATEGORIES["pass_type"]
+guest_columns = ("day_pass_id", "guest_number", "age")  # guest_id is numbered by side_chunks()
+
+# Everyone admitted on a pass (the purchaser first) is appended to the
+# `guests` column buffer, which becomes the Day_Pass_Guests table
+def add_guests(guests, day_pass_id, group_ages):
+    for guest_number, age in enumerate(group_ages, start=1):
+        guests["day_pass_id"].append(day_pass_id)
+        guests["guest_number"].append(guest_number)
+        guests["age"].append(age)
+
+def day_pass_rows(rnd, customer_ages, member_active, guests=None):
+    day_pass_id = 1
+    today = epoch_day(date.today())
+    for _ in range(rnd.randint(*day_pass_purchases)):
+        cust_id = rnd.randint(1, num_customers)  # always 1..num_customers
+        if cust_id <= num_members:
+            if member_active[cust_id - 1] == 1:
+                continue
+        num_passes = rnd.randint(1, 6)
+        group_ages = [int(customer_ages[cust_id - 1])] + [rnd.randint(5, 60) for _ in range(num_passes - 1)]
+        purchase_day = today - rnd.randint(1, 730)
+        if guests is not None:
+            add_guests(guests, day_pass_id, group_ages)
+        yield {
+            "day_pass_id": day_pass_id,
+            "purchaser_id": cust_id,  # valid in [1..num_customers]
+            "date": purchase_day,
+            "pass_type": rnd.randrange(len(pass_types)),  # same draw as rnd.choice(pass_types)
+        }
+        day_pass_id += 1
 
 # 6. SALES
-items = ['Chalk Bag', 'Shoes Rental', 'Protein Bar', 'Water Bottle', 'T-Shirt', 'Gatorade', 'Celsius']
-sales_list = []
-sale_id = 1
-for _ in range(random.randint(3000, 7000)):
-    # pick a valid customer
-    cust = random.choice(customers)
-    # if they are a member, store that ID, else 0
-    if cust["customer_id"] <= num_members:
-        mid = cust["customer_id"]
+items = CATEGORIES["item"]
+
+def sale_rows(rnd):
+    sale_id = 1
+    today = epoch_day(date.today())
+    for _ in range(rnd.randint(*sale_count)):
+        # pick a valid customer
+        cust_id = rnd.randint(1, num_customers)
+        # if they are a member, store that ID, else 0
+        if cust_id <= num_members:
+            mid = cust_id
+        else:
+            mid = 0
+        yield {
+            "sale_id": sale_id,
+            "customer_id": cust_id,  # always valid
+            "member_id": mid,
+            "date": today - rnd.randint(1, 730),
+            "item": rnd.randrange(len(items)),  # same draw as rnd.choice(items)
+            "price": float("{:.2f}".format(rnd.uniform(5, 50)))
+        }
+        sale_id += 1
+
+def clean_sales(df_sales):
+    # Handle infinities; prices and member_id are already typed numbers
+    df_sales["price"] = df_sales["price"].replace({np.inf: np.nan, -np.inf: np.nan}).fillna(0).round(2)
+    return df_sales
+
+
+def table_chunks(seed=None, chunk_size=None, vectorized=False, scale_factor=1):
+    # [(file stem, lazy iterator of DataFrame chunks)] in the order the
+    # tables must be consumed; nothing is generated until it's iterated
+    apply_scale_factor(scale_factor)
+    member_ids = np.arange(1, num_members + 1)
+    customer_ages = draw_customer_ages(table_random(seed, "ages"))
+    member_names = []
+    member_active = np.zeros(num_members, dtype=np.int8)
+    # Day_Pass_Guests replays the Day_Passes draws from a copy of its stream,
+    # collecting one chunk of guests at a time
+    guests = column_buffer(guest_columns)
+    day_pass_rnd = table_random(seed, "day_passes")
+    guest_rnd = random.Random()
+    guest_rnd.setstate(day_pass_rnd.getstate())
+
+    if vectorized:
+        visit_chunks = visit_chunks_vectorized(member_ids, visit_streams(seed), chunk_size)
     else:
-        mid = 0
-    sales_list.append({
-        "sale_id": sale_id,
-        "customer_id": cust["customer_id"],  # always valid
-        "member_id": mid,
-        "date": (datetime.today() - timedelta(days=random.randint(1, 730))).strftime('%Y-%m-%d'),
-        "item": random.choice(items),
-        "price": "{:.2f}".format(random.uniform(5, 50))
-    })
-    sale_id += 1
-df_sales = pd.DataFrame(sales_list)
+        visit_chunks = batch_rows(visit_rows(table_random(seed, "visits"), member_ids), chunk_size)
+
+    # Tables are consumed in FK order: members need the customer names, day
+    # passes (and their guests) need the members' active flags
+    return [
+        ("customers", batch_rows(customer_rows(table_random(seed, "customers"), customer_ages, member_names), chunk_size)),
+        ("members", batch_rows(member_rows(table_random(seed, "members"), customer_ages, member_names, member_active), chunk_size)),
+        ("visits", visit_chunks),
+        ("day_passes", batch_rows(day_pass_rows(day_pass_rnd, customer_ages, member_active), chunk_size)),
+        ("day_pass_guests", side_chunks(day_pass_rows(guest_rnd, customer_ages, member_active, guests), guests,
+                                        chunk_size, "guest_id")),
+        ("sales", (clean_sales(chunk) for chunk in batch_rows(sale_rows(table_random(seed, "sales")), chunk_size))),
+    ]
+
+
+def generate(seed=None, chunk_size=None, fmt="csv", vectorized=False, scale_factor=1, directory=".",
+             shards=None, workers=None, today=None):
+    # Write every table and return {file name: rows written}
+    if shards:
+        from parallel_generation import generate_sharded
+        return generate_sharded(seed, shards, workers, fmt, scale_factor, directory, chunk_size, today)
+    # 7. SAVE FILES
+    written = {}
+    for stem, chunks in table_chunks(seed, chunk_size, vectorized, scale_factor):
+        filename = stem + EXTENSIONS[fmt]
+        written[filename] = write_chunks(os.path.join(directory, filename), chunks, fmt)
+        print(f"{filename}: {written[filename]} rows")
+    return written
+
+
+# 8. LIVE EVENT STREAM
+# The same activity as a time-ordered stream, one frame per simulated day:
+# each day's visits, day passes and sales follow dow_weights in volume and
+# time_distributions in time of day, at the average daily rates of the
+# tables above. Everyone admitted (members and day-pass guests) checks out
+# again after their duration. Ids continue from first_ids.
+EVENT_KINDS = ("check_in", "check_out", "day_pass", "guest", "sale")
+event_columns = ("ts", "kind", "id", "member_id", "customer_id", "day_pass_id", "guest_number", "age",
+                 "duration", "pass_type", "item", "price")
+EVENT_IDS = {"check_in": "visit_id", "day_pass": "day_pass_id", "guest": "guest_id", "sale": "sale_id"}
+HISTORY_DAYS = 730  # the tables above spread their rows over two years
+
+def draw_member_active(seed, customer_ages):
+    # Replays member_rows() for the active flags alone, so a stream matches
+    # the Members table generated with the same seed
+    member_active = np.zeros(num_members, dtype=np.int8)
+    for _ in member_rows(table_random(seed, "members"), customer_ages, [None] * num_members, member_active):
+        pass
+    return member_active
+
+def event_part(ts, kind, **columns):
+    # {column: array} for one kind of event; unused columns are 0, or -1
+    # (missing) for the category codes
+    size = len(ts)
+    part = {"ts": np.asarray(ts, dtype=np.int64), "kind": np.full(size, EVENT_KINDS.index(kind), dtype=np.int8)}
+    for name in event_columns[2:]:
+        if name in columns:
+            part[name] = columns[name]
+        elif name in CATEGORIES:
+            part[name] = np.full(size, -1, dtype=np.int8)
+        else:
+            part[name] = np.zeros(size, dtype=np.float64 if name == "price" else np.int64)
+    return part
+
+def event_frame(parts):
+    # Stable sort by time keeps a day pass ahead of its guests
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in event_columns}
+    order = np.argsort(columns["ts"], kind="stable")
+    df = pd.DataFrame({name: values[order] for name, values in columns.items()})
+    df["kind"] = pd.Categorical.from_codes(df["kind"], categories=EVENT_KINDS)
+    for name in CATEGORIES:
+        df[name] = pd.Categorical.from_codes(df[name], categories=CATEGORIES[name])
+    return df
+
+def take_ids(next_ids, kind, size):
+    first = next_ids[EVENT_IDS[kind]]
+    next_ids[EVENT_IDS[kind]] = first + size
+    return np.arange(first, first + size, dtype=np.int64)
+
+def arrival_times(rng, day, wday, size):
+    # Sorted seconds since the epoch: an hour from the weekday's curve, then
+    # a uniform second inside it
+    hours = draw_weighted(rng, hour_probabilities(wday), size)
+    return np.sort(day * 86400 + hours * 3600 + (rng.random(size) * 3600).astype(np.int64))
+
+def day_events(rng, day, customer_ages, member_active, rates, next_ids):
+    # (arrivals, check-outs) of one day as event parts
+    wday = (day + 3) % 7  # 1970-01-01 was a Thursday
+    day_weight = 7 * dow_probabilities()[wday]
+    num_m, num_c = len(member_active), len(customer_ages)
+
+    # Members check in
+    ts = arrival_times(rng, day, wday, rng.poisson(rates["visits"] * day_weight))
+    duration = draw_integers(rng, 30, 180, len(ts))
+    member_id = draw_integers(rng, 1, num_m, len(ts))
+    visit_id = take_ids(next_ids, "check_in", len(ts))
+    check_ins = event_part(ts, "check_in", id=visit_id, member_id=member_id, duration=duration)
+    check_outs = [event_part(ts + duration * 60, "check_out", id=visit_id, member_id=member_id)]
+
+    # Day passes, skipped by active members, admit 1-6 guests (purchaser first)
+    ts = arrival_times(rng, day, wday, rng.poisson(rates["day_passes"] * day_weight))
+    purchaser = draw_integers(rng, 1, num_c, len(ts))
+    active = np.concatenate([[0], member_active, np.zeros(num_c - num_m, dtype=np.int8)])
+    keep = active[purchaser] == 0
+    ts, purchaser = ts[keep], purchaser[keep]
+    day_pass_id = take_ids(next_ids, "day_pass", len(ts))
+    day_passes = event_part(ts, "day_pass", id=day_pass_id, customer_id=purchaser,
+                            pass_type=draw_integers(rng, 0, len(pass_types) - 1, len(ts)).astype(np.int8))
+    group_sizes = draw_integers(rng, 1, 6, len(ts))
+    starts = np.cumsum(group_sizes) - group_sizes
+    guest_number = np.arange(group_sizes.sum()) - np.repeat(starts, group_sizes) + 1
+    age = draw_integers(rng, 5, 60, len(guest_number))
+    age[starts] = customer_ages[purchaser - 1]
+    guest_ts = np.repeat(ts, group_sizes)
+    guest_duration = draw_integers(rng, 30, 180, len(guest_ts))
+    guest_id = take_ids(next_ids, "guest", len(guest_ts))
+    guests = event_part(guest_ts, "guest", id=guest_id, day_pass_id=np.repeat(day_pass_id, group_sizes),
+                        guest_number=guest_number, age=age, duration=guest_duration)
+    check_outs.append(event_part(guest_ts + guest_duration * 60, "check_out", id=guest_id))
+
+    # Sales at the front desk; member_id=0 if not a member
+    ts = arrival_times(rng, day, wday, rng.poisson(rates["sales"] * day_weight))
+    customer_id = draw_integers(rng, 1, num_c, len(ts))
+    sales = event_part(ts, "sale", id=take_ids(next_ids, "sale", len(ts)), customer_id=customer_id,
+                       member_id=np.where(customer_id <= num_m, customer_id, 0),
+                       item=draw_integers(rng, 0, len(items) - 1, len(ts)).astype(np.int8),
+                       price=np.round(5 + rng.random(len(ts)) * 45, 2))
+    return [check_ins, day_passes, guests, sales], check_outs
+
+def event_stream(seed=None, days=1, start=None, scale_factor=1, customer_ages=None, member_active=None,
+                 first_ids=None):
+    # Frames of events for `days` days from midnight of `start` (default
+    # today). customer_ages / member_active default to what the table
+    # generator draws for the same seed; pass the loaded tables' instead.
+    apply_scale_factor(scale_factor)
+    if customer_ages is None:
+        customer_ages = draw_customer_ages(table_random(seed, "ages"))
+    if member_active is None:
+        member_active = draw_member_active(seed, customer_ages)
+    scale = len(customer_ages) / BASE_SIZES[1]
+    rates = {
+        "visits": len(member_active) * 150 / HISTORY_DAYS,  # 50-250 visits per member
+        "day_passes": sum(BASE_SIZES[2]) / 2 * scale / HISTORY_DAYS,
+        "sales": sum(BASE_SIZES[3]) / 2 * scale / HISTORY_DAYS,
+    }
+    next_ids = dict.fromkeys(EVENT_IDS.values(), 1)
+    next_ids.update(first_ids or {})
+    rng = np.random.default_rng(seed)
+    first_day = epoch_day(start or date.today())
+    # Check-outs after the end of the day they were generated on move to the
+    # next day; the stream stops at the last midnight, with whoever is still
+    # inside checked in
+    carried = []
+    for day in range(first_day, first_day + days):
+        arrivals, check_outs = day_events(rng, day, customer_ages, member_active, rates, next_ids)
+        leaving = carried + check_outs
+        carried = []
+        parts = arrivals
+        for part in leaving:
+            today = part["ts"] < (day + 1) * 86400
+            parts.append({name: values[today] for name, values in part.items()})
+            carried.append({name: values[~today] for name, values in part.items()})
+        yield event_frame(parts)
+
+def generate_events(seed=None, days=1, fmt="csv", scale_factor=1, directory=".", start=None):
+    path = os.path.join(directory, "events" + EXTENSIONS[fmt])
+    started = time.perf_counter()
+    rows = write_chunks(path, event_stream(seed, days, start, scale_factor), fmt)
+    seconds = time.perf_counter() - started
+    print(f"{os.path.basename(path)}: {rows} events over {days} day(s) in {seconds:.2f}s "
+          f"({rows / max(seconds, 1e-9):,.0f} events/sec)")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate simulated climbing gym data as CSV files.")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="sample all visits at once with NumPy instead of one at a time")
+    parser.add_argument("--compare-visits", action="store_true",
+                        help="compare weekday/hour histograms and timing of both visit generators, then exit")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed every random stream so runs are reproducible")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="stream each table to its CSV in chunks of this many rows to bound memory")
+    parser.add_argument("--format", choices=FORMATS, default="csv",
+                        help="csv, or typed columnar parquet / arrow files")
+    parser.add_argument("--scale-factor", type=int, default=1,
+                        help="multiply every table size (1 = 1,000 members / 10,000 customers)")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="split every table into this many seeded shards generated in a process pool")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for --shards (default: one per CPU); doesn't change the output")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None,
+                        help="with --shards, the YYYY-MM-DD that dates count back from; with --events, the "
+                             "day the stream starts (default: today)")
+    parser.add_argument("--events", type=int, default=None, metavar="DAYS",
+                        help="write DAYS days of time-ordered check-in / check-out / day pass / sale events "
+                             "to events.<format> instead of the tables")
+    args = parser.parse_args()
+    if args.as_of and not (args.shards or args.events):
+        parser.error("--as-of needs --shards or --events")
+
+    if args.compare_visits:
+        apply_scale_factor(args.scale_factor)
+        weekday_diff, hour_diff, _ = compare_visit_generators(np.arange(1, num_members + 1), args.seed)
+        ok = weekday_diff <= 0.01 and hour_diff <= 0.01
+        print("✅ Visit generators agree." if ok else "❌ Visit generator histograms differ.")
+        raise SystemExit(0 if ok else 1)
 
-# Convert to proper numeric & handle infinities
-df_sales.replace({np.inf: np.nan, -np.inf: np.nan}, inplace=True)
-df_sales["price"] = pd.to_numeric(df_sales["price"], errors="coerce").fillna(0).round(2)
+    if args.events:
+        generate_events(args.seed, args.events, args.format, args.scale_factor, start=args.as_of)
+        print("✅ Event stream generated.")
+        raise SystemExit(0)
 
-# Optional: Ensure no blank strings in member_id
-df_sales["member_id"] = df_sales["member_id"].astype(int)
+    generate(args.seed, args.chunk_size, args.format, args.vectorized, args.scale_factor,
+             shards=args.shards, workers=args.workers, today=args.as_of)
+    if args.chunk_size:
+        print(f"Peak RSS: {peak_rss_mb():.1f} MB")
+    print("✅ Data generation complete, guaranteed valid customer_id references. No foreign key conflicts.")
 
-# 7. SAVE CSVs
-df_customers.to_csv("customers.csv", index=False)
-df_members.to_csv("members.csv", index=False)
-df_visits.to_csv("visits.csv", index=False)
-df_day_passes.to_csv("day_passes.csv", index=False)
-df_sales.to_csv("sales.csv", index=False)
 
-print("✅ Data generation complete, guaranteed valid customer_id references. No foreign key conflicts.")
+if __name__ == "__main__":
+    main()
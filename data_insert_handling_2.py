@@ -1,120 +1,120 @@
-import pyodbc
-import pandas as pd
-
-# conn = pyodbc.connect(
-#     "DRIVER={ODBC Driver 18 for SQL Server};"
-#     "SERVER=ZAPDOS\\MOLTRES;"
-#     "DATABASE=test_db;"
-#     "UID=climbing_user;"
-#     "PWD=hoosierheights;"
-#     "TrustServerCertificate=yes;"
-#     "Encrypt=yes;"
-# )
-# cursor = conn.cursor()
-
-conn = pyodbc.connect(
-    "DRIVER=/opt/homebrew/lib/libtdsodbc.so;"
-    "SERVER=127.0.0.1;"  # or your IP like '192.168.1.xxx'
-    "PORT=1433;"
-    "DATABASE=test_db;"
-    "UID=climbing_user;"
-    "PWD=hoosierheights;"
-    "TDS_Version=7.4;"
-)
-cursor = conn.cursor()
-
-# Drop foreign keys safely
-cursor.execute("""
-DECLARE @sql NVARCHAR(MAX) = '';
-SELECT @sql += 'ALTER TABLE ' + QUOTENAME(OBJECT_NAME(parent_object_id)) +
-               ' DROP CONSTRAINT ' + QUOTENAME(name) + '; '
-FROM sys.foreign_keys;
-IF @sql <> ''
-    EXEC sp_executesql @sql;
-""")
-
-# Drop tables in correct order
-cursor.execute("""
-DROP TABLE IF EXISTS Sales, Visits, Day_Passes, Members, Customers;
-""")
-conn.commit()
-
-# Recreate tables
-cursor.execute("""
-CREATE TABLE Customers (
-    customer_id INT PRIMARY KEY,
-    name VARCHAR(50),
-    age INT
-);
-
-CREATE TABLE Members (
-    member_id INT PRIMARY KEY,
-    customer_id INT,
-    name VARCHAR(50),
-    age INT,
-    join_date DATE,
-    is_active BIT,
-    FOREIGN KEY (customer_id) REFERENCES Customers(customer_id)
-);
-
-CREATE TABLE Visits (
-    visit_id INT PRIMARY KEY,
-    member_id INT,
-    date DATE,
-    time TIME,
-    duration INT,
-    FOREIGN KEY (member_id) REFERENCES Members(member_id)
-);
-
-CREATE TABLE Day_Passes (
-    day_pass_id INT PRIMARY KEY,
-    purchaser_id INT,
-    date DATE,
-    pass_type VARCHAR(20),
-    group_ages VARCHAR(100),
-    FOREIGN KEY (purchaser_id) REFERENCES Customers(customer_id)
-);
-
-CREATE TABLE Sales (
-    sale_id INT PRIMARY KEY,
-    customer_id INT,
-    member_id INT NULL,
-    date DATE,
-    item VARCHAR(50),
-    price DECIMAL(10,2),
-    FOREIGN KEY (customer_id) REFERENCES Customers(customer_id)
-);
-""")
-conn.commit()
-
-# Load CSV Data
-for table, filename in [
-    ("Customers", "customers.csv"),
-    ("Members", "members.csv"),
-    ("Visits", "visits.csv"),
-    ("Day_Passes", "day_passes.csv"),
-    ("Sales", "sales.csv")]:
-
-    df = pd.read_csv(filename)
-    print(f"Loading {table}")
-
-    # Only Sales needs extra handling for optional member_id & numeric price
-    if table == "Sales":
-        # Convert blank/invalid 'member_id' to NaN
-        df["member_id"] = pd.to_numeric(df["member_id"], errors="coerce")
-        # Convert NaN -> None for SQL null
-        df["member_id"] = df["member_id"].apply(lambda x: None if pd.isnull(x) else int(x))
-
-        # Convert 'price' to numeric, fill invalid with 0
-        df["price"] = pd.to_numeric(df["price"], errors="coerce").fillna(0).round(2)
-
-    # Insert each row
-    for row in df.itertuples(index=False, name=None):
-        placeholders = ", ".join(["?" for _ in row])
-        cursor.execute(f"INSERT INTO {table} VALUES ({placeholders})", row)
-
-    conn.commit()
-
-print("✅ Data successfully loaded into SQL Server with NULL member_id for non-members.")
-cursor.close()
+import argparse
+import time
+from dataset_io import FORMATS
+from db import BACKENDS, DEFAULT_BACKEND, ConnectionPool, connect_with_retry
+from schema import SCHEMA_PROFILES, create_indexes, create_tables, disable_foreign_keys, drop_tables, enable_foreign_keys
+from bulk_loader import DEFAULT_BATCH_SIZE, load_table_files
+from load_telemetry import LoadTelemetry
+from parallel_loader import load_tables_parallel, prepare_frames, read_frames
+from incremental_loader import load_incremental, record_watermarks
+from rollups import rebuild_rollups
+from member_features import build_member_features
+from validation import print_problems, validate_frames
+from swap_reload import reload_with_swap
+from partitions import add_months, data_months
+
+parser = argparse.ArgumentParser(description="Load the generated CSVs into the database.")
+parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                    help="sqlserver, or a local sqlite/duckdb file as a stand-in")
+parser.add_argument("--database", default=None, help="database file for the sqlite/duckdb backends")
+parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                    help="rows sent per executemany / commit")
+parser.add_argument("--workers", type=int, default=1,
+                    help="load independent tables and key ranges concurrently on this many pooled connections")
+parser.add_argument("--incremental", action="store_true",
+                    help="upsert only rows past each table's watermark instead of dropping and reloading")
+parser.add_argument("--format", choices=FORMATS, default="csv",
+                    help="read the generated csv, parquet or arrow files")
+parser.add_argument("--schema-profile", choices=SCHEMA_PROFILES, default="baseline",
+                    help="secondary indexes to build after the load: none, covering rowstore, columnstore, "
+                         "or rowstore with Visits / Sales partitioned by month")
+parser.add_argument("--swap", action="store_true",
+                    help="load into staging tables and swap them in, so the live tables stay readable")
+parser.add_argument("--no-validate", action="store_true",
+                    help="skip the pre-load checks and load with foreign keys enforced row by row")
+parser.add_argument("--telemetry", default="load_telemetry.json",
+                    help="write per-table / per-stage timings and batch latency histograms here ('' to skip)")
+parser.add_argument("--progress-interval", type=float, default=2.0,
+                    help="seconds between progress lines per table (0 to silence)")
+args = parser.parse_args()
+
+conn = connect_with_retry(args.backend, args.database)
+
+if args.incremental:
+    load_incremental(conn, batch_size=args.batch_size, fmt=args.format)
+    print(f"✅ Incremental load into {args.backend} complete.")
+    conn.close()
+    raise SystemExit(0)
+
+telemetry = LoadTelemetry(args.progress_interval, backend=args.backend, batch_size=args.batch_size,
+                          workers=args.workers, format=args.format, schema_profile=args.schema_profile)
+
+# Check every table before touching the database: a bad row stops the run
+# here, with the existing tables still intact
+frames = None
+if not args.no_validate:
+    frames = read_frames(fmt=args.format, telemetry=telemetry, prepare=False)
+    started = time.perf_counter()
+    problems = validate_frames(frames)
+    telemetry.meta["validation_seconds"] = time.perf_counter() - started
+    print_problems(problems)
+    if problems:
+        conn.close()
+        raise SystemExit(1)
+    frames = prepare_frames(frames, telemetry)
+
+def load_tables(suffix=""):
+    # Load CSV Data in batches (Sales gets NULL member_id for non-members)
+    if args.workers > 1:
+        with ConnectionPool(args.backend, args.database, size=args.workers) as pool:
+            load_tables_parallel(pool, frames, workers=args.workers, batch_size=args.batch_size, fmt=args.format,
+                                 telemetry=telemetry, suffix=suffix)
+    else:
+        load_table_files(conn, batch_size=args.batch_size, fmt=args.format, telemetry=telemetry, frames=frames,
+                         suffix=suffix)
+    telemetry.print_summary()
+    if args.telemetry:
+        telemetry.write(args.telemetry)
+        print(f"Load telemetry written to {args.telemetry}")
+
+
+def split_months():
+    # Partitioned profile on SQL Server: one partition per month in the data,
+    # split while the tables are still empty
+    if args.schema_profile == "partitioned" and args.backend == "sqlserver":
+        add_months(conn, data_months(frames, args.format))
+
+
+if args.swap:
+    split_months()
+    # Build everything in staging tables and swap them in; the live tables
+    # keep serving queries until the swap
+    reload_with_swap(conn, load_tables, args.schema_profile, args.batch_size, validated=frames is not None)
+    conn.close()
+    print(f"✅ Data reloaded into {args.backend} and swapped in.")
+    raise SystemExit(0)
+
+# Drop foreign keys and tables, then recreate them
+drop_tables(conn)
+create_tables(conn, profile=args.schema_profile)
+split_months()
+
+# Validated data loads without per-row FK checks; they're re-checked once below
+if frames is not None:
+    disable_foreign_keys(conn)
+load_tables()
+if frames is not None:
+    enable_foreign_keys(conn)
+
+# Indexes are built once the data is in, not maintained during the inserts
+create_indexes(conn, args.schema_profile)
+
+# Start the watermarks from what was just loaded, for later --incremental runs
+record_watermarks(conn)
+
+# Rebuild the rollups and member features the catalog queries read
+rebuild_rollups(conn, args.batch_size)
+build_member_features(conn)
 conn.close()
+
+print(f"✅ Data successfully loaded into {args.backend} with NULL member_id for non-members.")
@@ -0,0 +1,283 @@
+import shutil
+import sys
+from array import array
+import numpy as np
+import pandas as pd
+
+# -------------------------------------------------------
+# Dataset files shared by the generators and loaders
+#   - Tables are produced as a stream of DataFrame chunks
+#   - Each chunk is appended to its file before the next one is built,
+#     so memory stays bounded by the chunk size, not the table size
+#   - chunk_size=None means "one chunk", i.e. the old all-in-memory behaviour
+#   - Child rows drawn alongside a parent table (day pass guests) are
+#     produced by replaying the parent's draws, one chunk per parent chunk
+#   - In memory, generated columns are typed arrays: int32 IDs, dates as
+#     days since 1970-01-01, times as the hour, categorical codes for items
+#     and pass types; they're only formatted as text when written to CSV
+#   - Besides CSV, tables can be stored as Parquet or Arrow IPC files with
+#     native date/time types and dictionary-encoded categoricals; readers
+#     memory-map them and load only the columns asked for (needs pyarrow)
+#   - Part files written side by side (e.g. by generator shards) are merged
+#     into one file in order; CSV parts are concatenated byte for byte
+# -------------------------------------------------------
+
+FORMATS = ("csv", "parquet", "arrow")
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+# Column types for the columnar formats. Categoricals use fixed dictionaries
+# so every chunk of a file shares the same one.
+DATE_COLUMNS = ("date", "join_date")
+TIME_COLUMNS = ("time",)
+CATEGORIES = {
+    "item": ['Chalk Bag', 'Shoes Rental', 'Protein Bar', 'Water Bottle', 'T-Shirt', 'Gatorade', 'Celsius'],
+    "pass_type": ["Single", "Family", "Student"],
+}
+
+# array typecodes of the generated columns; anything else (names, group
+# ages) stays a list of Python objects
+COLUMN_TYPES = {
+    "customer_id": "i", "member_id": "i", "visit_id": "i", "day_pass_id": "i", "sale_id": "i",
+    "purchaser_id": "i", "age": "b", "is_active": "b", "date": "i", "join_date": "i",
+    "time": "B", "duration": "h", "item": "b", "pass_type": "b", "price": "d",
+    "guest_id": "i", "guest_number": "b",
+}
+
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def epoch_day(day):
+    # datetime.date -> days since 1970-01-01
+    return int((np.datetime64(day, "D") - EPOCH).astype(int))
+
+
+def typed_frame(columns):
+    # {name: array.array or list} -> DataFrame; typed arrays are wrapped
+    # without copying and category codes become pandas Categoricals
+    data = {}
+    for name, values in columns.items():
+        if isinstance(values, array):
+            values = np.frombuffer(values, dtype=values.typecode) if len(values) else np.array([], values.typecode)
+            if name in CATEGORIES:
+                values = pd.Categorical.from_codes(values, categories=CATEGORIES[name])
+        data[name] = values
+    return pd.DataFrame(data)
+
+
+def column_buffer(names):
+    # Empty typed arrays for rows collected column by column
+    return {name: array(COLUMN_TYPES[name]) if name in COLUMN_TYPES else [] for name in names}
+
+
+def buffer_chunks(columns, chunk_size=None):
+    # Frames of at most chunk_size rows from a filled column_buffer()
+    df = typed_frame(columns)
+    step = chunk_size or max(len(df), 1)
+    for start in range(0, len(df), step):
+        yield df.iloc[start:start + step]
+
+
+def batch_rows(rows, chunk_size=None):
+    # Group an iterator of dict rows into DataFrames of at most chunk_size
+    # rows. Rows are appended straight into one typed array per column, so
+    # a buffered row costs a few bytes per column rather than a dict.
+    columns, count = None, 0
+    for row in rows:
+        if columns is None:
+            columns = column_buffer(row)
+        for name, value in row.items():
+            columns[name].append(value)
+        count += 1
+        if chunk_size and count >= chunk_size:
+            yield typed_frame(columns)
+            columns, count = None, 0
+    if columns is not None:
+        yield typed_frame(columns)
+
+
+def side_chunks(rows, side, chunk_size=None, id_column=None):
+    # Rows a generator appends to the `side` column buffer as it goes (e.g.
+    # the guests of each day pass), as one frame per chunk_size rows of the
+    # generator; `rows` is iterated only for that side effect. The buffer is
+    # emptied after each frame, and id_column numbers the side rows from 1.
+    next_id = 1
+    for _ in batch_rows(rows, chunk_size):
+        count = len(next(iter(side.values())))
+        columns = {id_column: array(COLUMN_TYPES[id_column], range(next_id, next_id + count))} if id_column else {}
+        columns.update((name, values[:]) for name, values in side.items())  # copies
+        for values in side.values():
+            del values[:]
+        next_id += count
+        yield typed_frame(columns)
+
+
+def format_text_columns(df):
+    # Output boundary for CSV: epoch days -> 'YYYY-MM-DD', hours -> 'H:00'.
+    # Each distinct value is formatted once and looked up by position.
+    formatted = {}
+    for column in df.columns:
+        values = df[column]
+        if column in DATE_COLUMNS and pd.api.types.is_integer_dtype(values) and len(values):
+            days = values.to_numpy()
+            first = days.min()
+            labels = (EPOCH + np.arange(first, days.max() + 1)).astype(str)
+            formatted[column] = labels[days - first]
+        elif column in TIME_COLUMNS and pd.api.types.is_integer_dtype(values):
+            labels = np.array([f"{hour}:00" for hour in range(24)])
+            formatted[column] = labels[values.to_numpy()]
+    return df.assign(**formatted) if formatted else df
+
+
+def write_csv_chunks(path, chunks):
+    # First chunk creates the file with a header, later chunks are appended
+    rows = 0
+    for i, chunk in enumerate(chunks):
+        format_text_columns(chunk).to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        rows += len(chunk)
+    return rows
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.ipc
+    except ImportError as exc:
+        raise ImportError("Parquet/Arrow files need pyarrow: pip install pyarrow") from exc
+    return pyarrow
+
+
+def to_arrow(df):
+    pa = import_pyarrow()
+    arrays, names = [], []
+    for column in df.columns:
+        values = df[column]
+        if column in DATE_COLUMNS and pd.api.types.is_integer_dtype(values):
+            # epoch days are already date32's representation
+            array = pa.array(values.to_numpy().astype("int32", copy=False)).view(pa.date32())
+        elif column in DATE_COLUMNS:
+            array = pa.array(values.astype(str)).cast(pa.date32())
+        elif column in TIME_COLUMNS and pd.api.types.is_integer_dtype(values):
+            array = pa.array(values.to_numpy().astype("int32") * 3600, type=pa.time32("s"))
+        elif column in TIME_COLUMNS:
+            # "19:00" -> seconds since midnight
+            parts = values.astype(str).str.split(":", expand=True).astype(int)
+            array = pa.array((parts[0] * 3600 + parts[1] * 60).astype("int32"), type=pa.time32("s"))
+        elif column in CATEGORIES:
+            if isinstance(values.dtype, pd.CategoricalDtype) and list(values.cat.categories) == CATEGORIES[column]:
+                codes = values.cat.codes.to_numpy()
+            else:
+                codes = pd.Categorical(values.astype(str), categories=CATEGORIES[column]).codes
+            # Missing values (e.g. item on an event that isn't a sale) stay null
+            missing = values.isna().to_numpy()
+            if (codes[~missing] < 0).any():
+                unknown = sorted(set(values.dropna().astype(str)) - set(CATEGORIES[column]))
+                raise ValueError(f"Unknown {column} values {unknown}; add them to dataset_io.CATEGORIES")
+            array = pa.DictionaryArray.from_arrays(pa.array(codes, mask=missing, type=pa.int8()),
+                                                   pa.array(CATEGORIES[column]))
+        else:
+            array = pa.array(values.to_numpy() if values.dtype != object else values)
+        arrays.append(array)
+        names.append(column)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def write_chunks(path, chunks, fmt="csv"):
+    if fmt == "csv":
+        return write_csv_chunks(path, chunks)
+    pa = import_pyarrow()
+    rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            table = to_arrow(chunk)
+            if writer is None:
+                if fmt == "parquet":
+                    writer = pa.parquet.ParquetWriter(path, table.schema, compression="zstd")
+                else:
+                    writer = pa.ipc.new_file(path, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def merge_parts(path, parts, fmt="csv"):
+    # Concatenate part files, in the given order, into one file at path.
+    # The header / schema comes from the parts, so there must be at least one
+    if not parts:
+        raise ValueError(f"No part files to merge into {path}")
+    if fmt == "csv":
+        with open(path, "wb") as out:
+            for i, part in enumerate(parts):
+                with open(part, "rb") as f:
+                    if i > 0:
+                        f.readline()  # every part starts with the same header
+                    shutil.copyfileobj(f, out)
+        return
+    pa = import_pyarrow()
+    writer = None
+    try:
+        for part in parts:
+            if fmt == "parquet":
+                table = pa.parquet.read_table(part, memory_map=True)
+            else:
+                table = pa.ipc.open_file(pa.memory_map(str(part))).read_all()
+            if writer is None:
+                if fmt == "parquet":
+                    writer = pa.parquet.ParquetWriter(path, table.schema, compression="zstd")
+                else:
+                    writer = pa.ipc.new_file(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+# Comparisons accepted in read_table(filters=[(column, op, value), ...]):
+# op -> (pandas Series method, pyarrow.compute function)
+FILTER_OPS = {"==": ("eq", "equal"), "!=": ("ne", "not_equal"), ">": ("gt", "greater"),
+              ">=": ("ge", "greater_equal"), "<": ("lt", "less"), "<=": ("le", "less_equal")}
+
+
+def read_table(path, columns=None, fmt=None, memory_map=True, filters=None):
+    # Read a dataset file into a DataFrame, optionally just some columns.
+    # Columnar files are memory-mapped, so unused columns are never touched.
+    # filters keeps only the rows matching every (column, op, value); Parquet
+    # skips row groups whose min/max rule them out, Arrow filters batch by batch
+    fmt = fmt or next((f for f, ext in EXTENSIONS.items() if str(path).endswith(ext)), "csv")
+    if fmt == "csv":
+        df = pd.read_csv(path, usecols=columns)
+        for column, op, value in filters or []:
+            df = df[getattr(df[column], FILTER_OPS[op][0])(value)]
+        return df
+    pa = import_pyarrow()
+    if filters:
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+        expression = None
+        for column, op, value in filters:
+            term = getattr(pc, FILTER_OPS[op][1])(pc.field(column), value)
+            expression = term if expression is None else expression & term
+        dataset = ds.dataset(str(path), format="parquet" if fmt == "parquet" else "ipc")
+        table = dataset.to_table(columns=columns, filter=expression)
+    elif fmt == "parquet":
+        table = pa.parquet.read_table(path, columns=columns, memory_map=memory_map)
+    else:
+        source = pa.memory_map(str(path)) if memory_map else pa.OSFile(str(path))
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+    return table.to_pandas(date_as_object=False)
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in bytes on macOS and in KiB on Linux
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
@@ -0,0 +1,214 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# -------------------------------------------------------
+# Database connections
+#   - "sqlserver": the SQL Server instance the gym runs on (FreeTDS driver)
+#   - "sqlite" / "duckdb": local file databases used as stand-ins, so the
+#     loaders can run and be timed without a SQL Server
+#   - Settings come from CLIMBING_DB_* environment variables, defaulting to
+#     the local FreeTDS setup below
+#   - ConnectionPool hands out reusable connections: pinged before reuse
+#     when they've sat idle, reopened with backoff when the server drops
+# -------------------------------------------------------
+
+# SQLSERVER_CONN_STR = (
+#     "DRIVER={ODBC Driver 18 for SQL Server};"
+#     "SERVER=ZAPDOS\\MOLTRES;"
+#     "DATABASE=test_db;"
+#     "UID=climbing_user;"
+#     "PWD=hoosierheights;"
+#     "TrustServerCertificate=yes;"
+#     "Encrypt=yes;"
+# )
+
+SQLSERVER_SETTINGS = {
+    "DRIVER": os.environ.get("CLIMBING_DB_DRIVER", "/opt/homebrew/lib/libtdsodbc.so"),
+    "SERVER": os.environ.get("CLIMBING_DB_SERVER", "127.0.0.1"),  # or your IP like '192.168.1.xxx'
+    "PORT": os.environ.get("CLIMBING_DB_PORT", "1433"),
+    "DATABASE": os.environ.get("CLIMBING_DB_NAME", "test_db"),
+    "UID": os.environ.get("CLIMBING_DB_USER", "climbing_user"),
+    "PWD": os.environ.get("CLIMBING_DB_PASSWORD", "hoosierheights"),
+    "TDS_Version": os.environ.get("CLIMBING_DB_TDS_VERSION", "7.4"),
+}
+
+SQLSERVER_CONN_STR = "".join(f"{key}={value};" for key, value in SQLSERVER_SETTINGS.items())
+
+BACKENDS = ("sqlserver", "sqlite", "duckdb")
+DEFAULT_BACKEND = os.environ.get("CLIMBING_DB_BACKEND", "sqlserver")
+DEFAULT_LOCAL_DATABASE = {
+    "sqlite": os.environ.get("CLIMBING_DB_PATH", "climbing_gym.sqlite"),
+    "duckdb": os.environ.get("CLIMBING_DB_PATH", "climbing_gym.duckdb"),
+}
+
+# sqlite3 keeps this many prepared statements per connection, so repeated
+# SQL (batched inserts, catalog queries) skips re-parsing
+SQLITE_STATEMENT_CACHE = 256
+
+CONNECT_ATTEMPTS = 5
+CONNECT_BACKOFF = 0.5  # seconds, doubled after every failed attempt
+
+
+def connect(backend=DEFAULT_BACKEND, database=None):
+    if backend == "sqlserver":
+        import pyodbc
+        conn_str = SQLSERVER_CONN_STR
+        if database:
+            conn_str = conn_str.replace(f"DATABASE={SQLSERVER_SETTINGS['DATABASE']};", f"DATABASE={database};")
+        return pyodbc.connect(conn_str)
+    if backend == "sqlite":
+        # Pooled connections move between threads; wait on SQLite's writer lock
+        return sqlite3.connect(database or DEFAULT_LOCAL_DATABASE["sqlite"], timeout=60, check_same_thread=False,
+                               cached_statements=SQLITE_STATEMENT_CACHE)
+    if backend == "duckdb":
+        import duckdb
+        return duckdb.connect(database or DEFAULT_LOCAL_DATABASE["duckdb"])
+    raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+
+
+def connect_with_retry(backend=DEFAULT_BACKEND, database=None, attempts=CONNECT_ATTEMPTS, backoff=CONNECT_BACKOFF):
+    # Exponential backoff for a server that's restarting or briefly unreachable
+    for attempt in range(attempts):
+        try:
+            return connect(backend, database)
+        except (ValueError, ImportError):
+            raise  # misconfiguration, not a flaky server
+        except Exception as exc:
+            if attempt == attempts - 1:
+                raise
+            delay = backoff * 2 ** attempt
+            print(f"⚠️ Connecting to {backend} failed ({exc}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def ping(conn):
+    # Cheap round trip that fails if the connection is no longer usable
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+def query_frame(conn, sql, params=()):
+    # Run a SELECT on any backend and return the result as a DataFrame
+    import pandas as pd
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    columns = [col[0] for col in cursor.description]
+    rows = cursor.fetchall()
+    cursor.close()
+    return pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns)
+
+
+def backend_name(conn):
+    # Work out the backend from the connection's driver module
+    module = type(conn).__module__.split(".")[0]
+    if module == "pyodbc":
+        return "sqlserver"
+    if module in ("sqlite3", "_sqlite3"):
+        return "sqlite"
+    if module in ("duckdb", "_duckdb"):
+        return "duckdb"
+    raise ValueError(f"Unsupported connection type {type(conn)!r}")
+
+
+class ConnectionPool:
+    # Hands out up to `size` connections to one database. Connections are
+    # opened lazily and reused, so parallel loaders don't reconnect per task.
+    # A connection idle for longer than check_after seconds is pinged before
+    # it's handed out again, and replaced if the ping fails.
+    def __init__(self, backend=DEFAULT_BACKEND, database=None, size=4, check_after=30.0,
+                 attempts=CONNECT_ATTEMPTS, backoff=CONNECT_BACKOFF):
+        self.backend = backend
+        self.database = database
+        self.size = size
+        self.check_after = check_after
+        self.attempts = attempts
+        self.backoff = backoff
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._released_at = {}
+        self._lock = threading.Lock()
+
+    def _open(self):
+        return connect_with_retry(self.backend, self.database, self.attempts, self.backoff)
+
+    def _healthy(self, conn):
+        idle = time.monotonic() - self._released_at.get(id(conn), time.monotonic())
+        return idle < self.check_after or ping(conn)
+
+    def acquire(self, timeout=None):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    if len(self._all) < self.size:
+                        conn = self._open()
+                        self._all.append(conn)
+                        return conn
+                conn = self._idle.get(timeout=timeout)
+            if conn is None:
+                continue  # a discarded connection's slot is free again
+            if not self._healthy(conn):
+                print(f"⚠️ Dropped a dead {self.backend} connection; reconnecting")
+                self.discard(conn)
+                continue
+            return conn
+
+    def discard(self, conn):
+        # Forget a broken connection and wake a waiter to open a new one
+        with self._lock:
+            if conn in self._all:
+                self._all.remove(conn)
+            self._released_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._idle.put(None)
+
+    def release(self, conn):
+        self._released_at[id(conn)] = time.monotonic()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            # A failed statement leaves the connection usable once rolled
+            # back; a dead one is dropped instead of going back to the pool
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            if ping(conn):
+                self.release(conn)
+            else:
+                self.discard(conn)
+            raise
+        self.release(conn)
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all = []
+            self._released_at = {}
+            self._idle = queue.LifoQueue()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
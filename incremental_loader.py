@@ -0,0 +1,195 @@
+import time
+import pandas as pd
+from db import backend_name, query_frame
+from bulk_loader import DEFAULT_BATCH_SIZE, insert_dataframe, prepare_table
+from dataset_io import read_table
+from member_features import FEATURE_SOURCES, build_member_features
+from rollups import ROLLUP_KEYS, rebuild_rollups, rollup_frames
+from sketches import SKETCH_TABLE, SKETCHES, merged_sketch_rows
+from schema import DATE_COLUMNS, FOREIGN_KEY_COLUMNS, PRIMARY_KEYS, ROLLUP_TABLES, TABLES, create_tables, data_file
+from table_versions import bump_table_versions, create_table_versions, read_table_versions
+
+# -------------------------------------------------------
+# Incremental, watermark-based loading
+#   - Load_Watermarks keeps the highest id / date loaded into each table
+#   - A refresh only upserts rows past the watermark id (ids only grow, so
+#     those are exactly the new rows) plus rows whose mutable columns
+#     changed, so cost follows the delta
+#   - Upserts are set-based: the delta goes to a staging table, then one
+#     MERGE (SQL Server) or UPDATE ... FROM + INSERT (SQLite/DuckDB)
+#   - Re-running with the same input changes nothing
+#   - Rows new to Visits / Sales are added into the rollups (rollups.py)
+#     and merged into their days' sketches (sketches.py); member features
+#     are rebuilt when their source tables changed
+# -------------------------------------------------------
+
+# Columns of already-loaded rows that can change between loads. These tables
+# are small, so changed rows are found by comparing with what's in the DB.
+MUTABLE_COLUMNS = {"Members": ["is_active"]}
+
+READ_CHUNK_ROWS = 200_000
+
+
+def read_watermarks(conn):
+    create_tables(conn, ["Load_Watermarks"], if_not_exists=True)
+    df = query_frame(conn, "SELECT table_name, max_id, max_date FROM Load_Watermarks")
+    return {row.table_name: (row.max_id, None if pd.isnull(row.max_date) else str(row.max_date))
+            for row in df.itertuples(index=False)}
+
+
+def record_watermarks(conn, tables=TABLES):
+    # Watermarks come from the loaded tables themselves, so they're right
+    # after a full reload too
+    create_tables(conn, ["Load_Watermarks"], if_not_exists=True)
+    marks = []
+    for table in tables:
+        date_col = DATE_COLUMNS[table]
+        max_date = f"MAX({date_col})" if date_col else "NULL"
+        df = query_frame(conn, f"SELECT MAX({PRIMARY_KEYS[table]}) AS max_id, {max_date} AS max_date FROM {table}")
+        max_id, max_date = df.iloc[0]
+        marks.append({"table_name": table, "max_id": None if pd.isnull(max_id) else int(max_id),
+                      "max_date": None if pd.isnull(max_date) else str(max_date)})
+    upsert_dataframe(conn, "Load_Watermarks", pd.DataFrame(marks), key="table_name")
+
+
+def stored_values(conn, table):
+    # {column: DataFrame of key, column} for the columns of table that can
+    # change in place, read once per load
+    key = PRIMARY_KEYS[table]
+    return {column: query_frame(conn, f"SELECT {key}, {column} FROM {table}")
+            for column in MUTABLE_COLUMNS.get(table, [])}
+
+
+def select_delta(table, df, watermark, stored=None):
+    # Ids only grow, so rows past the watermark id are exactly the new ones;
+    # an older row is only picked up when a mutable column really changed
+    if watermark is None or watermark[0] is None:
+        return df
+    key = PRIMARY_KEYS[table]
+    mask = (df[key] > watermark[0]).to_numpy().copy()
+    for column, current in (stored or {}).items():
+        merged = df[[key, column]].merge(current, on=key, how="left", suffixes=("", "_db"))
+        mask |= merged[column].astype(int).ne(merged[f"{column}_db"].fillna(-1).astype(int)).to_numpy()
+    return df[mask]
+
+
+def read_delta(conn, table, watermark, fmt="csv"):
+    # The file holds the full history; read it in chunks (CSV) or push the
+    # watermark into the Parquet/Arrow read, so only the delta is loaded.
+    # Tables with mutable columns are small and compared in full.
+    stored = stored_values(conn, table)
+    if fmt == "csv":
+        chunks = pd.read_csv(data_file(table), chunksize=READ_CHUNK_ROWS)
+    elif stored or watermark is None or watermark[0] is None:
+        chunks = [read_table(data_file(table, fmt), fmt=fmt)]
+    else:
+        chunks = [read_table(data_file(table, fmt), fmt=fmt, filters=[(PRIMARY_KEYS[table], ">", watermark[0])])]
+    deltas = [select_delta(table, prepare_table(table, chunk), watermark, stored) for chunk in chunks]
+    return pd.concat(deltas, ignore_index=True) if deltas else pd.DataFrame()
+
+
+def upsert_dataframe(conn, table, df, key=None, batch_size=DEFAULT_BATCH_SIZE, accumulate=False):
+    # key is a column or a list of columns; with accumulate, matched rows have
+    # the staged values added to theirs instead of replaced (rollup counters)
+    backend = backend_name(conn)
+    key = key or PRIMARY_KEYS[table]
+    keys = [key] if isinstance(key, str) else list(key)
+    columns = list(df.columns)
+    col_list = ", ".join(columns)
+    stage = f"#stage_{table}" if backend == "sqlserver" else f"stage_{table}"
+    cursor = conn.cursor()
+
+    # A session temp table on SQL Server; a plain table elsewhere, since
+    # DuckDB cursors are separate connections that can't see temp tables
+    cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+    if backend == "sqlserver":
+        cursor.execute(f"SELECT {col_list} INTO {stage} FROM {table} WHERE 1 = 0")
+    else:
+        cursor.execute(f"CREATE TABLE {stage} AS SELECT {col_list} FROM {table} WHERE 1 = 0")
+    insert_dataframe(conn, stage, df, batch_size)
+
+    # A row's references never change, and leaving the FK columns alone lets
+    # DuckDB update in place instead of delete + insert
+    updates = [c for c in columns if c not in keys and c not in FOREIGN_KEY_COLUMNS.get(table, [])]
+
+    def added(target, c):
+        # Money sums are rounded to the cent as they accumulate: SQLite keeps
+        # DECIMAL as a float, and unrounded sums would drift from a rebuild
+        total = f"{target}.{c} + s.{c}"
+        return f"ROUND({total}, 2)" if pd.api.types.is_float_dtype(df[c]) else total
+
+    if backend == "sqlserver":
+        assignments = ", ".join(f"t.{c} = {added('t', c)}" if accumulate else f"t.{c} = s.{c}" for c in updates)
+        cursor.execute(f"""
+MERGE {table} AS t
+USING {stage} AS s ON {" AND ".join(f"t.{k} = s.{k}" for k in keys)}
+WHEN MATCHED THEN UPDATE SET {assignments}
+WHEN NOT MATCHED THEN INSERT ({col_list}) VALUES ({", ".join(f"s.{c}" for c in columns)});
+""")
+    else:
+        # UPDATE ... FROM then INSERT the missing keys, rather than ON CONFLICT:
+        # DuckDB runs ON CONFLICT updates as delete + insert, which trips the
+        # foreign keys that point at parent tables like Members
+        assignments = ", ".join(f"{c} = {added(table, c)}" if accumulate else f"{c} = s.{c}" for c in updates)
+        cursor.execute(f"""
+UPDATE {table} SET {assignments}
+FROM {stage} AS s WHERE {" AND ".join(f"{table}.{k} = s.{k}" for k in keys)}
+""")
+        cursor.execute(f"""
+INSERT INTO {table} ({col_list})
+SELECT {col_list} FROM {stage} AS s
+WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE {" AND ".join(f"t.{k} = s.{k}" for k in keys)})
+""")
+    cursor.execute(f"DROP TABLE {stage}")
+    conn.commit()
+    cursor.close()
+    return len(df)
+
+
+def new_rows(table, delta, watermark):
+    # Only ids past the watermark are rows the rollups haven't counted yet;
+    # the rest of the delta are changed Members rows
+    if watermark is None or watermark[0] is None:
+        return delta
+    return delta[delta[PRIMARY_KEYS[table]] > watermark[0]]
+
+
+def apply_rollups(conn, table, rows, batch_size=DEFAULT_BATCH_SIZE):
+    touched = []
+    for rollup, frame in rollup_frames(table, rows).items():
+        if len(frame):
+            upsert_dataframe(conn, rollup, frame, key=ROLLUP_KEYS[rollup], batch_size=batch_size, accumulate=True)
+            touched.append(rollup)
+    if table in SKETCHES and len(rows):
+        # Sketches merge rather than add up, so the stored days are replaced
+        upsert_dataframe(conn, SKETCH_TABLE, merged_sketch_rows(conn, table, rows), key=["sketch_date", "metric"],
+                         batch_size=batch_size)
+        touched.append(SKETCH_TABLE)
+    return touched
+
+
+def load_incremental(conn, tables=TABLES, batch_size=DEFAULT_BATCH_SIZE, fmt="csv"):
+    create_tables(conn, tables, if_not_exists=True)
+    create_table_versions(conn)
+    watermarks = read_watermarks(conn)
+    # Rollups that were never built can't take deltas; rebuild them afterwards
+    versions = read_table_versions(conn, ROLLUP_TABLES + [SKETCH_TABLE, "Member_Features"])
+    rollups_built = all(versions[rollup] for rollup in ROLLUP_TABLES + [SKETCH_TABLE])
+    stats = {}
+    touched = set()
+    for table in tables:
+        started = time.perf_counter()
+        delta = read_delta(conn, table, watermarks.get(table), fmt)
+        rows = upsert_dataframe(conn, table, delta, batch_size=batch_size) if len(delta) else 0
+        if rows and rollups_built:
+            touched.update(apply_rollups(conn, table, new_rows(table, delta, watermarks.get(table)), batch_size))
+        seconds = time.perf_counter() - started
+        stats[table] = {"rows": rows, "seconds": seconds}
+        print(f"Loading {table}: {rows} new/changed rows upserted in {seconds:.2f}s")
+    record_watermarks(conn, tables)
+    bump_table_versions(conn, [table for table in tables if stats[table]["rows"]] + sorted(touched))
+    if not rollups_built:
+        rebuild_rollups(conn, batch_size)
+    if not versions["Member_Features"] or any(stats.get(table, {}).get("rows") for table in FEATURE_SOURCES):
+        build_member_features(conn)
+    return stats
@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+from db import BACKENDS, DEFAULT_BACKEND, ConnectionPool
+from query_runner import QueryCache, QueryRunner
+from query_stats import QueryInstrumentation
+from sketches import approximate_kpis
+
+# -------------------------------------------------------
+# Local HTTP/JSON KPI service over the queries/ catalog
+#   - asyncio front end; queries run on a bounded pool of DB worker threads,
+#     one pooled connection each, so a burst of tiles runs side by side
+#     instead of one after another
+#   - Single flight: while a KPI is being computed, every other request for
+#     it waits on the same run instead of starting its own
+#   - Stale while revalidate: results older than --ttl are still served
+#     (marked stale) while one background refresh replaces them; only
+#     results older than --max-stale make the caller wait
+#   - Refreshes go through QueryRunner's version-aware cache, so a KPI
+#     whose tables haven't changed is re-served without querying again
+#   - Stdlib only; GET /kpis, /kpis/<name>, /dashboard?names=a,b, /stats,
+#     /metrics (query timings in Prometheus text format) and
+#     /approx?since=YYYY-MM-DD&until=YYYY-MM-DD (sketch-based estimates
+#     with error bounds, see sketches.py)
+# -------------------------------------------------------
+
+DEFAULT_PORT = 8050
+
+KPIResult = namedtuple("KPIResult", "name payload fetched_at seconds")
+
+
+class KPIService:
+    def __init__(self, pool, workers=4, ttl=30.0, max_stale=600.0, cache=None):
+        self.instrument = QueryInstrumentation()
+        self.runner = QueryRunner(pool, cache if cache is not None else QueryCache(), instrument=self.instrument)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kpi-db")
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.results = {}   # name -> latest KPIResult
+        self.inflight = {}  # name -> asyncio.Task computing it
+        self.stats = Counter()
+
+    def _fetch(self, name):
+        # Worker thread: run the query and serialize it once for every reader
+        result = self.runner.run(name)
+        payload = json.loads(result.frame.to_json(orient="split", index=False, date_format="iso"))
+        return KPIResult(name, payload, time.time(), result.seconds), result.cached
+
+    async def _refresh(self, name):
+        loop = asyncio.get_running_loop()
+        result, cached = await loop.run_in_executor(self.executor, self._fetch, name)
+        self.stats["cache_hits" if cached else "db_queries"] += 1
+        self.results[name] = result
+        return result
+
+    def _refresh_done(self, name, task):
+        self.inflight.pop(name, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["errors"] += 1
+
+    def refresh(self, name):
+        # The running refresh of `name`, starting one if there is none
+        task = self.inflight.get(name)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            return task
+        task = asyncio.get_running_loop().create_task(self._refresh(name))
+        task.add_done_callback(lambda t: self._refresh_done(name, t))
+        self.inflight[name] = task
+        return task
+
+    async def get(self, name):
+        # -> (KPIResult, stale)
+        if name not in self.runner.catalog:
+            raise KeyError(name)
+        self.stats["requests"] += 1
+        entry = self.results.get(name)
+        age = time.time() - entry.fetched_at if entry else None
+        if entry and age < self.ttl:
+            return entry, False
+        if entry and age < self.max_stale:
+            self.stats["stale_served"] += 1
+            self.refresh(name)
+            return entry, True
+        # shield: a client hanging up must not cancel a run others wait on
+        return await asyncio.shield(self.refresh(name)), False
+
+    def describe(self, result, stale):
+        return {"name": result.name, "stale": stale, "age_s": round(time.time() - result.fetched_at, 3),
+                "query_ms": round(result.seconds * 1000, 1), **result.payload}
+
+    async def kpi(self, name):
+        result, stale = await self.get(name)
+        return self.describe(result, stale)
+
+    async def dashboard(self, names):
+        # Every tile at once; a failing tile reports its error, the rest load
+        results = await asyncio.gather(*(self.get(name) for name in names), return_exceptions=True)
+        tiles = {}
+        for name, result in zip(names, results):
+            if isinstance(result, KeyError):
+                tiles[name] = {"error": f"unknown KPI {name!r}"}
+            elif isinstance(result, Exception):
+                tiles[name] = {"error": str(result)}
+            else:
+                tiles[name] = self.describe(*result)
+        return tiles
+
+    def _approximate(self, since, until):
+        started = time.perf_counter()
+        with self.runner.pool.connection() as conn:
+            kpis = approximate_kpis(conn, since, until)
+        return {"since": since, "until": until, "query_ms": round((time.perf_counter() - started) * 1000, 1),
+                "kpis": kpis}
+
+    async def approximate(self, since=None, until=None):
+        # A few ms of sketch merging: no result cache or single flight needed
+        self.stats["approx_queries"] += 1
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._approximate, since, until)
+
+    async def warm(self):
+        await asyncio.gather(*(self.refresh(name) for name in self.runner.catalog), return_exceptions=True)
+
+    # ---------- HTTP ----------
+
+    async def route(self, method, target):
+        if method != "GET":
+            return 405, {"error": "only GET is supported"}
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        if parts == ["kpis"]:
+            return 200, {"kpis": list(self.runner.catalog)}
+        if len(parts) == 2 and parts[0] == "kpis":
+            try:
+                return 200, await self.kpi(parts[1])
+            except KeyError:
+                return 404, {"error": f"unknown KPI {parts[1]!r}"}
+        if parts == ["dashboard"]:
+            names = parse_qs(url.query).get("names")
+            names = [n for value in names for n in value.split(",") if n] if names else list(self.runner.catalog)
+            return 200, await self.dashboard(names)
+        if parts == ["stats"]:
+            return 200, {**self.stats, "inflight": len(self.inflight), "cached_kpis": len(self.results)}
+        if parts == ["metrics"]:
+            return 200, self.instrument.prometheus()
+        if parts == ["approx"]:
+            query = parse_qs(url.query)
+            try:
+                since, until = (date.fromisoformat(query[key][0]).isoformat() if key in query else None
+                                for key in ("since", "until"))
+            except ValueError:
+                return 400, {"error": "since / until must be YYYY-MM-DD"}
+            return 200, await self.approximate(since, until)
+        return 404, {"error": f"no route for {url.path}"}
+
+    async def handle(self, reader, writer):
+        # One request per connection, then close
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass  # headers aren't used
+            if len(request_line) < 2:
+                status, body = 400, {"error": "bad request"}
+            else:
+                try:
+                    status, body = await self.route(request_line[0], request_line[1])
+                except Exception as exc:
+                    status, body = 500, {"error": str(exc)}
+            if isinstance(body, str):
+                data, content_type = body.encode(), "text/plain; version=0.0.4"
+            else:
+                data, content_type = json.dumps(body).encode(), "application/json"
+            reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}.get(status, "Error")
+            writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT, warm=False):
+        if warm:
+            await self.warm()
+            print(f"Warmed {len(self.results)} KPIs")
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"✅ KPI service on http://{host}:{port}/ ({len(self.runner.catalog)} KPIs)")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the query catalog as JSON KPIs.")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--database", default=None, help="database file for the sqlite/duckdb backends")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=4, help="DB worker threads / pooled connections")
+    parser.add_argument("--ttl", type=float, default=30.0, help="seconds a result is served as fresh")
+    parser.add_argument("--max-stale", type=float, default=600.0,
+                        help="seconds a result may still be served while it refreshes")
+    parser.add_argument("--warm", action="store_true", help="compute every KPI before accepting requests")
+    args = parser.parse_args()
+
+    with ConnectionPool(args.backend, args.database, size=args.workers) as pool:
+        service = KPIService(pool, args.workers, args.ttl, args.max_stale)
+        try:
+            asyncio.run(service.serve(args.host, args.port, args.warm))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            service.executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+import argparse
+import json
+import os
+import time
+from collections import deque
+from datetime import date
+import numpy as np
+import pandas as pd
+import data_generation_2
+from benchmark import percentile
+from bulk_loader import DEFAULT_BATCH_SIZE, insert_dataframe
+from dataset_io import CATEGORIES, read_table
+from db import BACKENDS, DEFAULT_BACKEND, backend_name, connect_with_retry, query_frame
+from incremental_loader import apply_rollups, record_watermarks
+from member_features import FEATURE_SOURCES, build_member_features
+from partitions import add_months, frame_months, is_partitioned
+from pipeline import load_frame
+from rollups import SOURCE_COLUMNS
+from schema import PARTITIONED_TABLES, PRIMARY_KEYS, ROLLUP_TABLES
+from sketches import SKETCH_TABLE
+from table_versions import bump_table_versions, create_table_versions, read_table_versions
+
+# -------------------------------------------------------
+# Live check-in events
+#   - Consumes the time-ordered event stream of data_generation_2 (made
+#     in-process from the loaded Customers / Members, or replayed from an
+#     --events file) in micro-batches: a batch closes at --batch-events
+#     events or once its first event has waited --max-wait seconds
+#   - Each batch's visits, day passes, guests and sales are bulk inserted,
+#     with ids continuing past the rows already loaded
+#   - LiveKPIs is updated from the same batches in memory, never by
+#     querying: current occupancy, today's visits by hour (next to the
+#     weekday's expected curve) and revenue over a rolling window
+#   - Rollups, sketches, watermarks and table versions catch up every
+#     --refresh-interval seconds rather than per batch
+#   - --rate replays the stream at N events/sec to check that rate can be
+#     sustained; without it events go in as fast as the database takes them
+# -------------------------------------------------------
+
+DEFAULT_BATCH_EVENTS = 1_000
+DEFAULT_MAX_WAIT = 0.25
+DEFAULT_REFRESH_INTERVAL = 5.0
+DEFAULT_WINDOW_MINUTES = 60
+
+# Rows each kind of event inserts, parents before children
+EVENT_TABLES = ["Visits", "Day_Passes", "Day_Pass_Guests", "Sales"]
+KIND_CODES = {kind: code for code, kind in enumerate(data_generation_2.EVENT_KINDS)}
+ID_TABLES = {"visit_id": "Visits", "day_pass_id": "Day_Passes", "guest_id": "Day_Pass_Guests", "sale_id": "Sales"}
+
+
+# ---------- events -> table rows ----------
+
+def stream_state(conn):
+    # What the stream continues from: the next id of every event table and
+    # the customer ages / member active flags the generator draws from
+    first_ids = {}
+    for key, table in ID_TABLES.items():
+        max_id = query_frame(conn, f"SELECT MAX({PRIMARY_KEYS[table]}) AS max_id FROM {table}")["max_id"].iloc[0]
+        first_ids[key] = 1 if pd.isnull(max_id) else int(max_id) + 1
+    ages = query_frame(conn, "SELECT age FROM Customers ORDER BY customer_id")["age"].to_numpy(np.int8)
+    active = query_frame(conn, "SELECT is_active FROM Members ORDER BY member_id")["is_active"].to_numpy(np.int8)
+    return first_ids, ages, active
+
+
+def read_events(path):
+    # An events file from data_generation_2.py --events, with the category
+    # columns restored
+    events = read_table(path)
+    events["kind"] = pd.Categorical(events["kind"].astype(str), categories=data_generation_2.EVENT_KINDS)
+    for name, categories in CATEGORIES.items():
+        events[name] = pd.Categorical(events[name], categories=categories)
+    return events
+
+
+def renumber(events, first_ids):
+    # Shift a replayed file's ids (which start at 1) past the loaded rows
+    events = events.copy()
+    kind = events["kind"]
+    guest_shift = first_ids["guest_id"] - events.loc[kind == "guest", "id"].min() if (kind == "guest").any() else 0
+    for event_kind, key in data_generation_2.EVENT_IDS.items():
+        mask = kind == event_kind
+        if mask.any():
+            shift = first_ids[key] - events.loc[mask, "id"].min()
+            events.loc[mask, "id"] += shift
+            if event_kind == "check_in":
+                events.loc[(kind == "check_out") & (events["member_id"] > 0), "id"] += shift
+            elif event_kind == "day_pass":
+                events.loc[kind == "guest", "day_pass_id"] += shift
+    events.loc[(kind == "check_out") & (events["member_id"] == 0), "id"] += guest_shift
+    return events
+
+
+def event_tables(events):
+    # One micro-batch -> {table: rows} as the loaders insert them
+    kind = events["kind"].to_numpy()
+    ts = events["ts"].to_numpy()
+    day, hour = ts // 86400, ts % 86400 // 3600
+
+    def rows(name, columns):
+        mask = kind == name
+        return pd.DataFrame({column: (source(mask) if callable(source) else events[source].to_numpy()[mask])
+                             for column, source in columns.items()})
+
+    frames = {
+        "Visits": rows("check_in", {"visit_id": "id", "member_id": "member_id", "date": lambda m: day[m],
+                                    "time": lambda m: hour[m], "duration": "duration"}),
+        "Day_Passes": rows("day_pass", {"day_pass_id": "id", "purchaser_id": "customer_id",
+                                        "date": lambda m: day[m], "pass_type": "pass_type"}),
+        "Day_Pass_Guests": rows("guest", {"guest_id": "id", "day_pass_id": "day_pass_id",
+                                          "guest_number": "guest_number", "age": "age"}),
+        "Sales": rows("sale", {"sale_id": "id", "customer_id": "customer_id", "member_id": "member_id",
+                               "date": lambda m: day[m], "item": "item", "price": "price"}),
+    }
+    return {table: load_frame(table, df) for table, df in frames.items() if len(df)}
+
+
+def micro_batches(frames, batch_events=DEFAULT_BATCH_EVENTS, rate=None, max_wait=DEFAULT_MAX_WAIT):
+    # (batch, arrival time of its first event). With a rate, event i arrives
+    # i / rate seconds after the start and a batch is only released once its
+    # last event has arrived; batches never hold more than max_wait of events.
+    size = min(batch_events, max(1, int(rate * max_wait))) if rate else batch_events
+    started = time.perf_counter()
+    seen = 0
+    for frame in frames:
+        for start in range(0, len(frame), size):
+            batch = frame.iloc[start:start + size]
+            if rate:
+                first = started + seen / rate
+                wait = started + (seen + len(batch) - 1) / rate - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            else:
+                first = time.perf_counter()
+            seen += len(batch)
+            yield batch, first
+
+
+# ---------- live KPIs ----------
+
+class LiveKPIs:
+    # Front-desk numbers kept current from the event batches alone
+    def __init__(self, window_minutes=DEFAULT_WINDOW_MINUTES):
+        self.window_minutes = window_minutes
+        self.clock = None  # ts of the latest event
+        self.day = None  # epoch day that "today" is
+        self.events = 0
+        self.occupancy = 0
+        self.peak_occupancy = 0
+        self.visits_by_hour = np.zeros(24, dtype=np.int64)
+        self.guests_today = 0
+        self.revenue_today = 0.0
+        self.window = deque()  # [minute, revenue] of the sales in the window
+        self.rolling_revenue = 0.0
+
+    def _new_day(self, day):
+        self.day = day
+        self.peak_occupancy = self.occupancy
+        self.visits_by_hour[:] = 0
+        self.guests_today = 0
+        self.revenue_today = 0.0
+
+    def _add_day(self, ts, codes, prices):
+        admitted = (codes == KIND_CODES["check_in"]) | (codes == KIND_CODES["guest"])
+        running = self.occupancy + np.cumsum(admitted.astype(np.int64) - (codes == KIND_CODES["check_out"]))
+        self.peak_occupancy = max(self.peak_occupancy, int(running.max()))
+        self.occupancy = int(running[-1])
+        self.visits_by_hour += np.bincount(ts[codes == KIND_CODES["check_in"]] % 86400 // 3600, minlength=24)
+        self.guests_today += int((codes == KIND_CODES["guest"]).sum())
+
+        sales = codes == KIND_CODES["sale"]
+        if sales.any():
+            minutes, inverse = np.unique(ts[sales] // 60, return_inverse=True)
+            revenue = np.bincount(inverse, weights=prices[sales])
+            self.revenue_today += revenue.sum()
+            self.rolling_revenue += revenue.sum()
+            for minute, amount in zip(minutes.tolist(), revenue.tolist()):
+                if self.window and self.window[-1][0] == minute:
+                    self.window[-1][1] += amount
+                else:
+                    self.window.append([minute, amount])
+
+    def update(self, events):
+        if not len(events):
+            return
+        ts = events["ts"].to_numpy()
+        codes = events["kind"].cat.codes.to_numpy()
+        prices = events["price"].to_numpy()
+        days = ts // 86400
+        for day in np.unique(days):  # a batch rarely spans midnight
+            if self.day is None or day > self.day:
+                self._new_day(int(day))
+            mask = days == day
+            self._add_day(ts[mask], codes[mask], prices[mask])
+        self.clock = int(ts[-1])
+        self.events += len(events)
+        # Drop sales that fell out of the window
+        cutoff = self.clock // 60 - self.window_minutes
+        while self.window and self.window[0][0] <= cutoff:
+            self.rolling_revenue -= self.window.popleft()[1]
+        if not self.window:
+            self.rolling_revenue = 0.0
+
+    def expected_by_hour(self):
+        # The weekday's hour curve scaled to the visits so far today: what
+        # the rest of the day looks like if it follows the usual pattern
+        probs = data_generation_2.hour_probabilities((self.day + 3) % 7)
+        hour = self.clock % 86400 // 3600
+        so_far = probs[:hour + 1].sum()
+        return probs * (self.visits_by_hour.sum() / so_far if so_far else 0)
+
+    def snapshot(self):
+        if self.clock is None:
+            return {"events": 0}
+        return {
+            "as_of": pd.Timestamp(self.clock, unit="s").isoformat(),
+            "events": self.events,
+            "occupancy": self.occupancy,
+            "peak_occupancy_today": self.peak_occupancy,
+            "visits_today": int(self.visits_by_hour.sum()),
+            "visits_by_hour": self.visits_by_hour.tolist(),
+            "expected_by_hour": [round(v, 1) for v in self.expected_by_hour().tolist()],
+            "guests_today": self.guests_today,
+            "revenue_today": round(self.revenue_today, 2),
+            "rolling_revenue": round(max(self.rolling_revenue, 0.0), 2),
+            "window_minutes": self.window_minutes,
+        }
+
+
+def kpi_line(kpis):
+    snap = kpis.snapshot()
+    if not snap["events"]:
+        return "no events yet"
+    return (f"[{snap['as_of'].replace('T', ' ')}] occupancy {snap['occupancy']} "
+            f"(peak {snap['peak_occupancy_today']}), {snap['visits_today']} visits + {snap['guests_today']} "
+            f"guests today, revenue ${snap['revenue_today']:,.2f} today / "
+            f"${snap['rolling_revenue']:,.2f} last {snap['window_minutes']} min")
+
+
+def print_today(kpis):
+    snap = kpis.snapshot()
+    if not snap["events"]:
+        return
+    print(f"Visits by hour on {snap['as_of'][:10]} (expected: the weekday's curve scaled to today so far)")
+    for hour, (visits, expected) in enumerate(zip(snap["visits_by_hour"], snap["expected_by_hour"])):
+        if visits or expected:
+            print(f"  {hour:>2}:00 {visits:>6} {expected:>8.1f}  {'#' * min(60, round(visits / 5))}")
+
+
+def write_snapshot(kpis, path):
+    # Written beside and renamed over, so a reader never sees half a file
+    with open(path + ".tmp", "w") as f:
+        json.dump(kpis.snapshot(), f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+# ---------- consumer ----------
+
+def refresh_derived(conn, pending, changed, rollups_built, batch_size=DEFAULT_BATCH_SIZE):
+    # Visits / Sales rows inserted since the last refresh go into the rollups
+    # and sketches; watermarks and versions follow, so cached KPIs go stale
+    touched = set(changed)
+    if rollups_built:
+        for table, frames in pending.items():
+            if frames:
+                touched.update(apply_rollups(conn, table, pd.concat(frames, ignore_index=True), batch_size))
+    record_watermarks(conn)
+    bump_table_versions(conn, sorted(touched))
+    for frames in pending.values():
+        frames.clear()
+    changed.clear()
+
+
+def consume(conn, frames, kpis, batch_events=DEFAULT_BATCH_EVENTS, rate=None, max_wait=DEFAULT_MAX_WAIT,
+            refresh_interval=DEFAULT_REFRESH_INTERVAL, batch_size=DEFAULT_BATCH_SIZE, progress_interval=2.0,
+            snapshot=None):
+    # frames: time-ordered event frames, e.g. data_generation_2.event_stream()
+    partitioned = backend_name(conn) == "sqlserver" and is_partitioned(conn, "Visits")
+    create_table_versions(conn)
+    versions = read_table_versions(conn, ROLLUP_TABLES + [SKETCH_TABLE])
+    rollups_built = all(versions.values())
+    months = set()
+    pending = {table: [] for table in SOURCE_COLUMNS}  # rows the rollups / sketches haven't seen yet
+    changed = set()
+    rows = dict.fromkeys(EVENT_TABLES, 0)
+    stages = {"insert": 0.0, "kpis": 0.0, "refresh": 0.0}
+    latencies = []
+    lag = 0.0
+
+    started = last_refresh = last_print = time.perf_counter()
+    for batch, arrived in micro_batches(frames, batch_events, rate, max_wait):
+        t0 = time.perf_counter()
+        lag = max(lag, t0 - arrived - (len(batch) - 1) / rate) if rate else lag
+        tables = event_tables(batch)
+        if partitioned:
+            # Events run into a new month: give it a partition before its rows
+            new = {month for table in PARTITIONED_TABLES if table in tables
+                   for month in frame_months(tables[table]["date"])} - months
+            if new:
+                add_months(conn, new)
+                months |= new
+        for table, df in tables.items():
+            rows[table] += insert_dataframe(conn, table, df, batch_size)
+            changed.add(table)
+            if table in pending:
+                pending[table].append(df)
+        t1 = time.perf_counter()
+        kpis.update(batch)
+        t2 = time.perf_counter()
+        stages["insert"] += t1 - t0
+        stages["kpis"] += t2 - t1
+        latencies.append((t2 - arrived) * 1000)
+
+        if t2 - last_refresh >= refresh_interval:
+            refresh_derived(conn, pending, changed, rollups_built, batch_size)
+            last_refresh = time.perf_counter()
+            stages["refresh"] += last_refresh - t2
+        if progress_interval and t2 - last_print >= progress_interval:
+            last_print = t2
+            print(f"  {kpis.events:,} events, {kpis.events / (t2 - started):,.0f}/sec  {kpi_line(kpis)}")
+            if snapshot:
+                write_snapshot(kpis, snapshot)
+
+    t0 = time.perf_counter()
+    stream_seconds = t0 - started
+    refresh_derived(conn, pending, changed, rollups_built, batch_size)
+    if not rollups_built:
+        print("⚠️ Rollups were never built; run rollups.py to build them from the loaded rows.")
+    if any(rows[table] for table in FEATURE_SOURCES if table in rows):
+        build_member_features(conn)
+    stages["refresh"] += time.perf_counter() - t0
+    if snapshot:
+        write_snapshot(kpis, snapshot)
+
+    # events_per_sec covers the stream itself; seconds adds the final refresh
+    stats = {
+        "events": kpis.events, "stream_seconds": stream_seconds, "seconds": time.perf_counter() - started,
+        "events_per_sec": kpis.events / max(stream_seconds, 1e-9), "batches": len(latencies), "rows": rows,
+        "stages": stages, "target_rate": rate, "max_wait": max_wait, "max_lag_seconds": lag if rate else None,
+        "latency_ms": {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95),
+                       "max": max(latencies)} if latencies else None,
+    }
+    return stats
+
+
+def print_stats(stats):
+    print(f"Consumed {stats['events']:,} events in {stats['batches']} micro-batches, {stats['stream_seconds']:.2f}s "
+          f"({stats['events_per_sec']:,.0f} events/sec sustained; {stats['seconds']:.2f}s with the final refresh)")
+    for table, table_rows in stats["rows"].items():
+        print(f"  {table}: {table_rows:,} rows inserted")
+    print("  " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in stats["stages"].items()))
+    if stats["latency_ms"]:
+        latency = stats["latency_ms"]
+        print(f"  Batch latency (first event in -> committed and counted): p50 {latency['p50']:.1f} ms, "
+              f"p95 {latency['p95']:.1f} ms, max {latency['max']:.1f} ms")
+    if stats["target_rate"]:
+        kept_up = stats["max_lag_seconds"] <= stats["max_wait"]
+        print(f"{'✅' if kept_up else '⚠️'} Target {stats['target_rate']:,.0f} events/sec: consumer fell at most "
+              f"{stats['max_lag_seconds'] * 1000:.0f} ms behind the stream")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream check-in events into the database with live KPIs.")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--database", default=None, help="database file for the sqlite/duckdb backends")
+    parser.add_argument("--days", type=int, default=1, help="days of events to generate")
+    parser.add_argument("--start", type=date.fromisoformat, default=None,
+                        help="YYYY-MM-DD the generated stream starts on (default: today)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--events-file", default=None,
+                        help="replay this data_generation_2.py --events file instead of generating; it should "
+                             "come from the same --seed / --scale-factor as the loaded tables")
+    parser.add_argument("--batch-events", type=int, default=DEFAULT_BATCH_EVENTS,
+                        help="most events per micro-batch")
+    parser.add_argument("--max-wait", type=float, default=DEFAULT_MAX_WAIT,
+                        help="with --rate, seconds of events a micro-batch may hold")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="replay at this many events/sec (default: as fast as they can be inserted)")
+    parser.add_argument("--refresh-interval", type=float, default=DEFAULT_REFRESH_INTERVAL,
+                        help="seconds between rollup / sketch / watermark refreshes")
+    parser.add_argument("--window-minutes", type=int, default=DEFAULT_WINDOW_MINUTES,
+                        help="rolling revenue window, in minutes of stream time")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--progress-interval", type=float, default=2.0,
+                        help="seconds between live KPI lines (0 to silence)")
+    parser.add_argument("--snapshot", default=None, help="keep the latest live KPIs in this JSON file")
+    parser.add_argument("--stats", default=None, help="write the throughput summary here as JSON")
+    args = parser.parse_args()
+
+    conn = connect_with_retry(args.backend, args.database)
+    first_ids, ages, active = stream_state(conn)
+    if not len(ages):
+        print("❌ No customers loaded; run data_insert_handling_2.py first.")
+        conn.close()
+        raise SystemExit(1)
+
+    if args.events_file:
+        frames = [renumber(read_events(args.events_file), first_ids)]
+    else:
+        frames = data_generation_2.event_stream(args.seed, args.days, args.start, customer_ages=ages,
+                                                member_active=active, first_ids=first_ids)
+
+    kpis = LiveKPIs(args.window_minutes)
+    stats = consume(conn, frames, kpis, args.batch_events, args.rate, args.max_wait, args.refresh_interval,
+                    args.batch_size, args.progress_interval, args.snapshot)
+    conn.close()
+
+    print_today(kpis)
+    print(kpi_line(kpis))
+    print_stats(stats)
+    if args.stats:
+        with open(args.stats, "w") as f:
+            json.dump(stats, f, indent=2)
+        print(f"Stream stats written to {args.stats}")
+    print(f"✅ Event stream consumed into {args.backend}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import bisect
+import json
+import statistics
+import threading
+import time
+from datetime import datetime
+from benchmark import percentile
+
+# -------------------------------------------------------
+# Loader progress and throughput telemetry
+#   - Time per table and stage: read (file parsing), prepare (type
+#     coercion), convert (DataFrame -> driver values), send (executemany /
+#     INSERT round trips) and commit
+#   - Every batch's latency goes into a fixed-bucket histogram, so batch
+#     and worker settings can be compared between runs
+#   - Progress lines (rows, %, rows/sec, ETA) at most every `interval`
+#     seconds per table; safe to share between loader threads
+#   - summary() / write() give the whole run as JSON
+# -------------------------------------------------------
+
+STAGES = ("read", "prepare", "convert", "send", "commit")
+
+# Upper bounds of the batch latency buckets, in ms; the last one is +Inf
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LoadTelemetry:
+    def __init__(self, interval=2.0, **meta):
+        # meta: run settings recorded with the summary (backend, batch_size, ...)
+        self.interval = interval
+        self.meta = {"started": datetime.now().isoformat(timespec="seconds"), **meta}
+        self.tables = {}
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _table(self, table):
+        if table not in self.tables:
+            self.tables[table] = {"expected": None, "rows": 0, "started": None, "finished": None, "printed": 0.0,
+                                  "stages": dict.fromkeys(STAGES, 0.0), "batches": [],
+                                  "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+        return self.tables[table]
+
+    def expect(self, table, rows):
+        # Rows about to be inserted into table (adds up over key-range parts)
+        with self._lock:
+            entry = self._table(table)
+            entry["expected"] = (entry["expected"] or 0) + rows
+            if entry["started"] is None:
+                entry["started"] = entry["printed"] = time.perf_counter()
+
+    def stage(self, table, stage, seconds):
+        with self._lock:
+            self._table(table)["stages"][stage] += seconds
+
+    def batch(self, table, rows, stages):
+        # One inserted batch: {stage: seconds} of its convert / send / commit
+        now = time.perf_counter()
+        seconds = sum(stages.values())
+        with self._lock:
+            entry = self._table(table)
+            if entry["started"] is None:
+                entry["started"] = entry["printed"] = now - seconds
+            for stage, spent in stages.items():
+                entry["stages"][stage] += spent
+            entry["rows"] += rows
+            entry["finished"] = now
+            entry["batches"].append(seconds * 1000)
+            entry["histogram"][bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+            if self.interval and now - entry["printed"] >= self.interval:
+                entry["printed"] = now
+                print(self._progress_line(table, entry, now))
+
+    @staticmethod
+    def _progress_line(table, entry, now):
+        elapsed = now - entry["started"]
+        rate = entry["rows"] / elapsed if elapsed else 0
+        line = f"  {table}: {entry['rows']:,}"
+        if entry["expected"]:
+            left = max(entry["expected"] - entry["rows"], 0)
+            eta = f"{left / rate:.0f}s" if rate else "?"
+            line += f"/{entry['expected']:,} rows ({entry['rows'] / entry['expected']:.0%}), ETA {eta}"
+        else:
+            line += " rows"
+        return line + f", {rate:,.0f} rows/sec"
+
+    def summary(self):
+        tables, totals = {}, dict.fromkeys(STAGES, 0.0)
+        with self._lock:
+            for table, entry in self.tables.items():
+                seconds = (entry["finished"] - entry["started"]) if entry["finished"] else 0.0
+                batches = entry["batches"]
+                labels = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ["le_inf"]
+                tables[table] = {
+                    "rows": entry["rows"],
+                    "seconds": seconds,
+                    "rows_per_sec": entry["rows"] / seconds if seconds else None,
+                    "stages": {stage: round(spent, 6) for stage, spent in entry["stages"].items()},
+                    "batches": {
+                        "count": len(batches),
+                        "p50_ms": statistics.median(batches) if batches else None,
+                        "p95_ms": percentile(batches, 95) if batches else None,
+                        "max_ms": max(batches) if batches else None,
+                        "histogram": {label: n for label, n in zip(labels, entry["histogram"]) if n},
+                    },
+                }
+                for stage, spent in entry["stages"].items():
+                    totals[stage] += spent
+        seconds = time.perf_counter() - self._started
+        rows = sum(stats["rows"] for stats in tables.values())
+        return {"meta": self.meta, "tables": tables,
+                "total": {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds else None,
+                          "stages": {stage: round(spent, 6) for stage, spent in totals.items()}}}
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"{'table':<16} {'rows':>10} {'rows/sec':>11} " + " ".join(f"{s:>8}" for s in STAGES)
+              + f" {'batch p50':>10} {'p95':>8}")
+        for table, stats in summary["tables"].items():
+            batches = stats["batches"]
+            p50 = f"{batches['p50_ms']:.1f}ms" if batches["count"] else "-"
+            p95 = f"{batches['p95_ms']:.1f}ms" if batches["count"] else "-"
+            print(f"{table:<16} {stats['rows']:>10,} {stats['rows_per_sec'] or 0:>11,.0f} "
+                  + " ".join(f"{stats['stages'][s]:>7.2f}s" for s in STAGES) + f" {p50:>10} {p95:>8}")
+        total = summary["total"]
+        print(f"{'total':<16} {total['rows']:>10,} {total['rows_per_sec'] or 0:>11,.0f} "
+              + " ".join(f"{total['stages'][s]:>7.2f}s" for s in STAGES))
+        return summary
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
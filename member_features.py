@@ -0,0 +1,106 @@
+import pandas as pd
+from bulk_loader import DEFAULT_BATCH_SIZE, insert_dataframe
+from db import backend_name
+from query_runner import translate_sql
+from schema import create_tables, suffix_tables
+from table_versions import bump_table_versions
+
+# -------------------------------------------------------
+# Member features stage
+#   - One row per member: visits, first/last visit, average gap between
+#     visits, minutes, spend and transaction count
+#   - Built from one grouped pass over Visits and one over Sales, joined to
+#     Members on their keys, so the work is linear in the input size and
+#     nothing fans out
+#   - The average gap telescopes: the mean of consecutive gaps is
+#     (last - first) / (visits - 1), so no per-visit window is needed
+#   - refresh_member_features() rebuilds the rows of some members only,
+#     reading just their visits and sales (partitions.py, after a month is
+#     switched in or out)
+#   - customer_lifetime_value and spending_vs_visits read this table
+# -------------------------------------------------------
+
+# Tables whose changes make the features stale
+FEATURE_SOURCES = ["Members", "Visits", "Sales"]
+
+BUILD_SQL = """
+INSERT INTO Member_Features (member_id, customer_id, total_visits, first_visit, last_visit,
+                             avg_days_between_visits, total_duration, total_spending, transaction_count)
+SELECT
+    m.member_id,
+    m.customer_id,
+    COALESCE(v.total_visits, 0),
+    v.first_visit,
+    v.last_visit,
+    CASE WHEN v.total_visits > 1
+         THEN DATEDIFF(DAY, v.first_visit, v.last_visit) / CAST(v.total_visits - 1 AS FLOAT)
+         ELSE NULL END,
+    COALESCE(v.total_duration, 0),
+    COALESCE(s.total_spending, 0),
+    COALESCE(s.transaction_count, 0)
+FROM Members m
+LEFT JOIN (
+    SELECT member_id, COUNT(*) AS total_visits, MIN(date) AS first_visit, MAX(date) AS last_visit,
+           SUM(duration) AS total_duration
+    FROM Visits{visit_filter}
+    GROUP BY member_id
+) v ON v.member_id = m.member_id
+LEFT JOIN (
+    SELECT customer_id, SUM(price) AS total_spending, COUNT(*) AS transaction_count
+    FROM Sales{sale_filter}
+    GROUP BY customer_id
+) s ON s.customer_id = m.customer_id{member_filter};
+"""
+
+NO_FILTERS = {"visit_filter": "", "sale_filter": "", "member_filter": ""}
+
+# BUILD_SQL for the members listed in {stage} only
+MEMBER_FILTERS = {
+    "visit_filter": "\n    WHERE member_id IN (SELECT member_id FROM {stage})",
+    "sale_filter": "\n    WHERE customer_id IN (SELECT customer_id FROM Members\n"
+                   "                          WHERE member_id IN (SELECT member_id FROM {stage}))",
+    "member_filter": "\nWHERE m.member_id IN (SELECT member_id FROM {stage})",
+}
+
+
+def build_member_features(conn, suffix=""):
+    # suffix builds from / into staging tables (see swap_reload.py)
+    create_tables(conn, ["Member_Features"], if_not_exists=True, suffix=suffix)
+    cursor = conn.cursor()
+    cursor.execute(f"DELETE FROM Member_Features{suffix}")
+    cursor.execute(translate_sql(suffix_tables(BUILD_SQL.format(**NO_FILTERS), suffix), backend_name(conn)))
+    conn.commit()
+    cursor.execute(f"SELECT COUNT(*) FROM Member_Features{suffix}")
+    rows = cursor.fetchone()[0]
+    cursor.close()
+    print(f"Rebuilt Member_Features ({rows} rows)")
+    if not suffix:
+        bump_table_versions(conn, ["Member_Features"])
+    return rows
+
+
+def refresh_member_features(conn, member_ids=(), customer_ids=(), batch_size=DEFAULT_BATCH_SIZE):
+    # Rebuild the rows of the given members, and of the members behind the
+    # given customers, from their own visits and sales only
+    backend = backend_name(conn)
+    stage = "#stage_members" if backend == "sqlserver" else "stage_members"
+    cursor = conn.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+    cursor.execute(f"CREATE TABLE {stage} (member_id INT, customer_id INT)")
+    conn.commit()
+    insert_dataframe(conn, stage, pd.DataFrame({"member_id": sorted(set(member_ids))}, dtype="int64"), batch_size)
+    insert_dataframe(conn, stage, pd.DataFrame({"customer_id": sorted(set(customer_ids))}, dtype="int64"), batch_size)
+    cursor.execute(f"""
+INSERT INTO {stage} (member_id)
+SELECT member_id FROM Members WHERE customer_id IN (SELECT customer_id FROM {stage})""")
+    cursor.execute(f"DELETE FROM Member_Features WHERE member_id IN (SELECT member_id FROM {stage})")
+    filters = {name: sql.format(stage=stage) for name, sql in MEMBER_FILTERS.items()}
+    cursor.execute(translate_sql(BUILD_SQL.format(**filters), backend))
+    cursor.execute(f"SELECT COUNT(*) FROM Member_Features WHERE member_id IN (SELECT member_id FROM {stage})")
+    rows = cursor.fetchone()[0]
+    cursor.execute(f"DROP TABLE {stage}")
+    conn.commit()
+    cursor.close()
+    print(f"Refreshed Member_Features ({rows} rows)")
+    bump_table_versions(conn, ["Member_Features"])
+    return rows
@@ -0,0 +1,258 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import numpy as np
+import pandas as pd
+import data_generation_2 as gen
+from dataset_io import CATEGORIES, EXTENSIONS, epoch_day, merge_parts, write_chunks
+
+# -------------------------------------------------------
+# Sharded, multi-process data generation
+#   - Customers/members and visits are split into contiguous ID ranges,
+#     day passes and sales into equal slices of the row count; each shard
+#     runs in a process pool and writes its own part file
+#   - Every shard draws from its own NumPy stream keyed by (seed, table,
+#     shard), so a shard's rows don't depend on which worker ran it or when
+#   - Row counts are planned up front, so each shard knows its first
+#     visit_id / day_pass_id / guest_id / sale_id and the merged files have
+#     contiguous, unique IDs
+#   - Same seed + shard count + as-of date = byte-identical files, with any
+#     number of workers
+# -------------------------------------------------------
+
+STEMS = ("customers", "members", "visits", "day_passes", "day_pass_guests", "sales")
+
+# spawn_key of each table's streams; "plan" draws the per-run row counts
+STREAM_KEYS = {"plan": 0, "customers": 1, "visits": 2, "day_passes": 3, "sales": 4}
+
+PASS_TYPES = CATEGORIES["pass_type"]
+
+
+def shard_seed(seed, table, shard=0):
+    return np.random.SeedSequence(seed, spawn_key=(STREAM_KEYS[table], shard))
+
+
+def shard_rng(seed, table, shard=0):
+    return np.random.default_rng(shard_seed(seed, table, shard))
+
+
+def shard_ranges(first, last, shards):
+    # Contiguous (lo, hi) ranges covering first..last; empty ones have hi < lo
+    count = last - first + 1
+    bounds = [first + count * i // shards for i in range(shards + 1)]
+    return [(lo, hi - 1) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def split_count(total, shards):
+    return [hi - lo + 1 for lo, hi in shard_ranges(1, total, shards)]
+
+
+def days_before(today, offsets):
+    # today - offset as epoch days (formatted only when written)
+    return (epoch_day(today) - offsets).astype(np.int32)
+
+
+def write_part(parts_dir, stem, shard, chunks, fmt):
+    path = os.path.join(parts_dir, f"{stem}.{shard:05d}{EXTENSIONS[fmt]}")
+    rows = write_chunks(path, chunks, fmt)
+    return (path if rows else None), rows
+
+
+# 1. CUSTOMERS & MEMBERS (members are customers 1..num_members)
+def customer_shard(seed, shard, lo, hi, num_members, today, parts_dir, fmt):
+    rng = shard_rng(seed, "customers", shard)
+    ids = np.arange(lo, hi + 1, dtype=np.int32)
+    first_names = rng.choice(gen.first_name_pool, len(ids))
+    surnames = rng.choice(gen.last_names, len(ids))
+    names = np.char.add(np.char.add(first_names, " "), surnames)
+    ages = rng.integers(5, 61, len(ids)).astype(np.int8)
+    customers = pd.DataFrame({"customer_id": ids, "name": names, "age": ages})
+
+    m = max(0, min(hi, num_members) - lo + 1)
+    join_offsets = rng.integers(30, 731, m)
+    lengths = rng.integers(90, 366, m)
+    active = (lengths > join_offsets).astype(np.int8)  # membership still running today
+    members = pd.DataFrame({
+        "member_id": ids[:m],
+        "customer_id": ids[:m],
+        "name": names[:m],
+        "age": ages[:m],
+        "join_date": days_before(today, join_offsets),
+        "is_active": active,
+    })
+    return {
+        "customers": write_part(parts_dir, "customers", shard, [customers], fmt),
+        "members": write_part(parts_dir, "members", shard, [members], fmt),
+    }, ages, active
+
+
+# 2. VISITS (same distributions as the vectorized generator)
+def visit_shard_streams(seed, shard):
+    children = shard_seed(seed, "visits", shard).spawn(len(gen.visit_columns))
+    return {column: np.random.default_rng(child) for column, child in zip(gen.visit_columns, children)}
+
+
+def visit_counts(seed, shard, lo, hi):
+    # The first draws the shard makes: visits per member
+    return gen.draw_integers(visit_shard_streams(seed, shard)["count"], 50, 250, hi - lo + 1)
+
+
+def visit_shard(seed, shard, lo, hi, first_visit_id, today, parts_dir, fmt, chunk_size=None):
+    chunks = gen.visit_chunks_vectorized(np.arange(lo, hi + 1), visit_shard_streams(seed, shard),
+                                         chunk_size, first_visit_id, today)
+    return {"visits": write_part(parts_dir, "visits", shard, chunks, fmt)}
+
+
+# 3. DAY PASSES (active members skip them)
+def day_pass_streams(seed, shard):
+    purchasers, details = shard_seed(seed, "day_passes", shard).spawn(2)
+    return np.random.default_rng(purchasers), np.random.default_rng(details)
+
+
+def day_pass_plan(seed, shard, attempts, num_customers, member_active):
+    # Purchasers who get a pass and the size of each group; the parent uses
+    # this to count passes and guests, the shard goes on drawing from `rng`
+    purchaser_stream, rng = day_pass_streams(seed, shard)
+    purchasers = purchaser_stream.integers(1, num_customers + 1, attempts)
+    is_member = purchasers <= len(member_active)
+    skip = np.zeros(attempts, dtype=bool)
+    skip[is_member] = member_active[purchasers[is_member] - 1] == 1
+    purchasers = purchasers[~skip]
+    return purchasers, rng.integers(1, 7, len(purchasers)), rng
+
+
+def day_pass_shard(seed, shard, attempts, first_day_pass_id, first_guest_id, num_customers, customer_ages,
+                   member_active, today, parts_dir, fmt):
+    purchasers, group_sizes, rng = day_pass_plan(seed, shard, attempts, num_customers, member_active)
+    n = len(purchasers)
+    guest_ages = rng.integers(5, 61, (n, 5))
+    offsets = rng.integers(1, 731, n)
+    pass_types = rng.integers(0, len(PASS_TYPES), n)
+    day_pass_ids = np.arange(first_day_pass_id, first_day_pass_id + n, dtype=np.int32)
+    df = pd.DataFrame({
+        "day_pass_id": day_pass_ids,
+        "purchaser_id": purchasers.astype(np.int32),
+        "date": days_before(today, offsets),
+        "pass_type": pd.Categorical.from_codes(pass_types, categories=PASS_TYPES),
+    })
+
+    # Purchaser first, then the other group members: keep the first
+    # group_size entries of every row, in row order
+    ages = np.column_stack([customer_ages[purchasers - 1], guest_ages]).astype(np.int8)
+    numbers = np.broadcast_to(np.arange(1, 7, dtype=np.int8), ages.shape)
+    in_group = numbers <= group_sizes[:, None]
+    guests = pd.DataFrame({
+        "guest_id": np.arange(first_guest_id, first_guest_id + int(in_group.sum()), dtype=np.int32),
+        "day_pass_id": np.repeat(day_pass_ids, group_sizes),
+        "guest_number": numbers[in_group],
+        "age": ages[in_group],
+    })
+    return {
+        "day_passes": write_part(parts_dir, "day_passes", shard, [df], fmt),
+        "day_pass_guests": write_part(parts_dir, "day_pass_guests", shard, [guests], fmt),
+    }
+
+
+# 4. SALES
+def sale_shard(seed, shard, count, first_sale_id, num_customers, num_members, today, parts_dir, fmt):
+    rng = shard_rng(seed, "sales", shard)
+    customer_ids = rng.integers(1, num_customers + 1, count)
+    df = pd.DataFrame({
+        "sale_id": np.arange(first_sale_id, first_sale_id + count, dtype=np.int32),
+        "customer_id": customer_ids.astype(np.int32),
+        "member_id": np.where(customer_ids <= num_members, customer_ids, 0).astype(np.int32),
+        "date": days_before(today, rng.integers(1, 731, count)),
+        "item": pd.Categorical.from_codes(rng.integers(0, len(gen.items), count), categories=gen.items),
+        "price": np.round(rng.uniform(5, 50, count), 2),
+    })
+    return {"sales": write_part(parts_dir, "sales", shard, [df], fmt)}
+
+
+def first_ids(counts):
+    # First ID of each shard so that IDs run 1..sum(counts) without gaps
+    return (1 + np.concatenate([[0], np.cumsum(counts)[:-1]])).astype(int).tolist()
+
+
+def generate_sharded(seed=None, shards=4, workers=None, fmt="csv", scale_factor=1, directory=".",
+                     chunk_size=None, today=None):
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+        print(f"Seed: {seed} (pass --seed {seed} to reproduce this run)")
+    today = today or date.today()
+    started = time.perf_counter()
+
+    gen.apply_scale_factor(scale_factor)
+    num_members, num_customers = gen.num_members, gen.num_customers
+    plan = shard_rng(seed, "plan")
+    day_pass_attempts = int(plan.integers(gen.day_pass_purchases[0], gen.day_pass_purchases[1] + 1))
+    sales = int(plan.integers(gen.sale_count[0], gen.sale_count[1] + 1))
+
+    customer_ranges = shard_ranges(1, num_customers, shards)
+    member_ranges = shard_ranges(1, num_members, shards)
+    visit_ids = first_ids([int(visit_counts(seed, s, lo, hi).sum()) for s, (lo, hi) in enumerate(member_ranges)])
+    sale_counts = split_count(sales, shards)
+    sale_ids = first_ids(sale_counts)
+
+    parts_dir = tempfile.mkdtemp(prefix=".shards_", dir=directory)
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            customer_futures = [
+                executor.submit(customer_shard, seed, s, lo, hi, num_members, today, parts_dir, fmt)
+                for s, (lo, hi) in enumerate(customer_ranges) if lo <= hi
+            ]
+            futures = [
+                executor.submit(visit_shard, seed, s, lo, hi, visit_ids[s], today, parts_dir, fmt, chunk_size)
+                for s, (lo, hi) in enumerate(member_ranges) if lo <= hi
+            ]
+            futures += [
+                executor.submit(sale_shard, seed, s, count, sale_ids[s], num_customers, num_members,
+                                today, parts_dir, fmt)
+                for s, count in enumerate(sale_counts) if count
+            ]
+
+            # Day passes need every customer's age and member's active flag
+            customer_ages, member_active = [], []
+            for future in customer_futures:
+                written, ages, active = future.result()
+                results.append(written)
+                customer_ages.append(ages)
+                member_active.append(active)
+            customer_ages = np.concatenate(customer_ages)
+            member_active = np.concatenate(member_active)
+
+            attempts = split_count(day_pass_attempts, shards)
+            group_sizes = [day_pass_plan(seed, s, n, num_customers, member_active)[1] for s, n in enumerate(attempts)]
+            day_pass_ids = first_ids([len(sizes) for sizes in group_sizes])
+            guest_ids = first_ids([int(sizes.sum()) for sizes in group_sizes])
+            futures += [
+                executor.submit(day_pass_shard, seed, s, n, day_pass_ids[s], guest_ids[s], num_customers,
+                                customer_ages, member_active, today, parts_dir, fmt)
+                for s, n in enumerate(attempts) if n
+            ]
+            results += [future.result() for future in futures]
+
+        # Part files are named by shard, so sorting puts them in ID order
+        written = {}
+        for stem in STEMS:
+            filename = stem + EXTENSIONS[fmt]
+            outputs = [result[stem] for result in results if stem in result]
+            parts = sorted(path for path, _ in outputs if path)
+            written[filename] = sum(rows for _, rows in outputs)
+            if not parts:
+                # Empty shards write no part file, so there's no header to merge
+                print(f"⚠️ {filename}: 0 rows, not written")
+                continue
+            merge_parts(os.path.join(directory, filename), parts, fmt)
+            print(f"{filename}: {written[filename]} rows")
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    seconds = time.perf_counter() - started
+    rows = sum(written.values())
+    print(f"{rows:,} rows in {seconds:.2f}s from {shards} shards on {workers or os.cpu_count()} workers "
+          f"({rows / seconds:,.0f} rows/sec)")
+    return written
@@ -0,0 +1,110 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
+from bulk_loader import DEFAULT_BATCH_SIZE, insert_dataframe, prepare_table
+from dataset_io import read_table
+from schema import PRIMARY_KEYS, TABLE_DEPENDENCIES, TABLES, data_file
+from table_versions import bump_table_versions
+
+# -------------------------------------------------------
+# Parallel, dependency-aware table loading
+#   - Tables form a graph from their foreign keys (schema.TABLE_DEPENDENCIES);
+#     a table starts as soon as all of its parents are fully loaded
+#   - Large tables are split into contiguous primary key ranges that load
+#     concurrently, each on its own pooled connection
+# -------------------------------------------------------
+
+DEFAULT_SPLIT_ROWS = 50_000
+
+
+def split_key_ranges(df, key, parts):
+    # Contiguous, non-overlapping key ranges of roughly equal row counts
+    if parts <= 1 or len(df) == 0:
+        return [df]
+    df = df.sort_values(key, kind="stable")
+    bounds = np.linspace(0, len(df), parts + 1).astype(int)
+    return [df.iloc[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+
+def plan_load(frames, workers, split_rows=DEFAULT_SPLIT_ROWS):
+    # Table -> list of key-range parts
+    plan = {}
+    for table, df in frames.items():
+        parts = min(workers, max(1, -(-len(df) // split_rows)))
+        plan[table] = split_key_ranges(df, PRIMARY_KEYS[table], parts)
+    return plan
+
+
+def read_frames(tables=TABLES, fmt="csv", telemetry=None, prepare=True):
+    # prepare=False leaves the values as read, e.g. for validation.py
+    frames = {}
+    for table in tables:
+        started = time.perf_counter()
+        frames[table] = read_table(data_file(table, fmt), fmt=fmt)
+        if telemetry is not None:
+            telemetry.stage(table, "read", time.perf_counter() - started)
+    return prepare_frames(frames, telemetry) if prepare else frames
+
+
+def prepare_frames(frames, telemetry=None):
+    prepared = {}
+    for table, df in frames.items():
+        started = time.perf_counter()
+        prepared[table] = prepare_table(table, df)
+        if telemetry is not None:
+            telemetry.stage(table, "prepare", time.perf_counter() - started)
+    return prepared
+
+
+def load_tables_parallel(pool, frames=None, tables=TABLES, workers=4,
+                         batch_size=DEFAULT_BATCH_SIZE, split_rows=DEFAULT_SPLIT_ROWS, fmt="csv", telemetry=None,
+                         suffix=""):
+    # suffix loads into staging tables (see swap_reload.py)
+    if frames is None:
+        frames = read_frames(tables, fmt, telemetry)
+    plan = plan_load(frames, workers, split_rows)
+
+    def load_part(table, part):
+        with pool.connection() as conn:
+            return insert_dataframe(conn, table, part, batch_size, telemetry, suffix)
+
+    started = time.perf_counter()
+    table_started = {}
+    parts_left = {table: len(plan[table]) for table in tables}
+    rows_loaded = {table: 0 for table in tables}
+    stats = {}
+    pending = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit_ready():
+            for table in tables:
+                parents_done = all(parts_left.get(parent, 0) == 0 for parent in TABLE_DEPENDENCIES[table])
+                if table not in table_started and parents_done:
+                    table_started[table] = time.perf_counter()
+                    print(f"Loading {table} in {len(plan[table])} part(s)")
+                    if telemetry is not None:
+                        telemetry.expect(table, len(frames[table]))
+                    for part in plan[table]:
+                        pending[executor.submit(load_part, table, part)] = table
+
+        submit_ready()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                table = pending.pop(future)
+                rows_loaded[table] += future.result()
+                parts_left[table] -= 1
+                if parts_left[table] == 0:
+                    seconds = time.perf_counter() - table_started[table]
+                    stats[table] = {"rows": rows_loaded[table], "seconds": seconds,
+                                    "rows_per_sec": rows_loaded[table] / seconds if seconds else None}
+                    print(f"Loaded {table}: {rows_loaded[table]} rows in {seconds:.2f}s "
+                          f"({rows_loaded[table] / max(seconds, 1e-9):,.0f} rows/sec)")
+            submit_ready()
+
+    total = time.perf_counter() - started
+    print(f"Loaded {sum(rows_loaded.values())} rows with {workers} workers in {total:.2f}s")
+    if not suffix:
+        with pool.connection() as conn:
+            bump_table_versions(conn, tables)
+    return stats
@@ -0,0 +1,396 @@
+import argparse
+import os
+import pandas as pd
+from bulk_loader import DEFAULT_BATCH_SIZE, insert_dataframe, prepare_table
+from dataset_io import FORMATS, read_table
+from db import BACKENDS, DEFAULT_BACKEND, backend_name, connect_with_retry, query_frame
+from incremental_loader import record_watermarks, upsert_dataframe
+from member_features import build_member_features, refresh_member_features
+from rollups import ROLLUP_COUNTS, ROLLUP_DAYS, ROLLUP_KEYS, rebuild_rollups, rollup_frames
+from schema import (DATE_COLUMNS, PARTITION_FUNCTION, PARTITION_SCHEME, PARTITIONED_TABLES, ROLLUP_TABLES,
+                    create_partition_scheme, data_file, index_ddl, partition_clause, profile_indexes, table_ddl)
+from sketches import SKETCH_TABLE, SKETCHES, date_range, sketch_rows
+from table_versions import bump_table_versions, create_table_versions, read_table_versions
+from validation import check_table, print_problems
+
+# -------------------------------------------------------
+# Monthly partitions of Visits and Sales (schema profile "partitioned")
+#   - SQL Server: RANGE RIGHT partition function PF_Monthly with a boundary
+#     on the first day of every month, and scheme PS_Monthly; both tables and
+#     their indexes are aligned on it
+#   - A month is built offline in <table>__m<yyyymm> (bulk load, a CHECK on
+#     the month's dates, the same indexes) and switched in with ALTER TABLE
+#     ... SWITCH, which only changes metadata. Whatever the partition held is
+#     switched out first, so loading a month again replaces it
+#   - Old months are expired by switching them out to a scratch table that
+#     is dropped, then merging their boundaries away
+#   - SQLite / DuckDB have no partitions: a month is its date range, replaced
+#     by DELETE + INSERT from the staged copy in one transaction. A switched
+#     month lands in row groups of its own, whose min/max let DuckDB skip it
+#     when a query's date range excludes it
+#   - recent_sales_by_item filters Sales on a sargable range (date >= x AND
+#     date < y, no function around the column), so only its months are read.
+#     The monthly KPIs read the rollups, which aren't partitioned
+#   - What is built from Visits / Sales follows each switch as a delta: the
+#     rows a month held are read as it goes out, then the month's daily
+#     rollup and sketch rows are rewritten, Visits_Occupancy gets the new
+#     rows' counts minus the old ones', and only the members whose rows
+#     moved have their features rebuilt
+# -------------------------------------------------------
+
+OUT_SUFFIX = "__out"
+
+
+def month_start(value):
+    # "2024-05", "2024-05-17", a date or a Timestamp -> date(2024, 5, 1)
+    return pd.Timestamp(value).date().replace(day=1)
+
+
+def month_range(month):
+    # [first day, first day of the next month)
+    start = month_start(month)
+    return start, (pd.Timestamp(start) + pd.offsets.MonthBegin(1)).date()
+
+
+def month_suffix(month):
+    return f"__m{month_start(month):%Y%m}"
+
+
+def frame_months(dates):
+    return sorted(period.start_time.date() for period in pd.to_datetime(dates).dt.to_period("M").unique())
+
+
+def data_months(frames=None, fmt="csv", directory="."):
+    # Months present in the Visits / Sales data about to be loaded
+    months = set()
+    for table in PARTITIONED_TABLES:
+        date_col = DATE_COLUMNS[table]
+        if frames is not None:
+            dates = frames[table][date_col]
+        else:
+            dates = read_table(os.path.join(directory, data_file(table, fmt)), columns=[date_col], fmt=fmt)[date_col]
+        months.update(frame_months(dates))
+    return sorted(months)
+
+
+# ---------- SQL Server partition function ----------
+
+def partition_boundaries(conn):
+    df = query_frame(conn, f"""
+SELECT CAST(v.value AS DATE) AS boundary
+FROM sys.partition_range_values v
+JOIN sys.partition_functions f ON f.function_id = v.function_id
+WHERE f.name = '{PARTITION_FUNCTION}'
+ORDER BY v.boundary_id""")
+    return [pd.Timestamp(value).date() for value in df["boundary"]]
+
+
+def add_months(conn, months):
+    # Boundaries at both ends of every month give each month a partition of
+    # its own. Split before the data arrives: splitting an empty range only
+    # touches metadata. No-op outside SQL Server.
+    if backend_name(conn) != "sqlserver":
+        return []
+    boundaries = {boundary for month in months for boundary in month_range(month)}
+    if create_partition_scheme(conn, boundaries):
+        return sorted(boundaries)
+    new = sorted(boundaries - set(partition_boundaries(conn)))
+    cursor = conn.cursor()
+    for boundary in new:
+        cursor.execute(f"ALTER PARTITION SCHEME {PARTITION_SCHEME} NEXT USED [PRIMARY]")
+        cursor.execute(f"ALTER PARTITION FUNCTION {PARTITION_FUNCTION}() SPLIT RANGE ('{boundary}')")
+    conn.commit()
+    cursor.close()
+    return new
+
+
+def partition_number(conn, value):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT $PARTITION.{PARTITION_FUNCTION}(CAST(? AS DATE))", str(value))
+    number = cursor.fetchone()[0]
+    cursor.close()
+    return number
+
+
+def is_partitioned(conn, table):
+    # Local backends treat every table as partitioned by date range
+    if backend_name(conn) != "sqlserver":
+        return True
+    df = query_frame(conn, f"""
+SELECT COUNT(*) AS n
+FROM sys.indexes i
+JOIN sys.partition_schemes s ON s.data_space_id = i.data_space_id
+WHERE i.object_id = OBJECT_ID('{table}') AND i.index_id IN (0, 1)""")
+    return bool(df["n"].iloc[0])
+
+
+def list_partitions(conn, table):
+    # Non-empty months of table with their row counts
+    backend = backend_name(conn)
+    date_col = DATE_COLUMNS[table]
+    if backend == "sqlserver":
+        # RANGE RIGHT: partition n starts at boundary n - 1; partition 1 holds
+        # anything before the first boundary (month is NULL)
+        sql = f"""
+SELECT CAST(v.value AS DATE) AS month, p.rows AS row_count
+FROM sys.partitions p
+JOIN sys.indexes i ON i.object_id = p.object_id AND i.index_id = p.index_id
+JOIN sys.partition_schemes s ON s.data_space_id = i.data_space_id
+LEFT JOIN sys.partition_range_values v ON v.function_id = s.function_id AND v.boundary_id = p.partition_number - 1
+WHERE p.object_id = OBJECT_ID('{table}') AND p.index_id IN (0, 1) AND p.rows > 0
+ORDER BY p.partition_number"""
+    elif backend == "sqlite":
+        sql = f"""
+SELECT substr({date_col}, 1, 7) || '-01' AS month, COUNT(*) AS row_count
+FROM {table} GROUP BY 1 ORDER BY 1"""
+    else:
+        sql = f"""
+SELECT CAST(date_trunc('month', {date_col}) AS DATE) AS month, COUNT(*) AS row_count
+FROM {table} GROUP BY 1 ORDER BY 1"""
+    return query_frame(conn, sql)
+
+
+# ---------- switching months in and out ----------
+
+def drop_table(conn, name):
+    cursor = conn.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {name}")
+    conn.commit()
+    cursor.close()
+
+
+def create_month_table(conn, table, suffix, month=None):
+    # An empty, unpartitioned copy of table to switch a month into or out of.
+    # SQL Server wants the same columns, keys and indexes on the partition's
+    # filegroup and, to switch in, a CHECK that admits the month's dates only.
+    backend = backend_name(conn)
+    drop_table(conn, table + suffix)
+    ddl = table_ddl(table, backend, "partitioned", foreign_keys=backend == "sqlserver")
+    ddl = ddl.replace(f"CREATE TABLE {table} (", f"CREATE TABLE {table}{suffix} (", 1)
+    statements = [ddl]
+    if backend == "sqlserver":
+        ddl = ddl.replace(partition_clause(table), "")
+        if month is not None:
+            start, end = month_range(month)
+            date_col = DATE_COLUMNS[table]
+            ddl = ddl[:ddl.rindex(")")].rstrip() + f",\n    CHECK ({date_col} >= '{start}' AND {date_col} < '{end}')\n)"
+        statements = [ddl + " ON [PRIMARY]"]
+        statements += [index_ddl(name, table + suffix, keys, include, backend)
+                       for name, index_table, keys, include in profile_indexes("partitioned") if index_table == table]
+    cursor = conn.cursor()
+    for statement in statements:
+        cursor.execute(statement)
+    conn.commit()
+    cursor.close()
+
+
+def _begin(conn, cursor):
+    conn.commit()
+    cursor.execute("BEGIN IMMEDIATE" if backend_name(conn) == "sqlite" else "BEGIN TRANSACTION")
+
+
+def switch_in_month(conn, table, df, month, batch_size=DEFAULT_BATCH_SIZE):
+    # Bulk load month's rows of df beside table, then swap them in for
+    # whatever the month held. Returns (rows switched out, rows switched in).
+    start, end = month_range(month)
+    date_col = DATE_COLUMNS[table]
+    dates = pd.to_datetime(df[date_col])
+    rows = df[(dates >= pd.Timestamp(start)) & (dates < pd.Timestamp(end))]
+    suffix = month_suffix(month)
+    backend = backend_name(conn)
+    add_months(conn, [month])
+    create_month_table(conn, table, suffix, month)
+    insert_dataframe(conn, table, rows, batch_size, suffix=suffix)
+
+    cursor = conn.cursor()
+    try:
+        if backend == "sqlserver":
+            create_month_table(conn, table, OUT_SUFFIX)
+            partition = partition_number(conn, start)
+            try:
+                cursor.execute(f"ALTER TABLE {table} SWITCH PARTITION {partition} TO {table}{OUT_SUFFIX}")
+                cursor.execute(f"ALTER TABLE {table}{suffix} SWITCH TO {table} PARTITION {partition}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            removed = query_frame(conn, f"SELECT * FROM {table}{OUT_SUFFIX}")
+        else:
+            removed = query_frame(conn, f"SELECT * FROM {table} WHERE {date_range(date_col, start, end)}")
+            _begin(conn, cursor)
+            try:
+                cursor.execute(f"DELETE FROM {table} WHERE {date_col} >= '{start}' AND {date_col} < '{end}'")
+                cursor.execute(f"INSERT INTO {table} SELECT * FROM {table}{suffix}")
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+    finally:
+        cursor.close()
+        drop_table(conn, table + suffix)
+        drop_table(conn, table + OUT_SUFFIX)
+    return removed, rows
+
+
+def expire_before(conn, before):
+    # Remove every month before `before` from all partitioned tables (they
+    # share the partition function). Returns {table: rows removed}.
+    before = month_start(before)
+    backend = backend_name(conn)
+    removed = {}
+    cursor = conn.cursor()
+    if backend == "sqlserver":
+        add_months(conn, [before])
+        last = partition_number(conn, before)
+        for table in PARTITIONED_TABLES:
+            frames = []
+            for partition in range(1, last):
+                create_month_table(conn, table, OUT_SUFFIX)
+                cursor.execute(f"ALTER TABLE {table} SWITCH PARTITION {partition} TO {table}{OUT_SUFFIX}")
+                conn.commit()
+                frames.append(query_frame(conn, f"SELECT * FROM {table}{OUT_SUFFIX}"))
+            removed[table] = pd.concat(frames, ignore_index=True) if frames else query_frame(
+                conn, f"SELECT * FROM {table} WHERE 1 = 0")
+            drop_table(conn, table + OUT_SUFFIX)
+        # The emptied partitions collapse into the first one
+        for boundary in partition_boundaries(conn):
+            if boundary < before:
+                cursor.execute(f"ALTER PARTITION FUNCTION {PARTITION_FUNCTION}() MERGE RANGE ('{boundary}')")
+        conn.commit()
+    else:
+        where = {table: date_range(DATE_COLUMNS[table], end=before) for table in PARTITIONED_TABLES}
+        for table in PARTITIONED_TABLES:
+            removed[table] = query_frame(conn, f"SELECT * FROM {table} WHERE {where[table]}")
+        _begin(conn, cursor)
+        try:
+            for table in PARTITIONED_TABLES:
+                cursor.execute(f"DELETE FROM {table} WHERE {where[table]}")
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+    cursor.close()
+    return removed
+
+
+# ---------- derived tables ----------
+
+def replace_rollup_range(conn, table, start, end, removed, added, batch_size=DEFAULT_BATCH_SIZE):
+    # table's rows dated [start, end) went from removed to added: rewrite the
+    # range's daily rollup and sketch rows from added, and add added minus
+    # removed to the rollups across all days. Returns the tables touched.
+    cursor = conn.cursor()
+    old = rollup_frames(table, removed)
+    for rollup, frame in rollup_frames(table, added).items():
+        if rollup in ROLLUP_DAYS:
+            cursor.execute(f"DELETE FROM {rollup} WHERE {date_range(ROLLUP_DAYS[rollup], start, end)}")
+            conn.commit()
+            insert_dataframe(conn, rollup, frame, batch_size)
+            continue
+        keys = ROLLUP_KEYS[rollup]
+        measures = [c for c in frame.columns if c not in keys]
+        delta = pd.concat([frame, old[rollup].assign(**{c: -old[rollup][c] for c in measures})], ignore_index=True)
+        delta = delta.groupby(keys, as_index=False)[measures].sum()
+        delta = delta[(delta[measures] != 0).any(axis=1)]
+        if len(delta):
+            upsert_dataframe(conn, rollup, delta, key=keys, batch_size=batch_size, accumulate=True)
+        cursor.execute(f"DELETE FROM {rollup} WHERE {ROLLUP_COUNTS[rollup]} = 0")
+        conn.commit()
+    metrics = ", ".join(f"'{metric}'" for metric in SKETCHES[table])
+    cursor.execute(f"DELETE FROM {SKETCH_TABLE} WHERE metric IN ({metrics}) "
+                   f"AND {date_range('sketch_date', start, end)}")
+    conn.commit()
+    cursor.close()
+    insert_dataframe(conn, SKETCH_TABLE, sketch_rows(table, added), batch_size)
+    return list(old) + [SKETCH_TABLE]
+
+
+def refresh_derived(conn, changes, batch_size=DEFAULT_BATCH_SIZE):
+    # changes: [(table, start, end, rows removed, rows added)], one per
+    # switched range. Rollups, sketches and member features take each as a
+    # delta; tables never built yet are built in full.
+    create_table_versions(conn)
+    versions = read_table_versions(conn, ROLLUP_TABLES + [SKETCH_TABLE, "Member_Features"])
+    rollups_built = all(versions[table] for table in ROLLUP_TABLES + [SKETCH_TABLE])
+    touched = {table for table, *_ in changes}
+    members, customers = set(), set()
+    for table, start, end, removed, added in changes:
+        if rollups_built:
+            touched.update(replace_rollup_range(conn, table, start, end, removed, added, batch_size))
+        for rows in (removed, added):
+            if table == "Visits":
+                members.update(rows["member_id"].astype(int))
+            else:
+                customers.update(rows["customer_id"].dropna().astype(int))
+    record_watermarks(conn)
+    bump_table_versions(conn, sorted(touched))
+    if not rollups_built:
+        rebuild_rollups(conn, batch_size)
+    if not versions["Member_Features"]:
+        build_member_features(conn)
+    elif members or customers:
+        refresh_member_features(conn, members, customers, batch_size)
+
+
+def print_partitions(conn, tables=PARTITIONED_TABLES):
+    for table in tables:
+        df = list_partitions(conn, table)
+        print(f"{table}: {len(df)} month(s), {int(df['row_count'].sum()) if len(df) else 0:,} rows")
+        for month, rows in zip(df["month"], df["row_count"]):
+            label = "before first boundary" if pd.isnull(month) else f"{pd.Timestamp(month):%Y-%m}"
+            print(f"    {label:<22} {int(rows):>10,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Switch months of Visits / Sales in and out of the database.")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--database", default=None, help="database file for the sqlite/duckdb backends")
+    parser.add_argument("--switch-in", nargs="+", default=[], metavar="YYYY-MM",
+                        help="load these months from the data files and switch them in")
+    parser.add_argument("--expire-before", default=None, metavar="YYYY-MM",
+                        help="switch out and drop every month before this one")
+    parser.add_argument("--tables", nargs="+", choices=PARTITIONED_TABLES, default=PARTITIONED_TABLES,
+                        help="tables to switch months into")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--directory", default=".", help="where the generated data files are")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--list", action="store_true", help="print the months of each table")
+    args = parser.parse_args()
+
+    conn = connect_with_retry(args.backend, args.database)
+    unpartitioned = [table for table in PARTITIONED_TABLES if not is_partitioned(conn, table)]
+    if unpartitioned and (args.switch_in or args.expire_before):
+        print(f"❌ {', '.join(unpartitioned)} not partitioned: load with --schema-profile partitioned first")
+        conn.close()
+        raise SystemExit(1)
+
+    changes = []
+    for table in args.tables if args.switch_in else []:
+        source = read_table(os.path.join(args.directory, data_file(table, args.format)), fmt=args.format)
+        for month in args.switch_in:
+            start, end = month_range(month)
+            dates = pd.to_datetime(source[DATE_COLUMNS[table]])
+            raw = source[(dates >= pd.Timestamp(start)) & (dates < pd.Timestamp(end))]
+            # Same checks as a full load, before the month goes anywhere near the table
+            problems = check_table(table, raw)
+            if problems:
+                print_problems(problems)
+                conn.close()
+                raise SystemExit(1)
+            removed, added = switch_in_month(conn, table, prepare_table(table, raw.copy()), month, args.batch_size)
+            changes.append((table, start, end, removed, added))
+            print(f"✅ Switched {start:%Y-%m} into {table}: {len(added):,} rows (replacing {len(removed):,})")
+    if args.expire_before:
+        before = month_start(args.expire_before)
+        for table, removed in expire_before(conn, before).items():
+            changes.append((table, None, before, removed, removed.iloc[:0]))
+            print(f"✅ Expired {table} before {before:%Y-%m}: {len(removed):,} rows")
+    if changes:
+        refresh_derived(conn, changes, args.batch_size)
+    if args.list or not (args.switch_in or args.expire_before):
+        print_partitions(conn)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import argparse
+import os
+import queue
+import threading
+import time
+import pandas as pd
+import data_generation_2
+from bulk_loader import DEFAULT_BATCH_SIZE, insert_dataframe, prepare_table
+from dataset_io import EXTENSIONS, FORMATS, format_text_columns, write_chunks
+from db import BACKENDS, DEFAULT_BACKEND, ConnectionPool
+from incremental_loader import record_watermarks
+from member_features import build_member_features
+from rollups import rebuild_rollups
+from schema import CSV_FILES, SCHEMA_PROFILES, TABLE_DEPENDENCIES, TABLES, create_indexes, create_tables, drop_tables
+from table_versions import bump_table_versions
+
+# -------------------------------------------------------
+# Generator -> database streaming pipeline
+#   - The generator's DataFrame chunks go straight into a bounded queue and
+#     loader threads bulk insert them on pooled connections: no CSV is
+#     written and parsed back in between
+#   - A full queue blocks the generator (backpressure), so memory stays at
+#     roughly queue_size + workers chunks however large the run is
+#   - Generation and loading overlap; the report shows how long each side
+#     waited on the other, i.e. which stage is the bottleneck
+#   - A table's chunks are held until every parent table is fully inserted,
+#     so foreign keys hold while tables load concurrently
+#   - --tee also writes every chunk to its data file on the way through
+# -------------------------------------------------------
+
+DEFAULT_CHUNK_SIZE = 50_000
+DEFAULT_QUEUE_SIZE = 8
+
+STEM_TABLES = {os.path.splitext(file)[0]: table for table, file in CSV_FILES.items()}
+
+
+class LoadProgress:
+    # Chunks queued / inserted per table, and whether the generator has
+    # finished the table, shared by the producer and the loader threads
+    def __init__(self, tables=TABLES):
+        self._cond = threading.Condition()
+        self.queued = {table: 0 for table in tables}
+        self.loaded = {table: 0 for table in tables}
+        self.rows = {table: 0 for table in tables}
+        self.finished = set()
+        self.error = None
+
+    def _table_done(self, table):
+        return table in self.finished and self.loaded[table] == self.queued[table]
+
+    def chunk_queued(self, table):
+        with self._cond:
+            self.queued[table] += 1
+
+    def table_finished(self, table):
+        with self._cond:
+            self.finished.add(table)
+            self._cond.notify_all()
+
+    def chunk_loaded(self, table, rows):
+        with self._cond:
+            self.loaded[table] += 1
+            self.rows[table] += rows
+            self._cond.notify_all()
+
+    def wait_for_parents(self, table):
+        # Chunks are queued in FK order, so a parent's chunks were taken off
+        # the queue first and are already being inserted
+        with self._cond:
+            self._cond.wait_for(lambda: self.error is not None or
+                                all(self._table_done(parent) for parent in TABLE_DEPENDENCIES[table]))
+            if self.error is not None:
+                raise RuntimeError("another loader failed") from self.error
+
+    def fail(self, exc):
+        with self._cond:
+            if self.error is None:
+                self.error = exc
+            self._cond.notify_all()
+
+
+def load_frame(table, df):
+    # Output boundary: epoch days / hours / category codes -> the text values
+    # the CSV loader would have read, then the usual per-table preparation
+    df = format_text_columns(df).copy()
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(str)
+    return prepare_table(table, df)
+
+
+def stream_to_database(pool, tables, workers=2, queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                       tee_fmt=None, directory="."):
+    # tables: [(file stem, chunk iterator)] in FK order, e.g. from
+    # data_generation_2.table_chunks()
+    chunks = queue.Queue(maxsize=queue_size)
+    progress = LoadProgress()
+    waited = {"generator": 0.0, "loaders": 0.0}
+    waited_lock = threading.Lock()
+
+    def loader():
+        try:
+            with pool.connection() as conn:
+                while True:
+                    started = time.perf_counter()
+                    item = chunks.get()
+                    with waited_lock:
+                        waited["loaders"] += time.perf_counter() - started
+                    if item is None:
+                        return
+                    table, df = item
+                    progress.wait_for_parents(table)
+                    progress.chunk_loaded(table, insert_dataframe(conn, table, load_frame(table, df), batch_size))
+        except Exception as exc:
+            progress.fail(exc)
+
+    def put(item):
+        # Blocks while the queue is full; gives up if a loader has failed
+        started = time.perf_counter()
+        while progress.error is None:
+            try:
+                chunks.put(item, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+        waited["generator"] += time.perf_counter() - started
+        if progress.error is not None:
+            raise RuntimeError("loading failed") from progress.error
+
+    def enqueue(table, stream):
+        for df in stream:
+            progress.chunk_queued(table)
+            put((table, df))
+            yield df
+
+    def stop_loaders():
+        # One sentinel per loader; after a failure the unloaded chunks are
+        # dropped so the sentinels fit
+        for _ in threads:
+            while True:
+                if progress.error is not None:
+                    while not chunks.empty():
+                        chunks.get_nowait()
+                try:
+                    chunks.put(None, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+        for thread in threads:
+            thread.join()
+
+    threads = [threading.Thread(target=loader, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    try:
+        for stem, stream in tables:
+            table = STEM_TABLES[stem]
+            table_started = time.perf_counter()
+            if tee_fmt:
+                write_chunks(os.path.join(directory, stem + EXTENSIONS[tee_fmt]), enqueue(table, stream), tee_fmt)
+            else:
+                for _ in enqueue(table, stream):
+                    pass
+            progress.table_finished(table)
+            print(f"Generated {table}: {progress.queued[table]} chunk(s) in {time.perf_counter() - table_started:.2f}s")
+    except BaseException as exc:
+        progress.fail(exc)  # releases loaders waiting on a parent table
+        raise
+    finally:
+        stop_loaders()
+    if progress.error is not None:
+        raise progress.error
+
+    seconds = time.perf_counter() - started
+    rows = sum(progress.rows.values())
+    for table, table_rows in progress.rows.items():
+        print(f"Loaded {table}: {table_rows} rows")
+    print(f"Streamed {rows:,} rows in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/sec); "
+          f"generator waited {waited['generator']:.2f}s on a full queue, "
+          f"loaders waited {waited['loaders']:.2f}s for chunks")
+    return {"rows": dict(progress.rows), "seconds": seconds, "generator_wait": waited["generator"],
+            "loader_wait": waited["loaders"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate data and load it straight into the database.")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--database", default=None, help="database file for the sqlite/duckdb backends")
+    parser.add_argument("--workers", type=int, default=2, help="loader threads, each on its own pooled connection")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="chunks buffered between generator and loaders before the generator blocks")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per generated chunk")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per executemany / commit")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--scale-factor", type=int, default=1)
+    parser.add_argument("--vectorized", action="store_true", help="generate visits with NumPy")
+    parser.add_argument("--tee", choices=FORMATS, default=None, help="also write each table's data file")
+    parser.add_argument("--schema-profile", choices=SCHEMA_PROFILES, default="baseline")
+    args = parser.parse_args()
+
+    with ConnectionPool(args.backend, args.database, size=args.workers) as pool:
+        with pool.connection() as conn:
+            drop_tables(conn)
+            create_tables(conn, profile=args.schema_profile)
+
+        tables = data_generation_2.table_chunks(args.seed, args.chunk_size, args.vectorized, args.scale_factor)
+        stream_to_database(pool, tables, args.workers, args.queue_size, args.batch_size, args.tee)
+
+        # Same finishing steps as data_insert_handling_2.py
+        with pool.connection() as conn:
+            bump_table_versions(conn, TABLES)
+            create_indexes(conn, args.schema_profile)
+            record_watermarks(conn)
+            rebuild_rollups(conn, args.batch_size)
+            build_member_features(conn)
+
+    print(f"✅ Generated data streamed into {args.backend}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 -- Calculates average number of days between visits per member
 SELECT 
     member_id, 
-    AVG(DATEDIFF(DAY, LAG(date) OVER (PARTITION BY member_id ORDER BY date), date)) AS avg_days_between_visits
-FROM Visits
+    AVG(DATEDIFF(DAY, prev_date, date)) AS avg_days_between_visits
+FROM (
+    SELECT member_id, date, LAG(date) OVER (PARTITION BY member_id ORDER BY date) AS prev_date
+    FROM Visits
+) AS gaps
 GROUP BY member_id
-ORDER BY avg_days_between_visits;
\ No newline at end of file
+ORDER BY avg_days_between_visits, member_id;
\ No newline at end of file
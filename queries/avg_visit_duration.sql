@@ -2,5 +2,5 @@
 SELECT member_id, AVG(duration) AS avg_duration
 FROM Visits
 GROUP BY member_id
-ORDER BY avg_duration DESC
+ORDER BY avg_duration DESC, member_id
 LIMIT 10;
\ No newline at end of file
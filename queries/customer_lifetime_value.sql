@@ -0,0 +1,83 @@
+-- Customer lifetime value with RFM segments, served from the Member_Features stage
+-- (visits, last visit and spend per member, built in one pass over Visits and Sales)
+
+WITH EngagementScore AS (
+    SELECT 
+        m.member_id,
+        m.name,
+        m.age,
+        m.is_active,
+        f.total_visits,
+        f.total_spending,
+        CASE WHEN DATEDIFF(DAY, m.join_date, GETDATE()) > 0 
+             THEN f.total_spending / DATEDIFF(DAY, m.join_date, GETDATE()) * 30 
+             ELSE 0 END AS monthly_spend_rate,
+        
+        -- Recency Factor (based on days since last visit)
+        CASE 
+            WHEN DATEDIFF(DAY, f.last_visit, GETDATE()) <= 14 THEN 3  -- Visited in last 14 days
+            WHEN DATEDIFF(DAY, f.last_visit, GETDATE()) <= 30 THEN 2  -- Visited in last 30 days
+            WHEN f.last_visit IS NOT NULL THEN 1                      -- Has visited before
+            ELSE 0                                                    -- Never visited
+        END AS recency_score,
+        
+        -- Frequency Score (based on visit frequency)
+        CASE 
+            WHEN f.total_visits >= 20 THEN 3  -- High frequency
+            WHEN f.total_visits >= 10 THEN 2  -- Medium frequency
+            WHEN f.total_visits >= 1 THEN 1   -- Low frequency
+            ELSE 0                            -- No visits
+        END AS frequency_score,
+        
+        -- Monetary Score (based on spending)
+        CASE 
+            WHEN f.total_spending >= 500 THEN 3  -- High spender
+            WHEN f.total_spending >= 200 THEN 2  -- Medium spender
+            WHEN f.total_spending > 0 THEN 1     -- Low spender
+            ELSE 0                               -- No spending
+        END AS monetary_score
+    FROM 
+        Members m
+    JOIN 
+        Member_Features f ON f.member_id = m.member_id
+)
+
+-- Final query: Calculate Customer Lifetime Value with segment classification
+SELECT 
+    es.member_id,
+    es.name,
+    es.age,
+    es.is_active,
+    es.total_visits,
+    es.total_spending,
+    es.monthly_spend_rate,
+    
+    -- Calculate RFM (Recency, Frequency, Monetary) Score
+    (es.recency_score + es.frequency_score + es.monetary_score) AS rfm_score,
+    
+    -- Estimate 12-month Customer Lifetime Value
+    CASE WHEN es.is_active = 1 
+         THEN es.monthly_spend_rate * 12 * (1 + (es.frequency_score * 0.1))
+         ELSE 0 
+    END AS projected_annual_value,
+    
+    -- Segment members into value categories
+    CASE 
+        WHEN (es.recency_score + es.frequency_score + es.monetary_score) >= 7 THEN 'Premium'
+        WHEN (es.recency_score + es.frequency_score + es.monetary_score) >= 4 THEN 'Core'
+        WHEN (es.recency_score + es.frequency_score + es.monetary_score) >= 1 THEN 'Casual'
+        ELSE 'At Risk'
+    END AS customer_segment,
+    
+    -- Churn probability based on activity patterns
+    CASE 
+        WHEN es.is_active = 0 THEN 1.0  -- Already churned
+        WHEN es.recency_score = 0 THEN 0.8  -- No recent visits
+        WHEN es.recency_score = 1 THEN 0.5  -- Low recency
+        WHEN es.recency_score = 2 THEN 0.2  -- Medium recency
+        ELSE 0.1  -- High recency
+    END AS churn_probability
+FROM 
+    EngagementScore es
+ORDER BY 
+    projected_annual_value DESC, member_id;
\ No newline at end of file
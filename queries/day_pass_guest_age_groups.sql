@@ -0,0 +1,24 @@
+-- Age mix of everyone admitted on day passes, per pass type, in the
+-- members_by_age_group brackets
+SELECT 
+    d.pass_type,
+    CASE 
+        WHEN g.age BETWEEN 5 AND 17 THEN 'Under 18'
+        WHEN g.age BETWEEN 18 AND 25 THEN '18-25'
+        WHEN g.age BETWEEN 26 AND 35 THEN '26-35'
+        WHEN g.age BETWEEN 36 AND 45 THEN '36-45'
+        WHEN g.age > 45 THEN '46+'
+    END AS age_group,
+    COUNT(*) AS guests
+FROM Day_Pass_Guests g
+JOIN Day_Passes d ON d.day_pass_id = g.day_pass_id
+GROUP BY 
+    d.pass_type,
+    CASE 
+        WHEN g.age BETWEEN 5 AND 17 THEN 'Under 18'
+        WHEN g.age BETWEEN 18 AND 25 THEN '18-25'
+        WHEN g.age BETWEEN 26 AND 35 THEN '26-35'
+        WHEN g.age BETWEEN 36 AND 45 THEN '36-45'
+        WHEN g.age > 45 THEN '46+'
+    END
+ORDER BY d.pass_type, guests DESC, age_group;
\ No newline at end of file
@@ -0,0 +1,12 @@
+-- Day pass groups per pass type and weekday: passes sold, people admitted and
+-- average group size, counted from the Day_Pass_Guests rows (no string parsing)
+SELECT 
+    d.pass_type,
+    DATEPART(WEEKDAY, d.date) AS weekday,
+    COUNT(DISTINCT d.day_pass_id) AS passes,
+    COUNT(*) AS guests,
+    COUNT(*) * 1.0 / COUNT(DISTINCT d.day_pass_id) AS avg_group_size
+FROM Day_Passes d
+JOIN Day_Pass_Guests g ON g.day_pass_id = d.day_pass_id
+GROUP BY d.pass_type, DATEPART(WEEKDAY, d.date)
+ORDER BY d.pass_type, weekday;
\ No newline at end of file
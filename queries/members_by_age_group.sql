@@ -17,4 +17,4 @@ GROUP BY
         WHEN age BETWEEN 36 AND 45 THEN '36-45'
         WHEN age > 45 THEN '46+'
     END
-ORDER BY total_members DESC;
\ No newline at end of file
+ORDER BY total_members DESC, age_group;
\ No newline at end of file
@@ -0,0 +1,8 @@
+-- Items sold and revenue since the start of last month, straight from Sales;
+-- the date range only touches the last two monthly partitions
+SELECT item, COUNT(*) AS times_sold, SUM(price) AS revenue
+FROM Sales
+WHERE date >= DATEADD(MONTH, -1, DATETRUNC(MONTH, CONVERT(DATE, GETDATE())))
+  AND date < DATEADD(MONTH, 1, DATETRUNC(MONTH, CONVERT(DATE, GETDATE())))
+GROUP BY item
+ORDER BY revenue DESC, item;
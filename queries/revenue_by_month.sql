@@ -1,7 +1,7 @@
--- Sums up total sales revenue by month
+-- Sums up total sales revenue by month (from the Sales_Daily rollup)
 SELECT 
-    FORMAT(date, 'yyyy-MM') AS sales_month,
-    SUM(price) AS total_revenue
-FROM Sales
-GROUP BY FORMAT(date, 'yyyy-MM')
+    FORMAT(sale_date, 'yyyy-MM') AS sales_month,
+    SUM(revenue) AS total_revenue
+FROM Sales_Daily
+GROUP BY FORMAT(sale_date, 'yyyy-MM')
 ORDER BY sales_month DESC;
\ No newline at end of file
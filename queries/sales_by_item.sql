@@ -2,4 +2,4 @@
 SELECT item, COUNT(*) AS times_sold
 FROM Sales
 GROUP BY item
-ORDER BY times_sold DESC;
\ No newline at end of file
+ORDER BY times_sold DESC, item;
\ No newline at end of file
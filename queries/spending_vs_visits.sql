@@ -1,9 +1,9 @@
--- Compares visit frequency and total spending per member
+-- Compares visit frequency and total spending per member (from the Member_Features stage,
+-- so visits and sales are counted separately instead of multiplied by a join)
 SELECT 
-    v.member_id,
-    COUNT(v.visit_id) AS total_visits,
-    SUM(s.price) AS total_spent
-FROM Visits v
-JOIN Sales s ON v.member_id = s.member_id
-GROUP BY v.member_id
-ORDER BY total_spent DESC;
\ No newline at end of file
+    member_id,
+    total_visits,
+    total_spending AS total_spent
+FROM Member_Features
+WHERE total_visits > 0 AND transaction_count > 0
+ORDER BY total_spent DESC, member_id;
\ No newline at end of file
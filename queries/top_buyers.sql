@@ -2,5 +2,5 @@
 SELECT customer_id, COUNT(*) AS total_purchases, SUM(price) AS total_spent
 FROM Sales
 GROUP BY customer_id
-ORDER BY total_spent DESC
+ORDER BY total_spent DESC, customer_id
 LIMIT 10;
\ No newline at end of file
@@ -1,8 +1,8 @@
--- Shows how many visits each member made per month
+-- Shows how many visits each member made per month (from the Visits_Daily rollup)
 SELECT 
-    FORMAT(date, 'yyyy-MM') AS visit_month,
+    FORMAT(visit_date, 'yyyy-MM') AS visit_month,
     member_id,
-    COUNT(*) AS total_visits
-FROM Visits
-GROUP BY FORMAT(date, 'yyyy-MM'), member_id
-ORDER BY visit_month DESC, total_visits DESC;
\ No newline at end of file
+    SUM(visit_count) AS total_visits
+FROM Visits_Daily
+GROUP BY FORMAT(visit_date, 'yyyy-MM'), member_id
+ORDER BY visit_month DESC, total_visits DESC, member_id;
\ No newline at end of file
@@ -1,7 +1,7 @@
--- Shows which days of the week have the most visits
+-- Shows which days of the week have the most visits (from the Visits_Occupancy rollup)
 SELECT 
-    DATEPART(WEEKDAY, date) AS weekday, 
-    COUNT(*) AS visit_count
-FROM Visits
-GROUP BY DATEPART(WEEKDAY, date)
-ORDER BY visit_count DESC;
\ No newline at end of file
+    weekday, 
+    SUM(visit_count) AS visit_count
+FROM Visits_Occupancy
+GROUP BY weekday
+ORDER BY visit_count DESC, weekday;
\ No newline at end of file
@@ -0,0 +1,291 @@
+import argparse
+import hashlib
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from db import BACKENDS, DEFAULT_BACKEND, ConnectionPool, backend_name, query_frame
+from schema import CREATE_TABLES
+from table_versions import create_table_versions, read_table_versions
+
+# -------------------------------------------------------
+# Query runner for the queries/ catalog
+#   - Runs a catalog file (or any SQL) on SQL Server or a local backend;
+#     the catalog is written in T-SQL and translated for SQLite/DuckDB
+#   - Results are cached under the normalized SQL text plus the version
+#     token of every table the query reads (see table_versions.py), so a
+#     loader touching a table invalidates exactly the results built on it
+#   - LRU eviction bounded by entry count and bytes, plus an optional
+#     on-disk tier that survives between processes
+# -------------------------------------------------------
+
+QUERIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "queries")
+
+QueryResult = namedtuple("QueryResult", "name frame seconds cached")
+
+
+def load_catalog(queries_dir=QUERIES_DIR):
+    catalog = {}
+    for filename in sorted(os.listdir(queries_dir)):
+        if filename.endswith(".sql"):
+            with open(os.path.join(queries_dir, filename)) as f:
+                catalog[filename[:-4]] = f.read()
+    return catalog
+
+
+def normalize_sql(sql):
+    # Drop comments, collapse whitespace and the trailing semicolon
+    sql = re.sub(r"--[^\n]*", " ", sql)
+    return re.sub(r"\s+", " ", sql).strip().rstrip(";").strip()
+
+
+def tables_read(sql):
+    known = {name.lower(): name for name in CREATE_TABLES}
+    found = re.findall(r"\b(?:FROM|JOIN)\s+([A-Za-z_][A-Za-z0-9_]*)", sql, flags=re.IGNORECASE)
+    return sorted({known[name.lower()] for name in found if name.lower() in known})
+
+
+# ---------- T-SQL -> SQLite / DuckDB translation ----------
+
+def _call_args(sql, open_paren):
+    # Split the arguments of the call whose "(" is at open_paren
+    depth, args, start = 0, [], open_paren + 1
+    for i in range(open_paren, len(sql)):
+        ch = sql[i]
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                args.append(sql[start:i].strip())
+                return args, i + 1
+        elif ch == "," and depth == 1:
+            args.append(sql[start:i].strip())
+            start = i + 1
+    raise ValueError("Unbalanced parentheses in SQL")
+
+
+def rewrite_calls(sql, name, rewrite):
+    pattern = re.compile(rf"\b{name}\s*\(", re.IGNORECASE)
+    out, pos = [], 0
+    while True:
+        match = pattern.search(sql, pos)
+        if not match:
+            out.append(sql[pos:])
+            return "".join(out)
+        args, end = _call_args(sql, match.end() - 1)
+        out.append(sql[pos:match.start()])
+        out.append(rewrite([rewrite_calls(arg, name, rewrite) for arg in args]))
+        pos = end
+
+
+def _strftime_pattern(dotnet_format):
+    pattern = dotnet_format.strip("'")
+    for token, code in (("yyyy", "%Y"), ("MM", "%m"), ("dd", "%d")):
+        pattern = pattern.replace(token, code)
+    return f"'{pattern}'"
+
+
+def translate_sql(sql, backend):
+    if backend == "sqlserver":
+        # The catalog uses LIMIT n; SQL Server wants SELECT TOP n
+        match = re.search(r"\bLIMIT\s+(\d+)\s*;?\s*$", sql, flags=re.IGNORECASE)
+        if match:
+            sql = sql[:match.start()].rstrip() + ";"
+            sql = re.sub(r"\bSELECT\s+(DISTINCT\s+)?", lambda m: f"SELECT {m.group(1) or ''}TOP {match.group(1)} ",
+                         sql, count=1, flags=re.IGNORECASE)
+        # DATETRUNC is SQL Server 2022+; the month start works everywhere
+        return rewrite_calls(sql, "DATETRUNC",
+                             lambda a: f"DATEFROMPARTS(YEAR({a[1]}), MONTH({a[1]}), 1)" if a[0].upper() == "MONTH"
+                             else f"DATETRUNC({', '.join(a)})")
+
+    if backend == "sqlite":
+        sql = rewrite_calls(sql, "GETDATE", lambda a: "date('now')")
+        # Dates are ISO text here; date() keeps range bounds comparable with them
+        sql = rewrite_calls(sql, "CONVERT", lambda a: f"date({a[1]})")
+        sql = rewrite_calls(sql, "DATETRUNC", lambda a: f"date({a[1]}, 'start of {a[0].lower()}')")
+        sql = rewrite_calls(sql, "DATEADD", lambda a: f"date({a[2]}, ({a[1]}) || ' {a[0].lower()}s')")
+        sql = rewrite_calls(sql, "FORMAT", lambda a: f"strftime({_strftime_pattern(a[1])}, {a[0]})")
+        # SQL Server's default DATEFIRST makes Sunday 1 ... Saturday 7
+        sql = rewrite_calls(sql, "DATEPART", lambda a: f"(CAST(strftime('%w', {a[1]}) AS INTEGER) + 1)")
+        sql = rewrite_calls(sql, "DATEDIFF", lambda a: f"CAST(julianday({a[2]}) - julianday({a[1]}) AS INTEGER)")
+    elif backend == "duckdb":
+        sql = rewrite_calls(sql, "GETDATE", lambda a: "current_date")
+        sql = rewrite_calls(sql, "CONVERT", lambda a: f"CAST({a[1]} AS {a[0]})")
+        sql = rewrite_calls(sql, "DATETRUNC", lambda a: f"CAST(date_trunc('{a[0].lower()}', {a[1]}) AS DATE)")
+        sql = rewrite_calls(sql, "DATEADD", lambda a: f"CAST({a[2]} + INTERVAL ({a[1]}) {a[0]} AS DATE)")
+        sql = rewrite_calls(sql, "FORMAT", lambda a: f"strftime({a[0]}, {_strftime_pattern(a[1])})")
+        sql = rewrite_calls(sql, "DATEPART", lambda a: f"(dayofweek({a[1]}) + 1)")
+        sql = rewrite_calls(sql, "DATEDIFF", lambda a: f"date_diff('{a[0].lower()}', {a[1]}, {a[2]})")
+    return sql
+
+
+# ---------- result cache ----------
+
+class QueryCache:
+    # LRU cache of result DataFrames, bounded by entries and approximate bytes.
+    # With disk_dir set, results are also pickled there; keys include the
+    # table versions, so stale files are simply never looked up again.
+    def __init__(self, max_entries=128, max_bytes=256 * 1024 * 1024, disk_dir=None, max_disk_entries=1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(sql, backend, versions):
+        parts = [backend, normalize_sql(sql)] + [f"{t}={v}" for t, v in sorted(versions.items())]
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+        frame = self._read_disk(key)
+        with self._lock:
+            if frame is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._put_memory(key, frame)
+        return frame
+
+    def put(self, key, frame):
+        self._put_memory(key, frame)
+        self._write_disk(key, frame)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _put_memory(self, key, frame):
+        size = int(frame.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (frame, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _read_disk(self, key):
+        if not self.disk_dir or not os.path.exists(self._disk_path(key)):
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                frame = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        os.utime(self._disk_path(key))  # mtime doubles as the disk tier's LRU clock
+        return frame
+
+    def _write_disk(self, key, frame):
+        if not self.disk_dir:
+            return
+        tmp = self._disk_path(key) + f".{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._disk_path(key))
+        files = [os.path.join(self.disk_dir, n) for n in os.listdir(self.disk_dir) if n.endswith(".pkl")]
+        if len(files) > self.max_disk_entries:
+            files.sort(key=os.path.getmtime)
+            for path in files[:len(files) - self.max_disk_entries]:
+                os.remove(path)
+
+
+# ---------- runner ----------
+
+class QueryRunner:
+    def __init__(self, pool, cache=None, queries_dir=QUERIES_DIR, instrument=None):
+        # instrument: a query_stats.QueryInstrumentation recording every run
+        self.pool = pool
+        self.cache = cache
+        self.instrument = instrument
+        self.catalog = load_catalog(queries_dir)
+        if cache is not None:
+            # Cache keys read Table_Versions; create it once here, not per query
+            with pool.connection() as conn:
+                create_table_versions(conn)
+
+    def sql_for(self, query):
+        # A catalog name ("visits_per_month"), a file path, or raw SQL
+        name = os.path.basename(query)[:-4] if query.endswith(".sql") else query
+        if name in self.catalog:
+            return name, self.catalog[name]
+        if query.endswith(".sql") and os.path.exists(query):
+            with open(query) as f:
+                return name, f.read()
+        return "adhoc", query
+
+    def run(self, query, use_cache=True):
+        name, sql = self.sql_for(query)
+        started = time.perf_counter()
+        with self.pool.connection() as conn:
+            backend = backend_name(conn)
+            key = None
+            if self.cache is not None and use_cache:
+                key = QueryCache.make_key(sql, backend, read_table_versions(conn, tables_read(sql)))
+                frame = self.cache.get(key)
+                if frame is not None:
+                    seconds = time.perf_counter() - started
+                    if self.instrument is not None:
+                        self.instrument.record(name, backend, seconds, len(frame), True)
+                    return QueryResult(name, frame, seconds, True)
+            if self.instrument is not None:
+                frame = self.instrument.execute(conn, name, translate_sql(sql, backend), backend)
+            else:
+                frame = query_frame(conn, translate_sql(sql, backend))
+        if key is not None:
+            self.cache.put(key, frame)
+        return QueryResult(name, frame, time.perf_counter() - started, False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run queries from the queries/ catalog with result caching.")
+    parser.add_argument("queries", nargs="*", help="catalog names or .sql files (default: the whole catalog)")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--database", default=None, help="database file for the sqlite/duckdb backends")
+    parser.add_argument("--cache-dir", default=".query_cache", help="on-disk cache tier ('' to disable)")
+    parser.add_argument("--no-cache", action="store_true", help="always hit the database")
+    parser.add_argument("--repeat", type=int, default=1, help="run each query this many times")
+    parser.add_argument("--show", type=int, default=5, help="rows of each result to print")
+    parser.add_argument("--list", action="store_true", help="list the catalog and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name in load_catalog():
+            print(name)
+        return
+
+    cache = None if args.no_cache else QueryCache(disk_dir=args.cache_dir or None)
+    with ConnectionPool(args.backend, args.database, size=1) as pool:
+        runner = QueryRunner(pool, cache)
+        for query in args.queries or list(runner.catalog):
+            for _ in range(args.repeat):
+                result = runner.run(query)
+                source = "cache" if result.cached else args.backend
+                print(f"{result.name}: {len(result.frame)} rows in {result.seconds * 1000:.1f} ms ({source})")
+            if args.show:
+                print(result.frame.head(args.show).to_string(index=False))
+                print()
+
+
+if __name__ == "__main__":
+    main()
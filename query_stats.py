@@ -0,0 +1,292 @@
+import argparse
+import json
+import re
+import statistics
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from xml.etree import ElementTree
+import pandas as pd
+from benchmark import percentile
+from db import BACKENDS, DEFAULT_BACKEND, ConnectionPool, query_frame
+from schema import CREATE_TABLES, TABLES
+
+# -------------------------------------------------------
+# Query execution instrumentation and slow-query report
+#   - QueryRunner(pool, instrument=QueryInstrumentation()) records wall time,
+#     rows returned and cache hits of every query it runs
+#   - With capture_plans on, each query's plan is kept too: on SQL Server the
+#     actual plan XML plus STATISTICS IO/TIME (logical reads, CPU ms) of every
+#     run; on SQLite / DuckDB the EXPLAIN plan, taken once per query
+#   - Plans are checked for full scans: SQL Server table / clustered index
+#     scans, SQLite "SCAN <table>" with or without a USING (COVERING) INDEX
+#     suffix (only SEARCH is a seek), DuckDB sequential scans with no filter.
+#     Only scans of the base tables count; rollups, member features and
+#     sketches are small by design and meant to be read whole
+#   - Metrics come out in Prometheus text format, and each run can be
+#     appended to a JSON-lines log
+#   - Run as a script, it times the catalog and ranks it by cost
+# -------------------------------------------------------
+
+SAMPLES_KEPT = 1000  # per query, for the latency quantiles
+
+TABLE_NAMES = {name.lower(): name for name in CREATE_TABLES}
+
+# Plan operators that read a whole table or index
+SQLSERVER_SCANS = ("Table Scan", "Clustered Index Scan", "Index Scan")
+
+SQL_KEYWORDS = {"WHERE", "JOIN", "LEFT", "RIGHT", "INNER", "OUTER", "FULL", "CROSS", "ON", "GROUP", "ORDER",
+                "HAVING", "LIMIT", "UNION", "WITH"}
+
+
+def _known_table(name):
+    return TABLE_NAMES.get(name.strip("[]\"").split(".")[-1].strip("[]\"").lower())
+
+
+def _scanned_table(name):
+    # The base table a full scan read, or None for derived / unknown tables
+    table = _known_table(name)
+    return table if table in TABLES else None
+
+
+def table_aliases(sql):
+    # {"v": "Visits", ...} for every "FROM/JOIN Table [AS] alias" in the SQL
+    aliases = {}
+    for table, alias in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, flags=re.IGNORECASE):
+        if _known_table(table) and alias and alias.upper() not in SQL_KEYWORDS:
+            aliases[alias.lower()] = _known_table(table)
+    return aliases
+
+
+# ---------- plans ----------
+
+def sqlite_plan(conn, sql):
+    # EXPLAIN QUERY PLAN rows are (id, parent, notused, detail); scans name
+    # the table's alias when it has one
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    aliases = table_aliases(sql)
+    depth, lines, scans = {0: -1}, [], []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+        # "SCAN t USING COVERING INDEX ix" still reads every row of the index
+        match = re.match(r"SCAN (\w+)", detail)
+        table = match and _scanned_table(aliases.get(match.group(1).lower()) or match.group(1))
+        if table:
+            scans.append(table)
+    return "\n".join(lines), scans
+
+
+def duckdb_plan(conn, sql):
+    plan = json.loads(conn.execute("EXPLAIN (FORMAT JSON) " + sql).fetchall()[0][1])
+    lines, scans = [], []
+
+    def walk(node, depth):
+        info = node.get("extra_info") or {}
+        label = node["name"]
+        if info.get("Table"):
+            label += f" {info['Table']}"
+        if info.get("Filters"):
+            label += f" [{info['Filters']}]"
+        lines.append("  " * depth + label)
+        if node["name"] == "SEQ_SCAN" and not info.get("Filters") and _scanned_table(info.get("Table", "")):
+            scans.append(_scanned_table(info["Table"]))
+        for child in node.get("children", []):
+            walk(child, depth + 1)
+
+    for root in plan:
+        walk(root, 0)
+    return "\n".join(lines), scans
+
+
+def sqlserver_plan_scans(plan_xml):
+    # Tables read by scan operators in a showplan XML document
+    scans = []
+    for relop in ElementTree.fromstring(plan_xml).iterfind(".//{*}RelOp"):
+        if relop.get("PhysicalOp") not in SQLSERVER_SCANS:
+            continue
+        for obj in relop.iterfind(".//{*}Object"):
+            table = _scanned_table(obj.get("Table", ""))
+            if table:
+                scans.append(table)
+                break
+    return scans
+
+
+def sqlserver_execute(conn, sql):
+    # Run with STATISTICS IO/TIME and the actual plan switched on. The plan
+    # arrives as an extra result set, the statistics as info messages.
+    cursor = conn.cursor()
+    cursor.execute("SET STATISTICS IO ON; SET STATISTICS TIME ON; SET STATISTICS XML ON;")
+    try:
+        cursor.execute(sql)
+        columns = [col[0] for col in cursor.description]
+        rows = cursor.fetchall()
+        messages = [text for _, text in cursor.messages]
+        plan_xml = None
+        while cursor.nextset():
+            messages += [text for _, text in cursor.messages]
+            if cursor.description and "Showplan" in cursor.description[0][0]:
+                plan_xml = cursor.fetchall()[0][0]
+    finally:
+        cursor.execute("SET STATISTICS XML OFF; SET STATISTICS IO OFF; SET STATISTICS TIME OFF;")
+        cursor.close()
+    frame = pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns)
+    text = "\n".join(messages)
+    io = {"logical_reads": sum(int(n) for n in re.findall(r"logical reads (\d+)", text)),
+          "cpu_ms": sum(int(n) for n in re.findall(r"CPU time = (\d+) ms", text))}
+    return frame, plan_xml, io
+
+
+# ---------- recorder ----------
+
+class QueryInstrumentation:
+    def __init__(self, capture_plans=False, log_path=None):
+        self.capture_plans = capture_plans
+        self.log_path = log_path
+        self.queries = {}  # (name, backend) -> aggregated stats
+        self._lock = threading.Lock()
+
+    def _entry(self, name, backend):
+        key = (name, backend)
+        if key not in self.queries:
+            self.queries[key] = {"runs": 0, "cached": 0, "seconds": 0.0, "samples": deque(maxlen=SAMPLES_KEPT),
+                                 "rows": 0, "plan": None, "full_scans": [], "logical_reads": None, "cpu_ms": None}
+        return self.queries[key]
+
+    def execute(self, conn, name, sql, backend):
+        # Called by QueryRunner in place of query_frame for uncached runs
+        io = {}
+        if backend == "sqlserver" and self.capture_plans:
+            started = time.perf_counter()
+            frame, plan_xml, io = sqlserver_execute(conn, sql)
+            seconds = time.perf_counter() - started
+            plan = (plan_xml, sqlserver_plan_scans(plan_xml)) if plan_xml else None
+        else:
+            started = time.perf_counter()
+            frame = query_frame(conn, sql)
+            seconds = time.perf_counter() - started
+            plan = None
+            if self.capture_plans and self._entry(name, backend)["plan"] is None:
+                plan = sqlite_plan(conn, sql) if backend == "sqlite" else duckdb_plan(conn, sql)
+        self.record(name, backend, seconds, len(frame), False, plan, io)
+        return frame
+
+    def record(self, name, backend, seconds, rows, cached, plan=None, io=None):
+        with self._lock:
+            entry = self._entry(name, backend)
+            if cached:
+                entry["cached"] += 1
+            else:
+                entry["runs"] += 1
+                entry["seconds"] += seconds
+                entry["samples"].append(seconds)
+            entry["rows"] = rows
+            if plan is not None:
+                entry["plan"], entry["full_scans"] = plan
+            if io:
+                entry.update(io)
+            line = {"ts": datetime.now().isoformat(timespec="milliseconds"), "query": name, "backend": backend,
+                    "ms": round(seconds * 1000, 3), "rows": rows, "cached": cached,
+                    "full_scans": entry["full_scans"], **(io or {})}
+            if self.log_path:
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(line) + "\n")
+
+    def report(self):
+        # Uncached queries, most expensive first (logical reads when SQL
+        # Server reported them, else median wall time)
+        rows = []
+        with self._lock:
+            for (name, backend), entry in self.queries.items():
+                if not entry["samples"]:
+                    continue
+                samples = [s * 1000 for s in entry["samples"]]
+                rows.append({"query": name, "backend": backend, "runs": entry["runs"], "cached": entry["cached"],
+                             "p50_ms": statistics.median(samples), "p95_ms": percentile(samples, 95),
+                             "rows": entry["rows"], "logical_reads": entry["logical_reads"],
+                             "cpu_ms": entry["cpu_ms"], "full_scans": sorted(set(entry["full_scans"])),
+                             "plan": entry["plan"]})
+        return sorted(rows, key=lambda r: (r["logical_reads"] or 0, r["p50_ms"]), reverse=True)
+
+    def prometheus(self, prefix="climbing_query"):
+        lines = [f"# HELP {prefix}_duration_seconds Wall time of uncached catalog queries.",
+                 f"# TYPE {prefix}_duration_seconds summary"]
+        gauges = {"rows": "Rows returned by the latest run.",
+                  "full_scans": "Full table/index scans in the captured plan.",
+                  "logical_reads": "Logical reads of the latest run (SQL Server).",
+                  "cpu_ms": "CPU milliseconds of the latest run (SQL Server)."}
+        with self._lock:
+            entries = sorted(self.queries.items())
+            for (name, backend), entry in entries:
+                labels = f'query="{name}",backend="{backend}"'
+                samples = sorted(entry["samples"])
+                if samples:
+                    for q in (0.5, 0.95):
+                        lines.append(f'{prefix}_duration_seconds{{{labels},quantile="{q}"}} '
+                                     f"{percentile(samples, q * 100):.6f}")
+                lines.append(f"{prefix}_duration_seconds_sum{{{labels}}} {entry['seconds']:.6f}")
+                lines.append(f"{prefix}_duration_seconds_count{{{labels}}} {entry['runs']}")
+            lines += [f"# HELP {prefix}_cache_hits_total Runs answered from the result cache.",
+                      f"# TYPE {prefix}_cache_hits_total counter"]
+            lines += [f'{prefix}_cache_hits_total{{query="{name}",backend="{backend}"}} {entry["cached"]}'
+                      for (name, backend), entry in entries]
+            for metric, help_text in gauges.items():
+                values = [(key, len(entry["full_scans"]) if metric == "full_scans" else entry[metric])
+                          for key, entry in entries]
+                values = [(key, value) for key, value in values if value is not None]
+                if not values:
+                    continue
+                lines += [f"# HELP {prefix}_{metric} {help_text}", f"# TYPE {prefix}_{metric} gauge"]
+                lines += [f'{prefix}_{metric}{{query="{name}",backend="{backend}"}} {value}'
+                          for (name, backend), value in values]
+        return "\n".join(lines) + "\n"
+
+
+def print_report(report, plans=0):
+    print(f"{'query':<34} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} {'rows':>8} {'reads':>9}  full scans")
+    for r in report:
+        reads = f"{r['logical_reads']:,}" if r["logical_reads"] is not None else "-"
+        flag = f"⚠️ {', '.join(r['full_scans'])}" if r["full_scans"] else ""
+        print(f"{r['query']:<34} {r['runs']:>5} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['rows']:>8,} {reads:>9}  {flag}")
+    for r in report[:plans]:
+        if r["plan"]:
+            print(f"\n--- {r['query']} ({r['backend']}) ---")
+            print(r["plan"])
+
+
+def main():
+    from query_runner import QueryRunner
+    parser = argparse.ArgumentParser(description="Time the query catalog, capture plans and rank queries by cost.")
+    parser.add_argument("queries", nargs="*", help="catalog names (default: the whole catalog)")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--database", default=None, help="database file for the sqlite/duckdb backends")
+    parser.add_argument("--repeat", type=int, default=5, help="uncached runs per query")
+    parser.add_argument("--plans", type=int, default=3, help="print the plans of this many slowest queries")
+    parser.add_argument("--log", default=None, help="append one JSON line per run to this file")
+    parser.add_argument("--prometheus", default=None, help="write metrics in Prometheus text format here")
+    parser.add_argument("--output", default=None, help="write the ranked report as JSON here")
+    args = parser.parse_args()
+
+    instrument = QueryInstrumentation(capture_plans=True, log_path=args.log)
+    with ConnectionPool(args.backend, args.database, size=1) as pool:
+        runner = QueryRunner(pool, instrument=instrument)
+        for name in args.queries or list(runner.catalog):
+            for _ in range(args.repeat):
+                runner.run(name, use_cache=False)
+
+    report = instrument.report()
+    print_report(report, args.plans)
+    if args.prometheus:
+        with open(args.prometheus, "w") as f:
+            f.write(instrument.prometheus())
+        print(f"Metrics written to {args.prometheus}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
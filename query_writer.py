@@ -26,13 +26,13 @@ GROUP BY
 ORDER BY total_members DESC;
 """,
     "visits_per_month.sql": """
--- Shows how many visits each member made per month
+-- Shows how many visits each member made per month (from the Visits_Daily rollup)
 SELECT 
-    FORMAT(date, 'yyyy-MM') AS visit_month,
+    FORMAT(visit_date, 'yyyy-MM') AS visit_month,
     member_id,
-    COUNT(*) AS total_visits
-FROM Visits
-GROUP BY FORMAT(date, 'yyyy-MM'), member_id
+    SUM(visit_count) AS total_visits
+FROM Visits_Daily
+GROUP BY FORMAT(visit_date, 'yyyy-MM'), member_id
 ORDER BY visit_month DESC, total_visits DESC;
 """,
     "top_buyers.sql": """
@@ -59,12 +59,12 @@ ORDER BY avg_duration DESC
 LIMIT 10;
 """,
     "revenue_by_month.sql": """
--- Sums up total sales revenue by month
+-- Sums up total sales revenue by month (from the Sales_Daily rollup)
 SELECT 
-    FORMAT(date, 'yyyy-MM') AS sales_month,
-    SUM(price) AS total_revenue
-FROM Sales
-GROUP BY FORMAT(date, 'yyyy-MM')
+    FORMAT(sale_date, 'yyyy-MM') AS sales_month,
+    SUM(revenue) AS total_revenue
+FROM Sales_Daily
+GROUP BY FORMAT(sale_date, 'yyyy-MM')
 ORDER BY sales_month DESC;
 """,
     "active_vs_inactive_members.sql": """
@@ -74,12 +74,12 @@ FROM Members
 GROUP BY is_active;
 """,
     "weekday_popularity.sql": """
--- Shows which days of the week have the most visits
+-- Shows which days of the week have the most visits (from the Visits_Occupancy rollup)
 SELECT 
-    DATEPART(WEEKDAY, date) AS weekday, 
-    COUNT(*) AS visit_count
-FROM Visits
-GROUP BY DATEPART(WEEKDAY, date)
+    weekday, 
+    SUM(visit_count) AS visit_count
+FROM Visits_Occupancy
+GROUP BY weekday
 ORDER BY visit_count DESC;
 """,
     "buyers_who_never_visited.sql": """
@@ -93,20 +93,23 @@ WHERE v.member_id IS NULL;
 -- Calculates average number of days between visits per member
 SELECT 
     member_id, 
-    AVG(DATEDIFF(DAY, LAG(date) OVER (PARTITION BY member_id ORDER BY date), date)) AS avg_days_between_visits
-FROM Visits
+    AVG(DATEDIFF(DAY, prev_date, date)) AS avg_days_between_visits
+FROM (
+    SELECT member_id, date, LAG(date) OVER (PARTITION BY member_id ORDER BY date) AS prev_date
+    FROM Visits
+) AS gaps
 GROUP BY member_id
 ORDER BY avg_days_between_visits;
 """,
     "spending_vs_visits.sql": """
--- Compares visit frequency and total spending per member
+-- Compares visit frequency and total spending per member (from the Member_Features stage,
+-- so visits and sales are counted separately instead of multiplied by a join)
 SELECT 
-    v.member_id,
-    COUNT(v.visit_id) AS total_visits,
-    SUM(s.price) AS total_spent
-FROM Visits v
-JOIN Sales s ON v.member_id = s.member_id
-GROUP BY v.member_id
+    member_id,
+    total_visits,
+    total_spending AS total_spent
+FROM Member_Features
+WHERE total_visits > 0 AND transaction_count > 0
 ORDER BY total_spent DESC;
 """,
     "day_pass_vs_member_usage.sql": """
@@ -114,6 +117,131 @@ ORDER BY total_spent DESC;
 SELECT 
     (SELECT COUNT(*) FROM Visits) AS total_member_visits,
     (SELECT COUNT(*) FROM Day_Passes) AS total_day_pass_visits;
+""",
+    "day_pass_guests_by_weekday.sql": """
+-- Day pass groups per pass type and weekday: passes sold, people admitted and
+-- average group size, counted from the Day_Pass_Guests rows (no string parsing)
+SELECT 
+    d.pass_type,
+    DATEPART(WEEKDAY, d.date) AS weekday,
+    COUNT(DISTINCT d.day_pass_id) AS passes,
+    COUNT(*) AS guests,
+    COUNT(*) * 1.0 / COUNT(DISTINCT d.day_pass_id) AS avg_group_size
+FROM Day_Passes d
+JOIN Day_Pass_Guests g ON g.day_pass_id = d.day_pass_id
+GROUP BY d.pass_type, DATEPART(WEEKDAY, d.date)
+ORDER BY d.pass_type, weekday;
+""",
+    "day_pass_guest_age_groups.sql": """
+-- Age mix of everyone admitted on day passes, per pass type, in the
+-- members_by_age_group brackets
+SELECT 
+    d.pass_type,
+    CASE 
+        WHEN g.age BETWEEN 5 AND 17 THEN 'Under 18'
+        WHEN g.age BETWEEN 18 AND 25 THEN '18-25'
+        WHEN g.age BETWEEN 26 AND 35 THEN '26-35'
+        WHEN g.age BETWEEN 36 AND 45 THEN '36-45'
+        WHEN g.age > 45 THEN '46+'
+    END AS age_group,
+    COUNT(*) AS guests
+FROM Day_Pass_Guests g
+JOIN Day_Passes d ON d.day_pass_id = g.day_pass_id
+GROUP BY 
+    d.pass_type,
+    CASE 
+        WHEN g.age BETWEEN 5 AND 17 THEN 'Under 18'
+        WHEN g.age BETWEEN 18 AND 25 THEN '18-25'
+        WHEN g.age BETWEEN 26 AND 35 THEN '26-35'
+        WHEN g.age BETWEEN 36 AND 45 THEN '36-45'
+        WHEN g.age > 45 THEN '46+'
+    END
+ORDER BY d.pass_type, guests DESC;
+""",
+    "customer_lifetime_value.sql": """
+-- Customer lifetime value with RFM segments, served from the Member_Features stage
+-- (visits, last visit and spend per member, built in one pass over Visits and Sales)
+
+WITH EngagementScore AS (
+    SELECT 
+        m.member_id,
+        m.name,
+        m.age,
+        m.is_active,
+        f.total_visits,
+        f.total_spending,
+        CASE WHEN DATEDIFF(DAY, m.join_date, GETDATE()) > 0 
+             THEN f.total_spending / DATEDIFF(DAY, m.join_date, GETDATE()) * 30 
+             ELSE 0 END AS monthly_spend_rate,
+        
+        -- Recency Factor (based on days since last visit)
+        CASE 
+            WHEN DATEDIFF(DAY, f.last_visit, GETDATE()) <= 14 THEN 3  -- Visited in last 14 days
+            WHEN DATEDIFF(DAY, f.last_visit, GETDATE()) <= 30 THEN 2  -- Visited in last 30 days
+            WHEN f.last_visit IS NOT NULL THEN 1                      -- Has visited before
+            ELSE 0                                                    -- Never visited
+        END AS recency_score,
+        
+        -- Frequency Score (based on visit frequency)
+        CASE 
+            WHEN f.total_visits >= 20 THEN 3  -- High frequency
+            WHEN f.total_visits >= 10 THEN 2  -- Medium frequency
+            WHEN f.total_visits >= 1 THEN 1   -- Low frequency
+            ELSE 0                            -- No visits
+        END AS frequency_score,
+        
+        -- Monetary Score (based on spending)
+        CASE 
+            WHEN f.total_spending >= 500 THEN 3  -- High spender
+            WHEN f.total_spending >= 200 THEN 2  -- Medium spender
+            WHEN f.total_spending > 0 THEN 1     -- Low spender
+            ELSE 0                               -- No spending
+        END AS monetary_score
+    FROM 
+        Members m
+    JOIN 
+        Member_Features f ON f.member_id = m.member_id
+)
+
+-- Final query: Calculate Customer Lifetime Value with segment classification
+SELECT 
+    es.member_id,
+    es.name,
+    es.age,
+    es.is_active,
+    es.total_visits,
+    es.total_spending,
+    es.monthly_spend_rate,
+    
+    -- Calculate RFM (Recency, Frequency, Monetary) Score
+    (es.recency_score + es.frequency_score + es.monetary_score) AS rfm_score,
+    
+    -- Estimate 12-month Customer Lifetime Value
+    CASE WHEN es.is_active = 1 
+         THEN es.monthly_spend_rate * 12 * (1 + (es.frequency_score * 0.1))
+         ELSE 0 
+    END AS projected_annual_value,
+    
+    -- Segment members into value categories
+    CASE 
+        WHEN (es.recency_score + es.frequency_score + es.monetary_score) >= 7 THEN 'Premium'
+        WHEN (es.recency_score + es.frequency_score + es.monetary_score) >= 4 THEN 'Core'
+        WHEN (es.recency_score + es.frequency_score + es.monetary_score) >= 1 THEN 'Casual'
+        ELSE 'At Risk'
+    END AS customer_segment,
+    
+    -- Churn probability based on activity patterns
+    CASE 
+        WHEN es.is_active = 0 THEN 1.0  -- Already churned
+        WHEN es.recency_score = 0 THEN 0.8  -- No recent visits
+        WHEN es.recency_score = 1 THEN 0.5  -- Low recency
+        WHEN es.recency_score = 2 THEN 0.2  -- Medium recency
+        ELSE 0.1  -- High recency
+    END AS churn_probability
+FROM 
+    EngagementScore es
+ORDER BY 
+    projected_annual_value DESC;
 """
 }
 
@@ -0,0 +1,97 @@
+import pandas as pd
+from bulk_loader import DEFAULT_BATCH_SIZE, insert_dataframe
+from db import query_frame
+from schema import ROLLUP_TABLES, create_tables
+from sketches import rebuild_sketches
+from table_versions import bump_table_versions
+
+# -------------------------------------------------------
+# Rollup tables behind the monthly / weekday KPIs
+#   - Visits_Daily: visits and minutes per member per day
+#   - Sales_Daily: sales and revenue per item per day
+#   - Visits_Occupancy: visits and minutes per weekday x hour
+#   - Rows are additive, so new source rows are folded in by adding their
+#     aggregates (incremental_loader) and a full load rebuilds them once
+#   - Catalog queries read these instead of scanning Visits / Sales, so
+#     their cost follows the number of periods, not the number of rows
+#   - The per-day sketches behind the approximate KPIs (sketches.py) are
+#     rebuilt alongside
+# -------------------------------------------------------
+
+# Rollup -> the table it's built from, and its key columns
+ROLLUP_SOURCES = {"Visits_Daily": "Visits", "Sales_Daily": "Sales", "Visits_Occupancy": "Visits"}
+ROLLUP_KEYS = {
+    "Visits_Daily": ["visit_date", "member_id"],
+    "Sales_Daily": ["sale_date", "item"],
+    "Visits_Occupancy": ["weekday", "hour"],
+}
+
+# Day column of the rollups kept per day; Visits_Occupancy spans every day
+ROLLUP_DAYS = {"Visits_Daily": "visit_date", "Sales_Daily": "sale_date"}
+
+# Row count of each rollup: a key whose count drops to zero has no rows left
+ROLLUP_COUNTS = {"Visits_Daily": "visit_count", "Sales_Daily": "sale_count", "Visits_Occupancy": "visit_count"}
+
+# Source columns the rollups need
+SOURCE_COLUMNS = {"Visits": ["member_id", "date", "time", "duration"], "Sales": ["date", "item", "price"]}
+
+
+def weekday_numbers(dates):
+    # Sunday = 1 ... Saturday = 7, like SQL Server's default DATEPART(WEEKDAY)
+    return (dates.dt.dayofweek + 1) % 7 + 1
+
+
+def hours(times):
+    # "9:00" strings (CSV, SQLite) or datetime.time values (Parquet, DuckDB, SQL Server)
+    return times.astype(str).str.split(":", n=1).str[0].astype(int)
+
+
+def rollup_frames(table, df):
+    # Aggregates of the given source rows, for every rollup built on table
+    if table == "Visits":
+        dates = pd.to_datetime(df["date"])
+        rows = pd.DataFrame({
+            "visit_date": dates.dt.normalize().values,
+            "member_id": df["member_id"].astype(int).values,
+            "weekday": weekday_numbers(dates).values,
+            "hour": hours(df["time"]).values,
+            "visit_count": 1,
+            "total_duration": pd.to_numeric(df["duration"]).astype(int).values,
+        })
+        measures = ["visit_count", "total_duration"]
+        return {
+            "Visits_Daily": rows.groupby(ROLLUP_KEYS["Visits_Daily"], as_index=False)[measures].sum(),
+            "Visits_Occupancy": rows.groupby(ROLLUP_KEYS["Visits_Occupancy"], as_index=False)[measures].sum(),
+        }
+    if table == "Sales":
+        rows = pd.DataFrame({
+            "sale_date": pd.to_datetime(df["date"]).dt.normalize().values,
+            "item": df["item"].astype(str).values,
+            "sale_count": 1,
+            "revenue": pd.to_numeric(df["price"], errors="coerce").fillna(0).values,
+        })
+        daily = rows.groupby(ROLLUP_KEYS["Sales_Daily"], as_index=False)[["sale_count", "revenue"]].sum()
+        daily["revenue"] = daily["revenue"].round(2)
+        return {"Sales_Daily": daily}
+    return {}
+
+
+def rebuild_rollups(conn, batch_size=DEFAULT_BATCH_SIZE, suffix=""):
+    # Recompute every rollup from the base tables already in the database;
+    # suffix builds them from / into staging tables (see swap_reload.py)
+    create_tables(conn, ROLLUP_TABLES, if_not_exists=True, suffix=suffix)
+    cursor = conn.cursor()
+    for rollup in ROLLUP_TABLES:
+        cursor.execute(f"DELETE FROM {rollup}{suffix}")
+    conn.commit()
+    cursor.close()
+    rows = {}
+    for table, columns in SOURCE_COLUMNS.items():
+        source = query_frame(conn, f"SELECT {', '.join(columns)} FROM {table}{suffix}")
+        for rollup, frame in rollup_frames(table, source).items():
+            rows[rollup] = insert_dataframe(conn, rollup, frame, batch_size, suffix=suffix)
+    print("Rebuilt rollups: " + ", ".join(f"{rollup} ({count} rows)" for rollup, count in rows.items()))
+    if not suffix:
+        bump_table_versions(conn, ROLLUP_TABLES)
+    rebuild_sketches(conn, batch_size, suffix)
+    return rows
@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from benchmark import time_queries
+from bulk_loader import DEFAULT_BATCH_SIZE, load_table_files
+from dataset_io import FORMATS, peak_rss_mb
+from db import ConnectionPool
+from member_features import build_member_features
+from query_runner import QueryRunner
+from rollups import rebuild_rollups
+from schema import SCHEMA_PROFILES, create_indexes, create_tables, drop_tables
+
+# -------------------------------------------------------
+# Scale-factor benchmark suite
+#   - SF1 is the generator's default size; SF10 / SF100 multiply every table
+#   - Per scale factor: generator rows/sec and peak RSS (measured in a fresh
+#     process), loader rows/sec per table on a local backend, and p50 / p95
+#     latency of every queries/*.sql
+#   - Results go to JSON; --baseline / --compare flag metrics that got worse
+#     by more than --threshold between two runs
+# -------------------------------------------------------
+
+LOCAL_BACKENDS = ("sqlite", "duckdb")
+
+# Metric -> True when a higher value is better
+METRICS = {"rows_per_sec": True, "peak_rss_mb": False, "p50_ms": False, "p95_ms": False}
+
+
+def _generate(directory, scale_factor, seed, chunk_size, fmt):
+    # Runs in its own process so peak RSS belongs to this scale factor alone
+    import data_generation_2
+    started = time.perf_counter()
+    written = data_generation_2.generate(seed, chunk_size, fmt, vectorized=True,
+                                         scale_factor=scale_factor, directory=directory)
+    seconds = time.perf_counter() - started
+    rows = sum(written.values())
+    return {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds, "peak_rss_mb": peak_rss_mb()}
+
+
+def run_scale_factor(scale_factor, workdir, backend="sqlite", fmt="csv", seed=42, chunk_size=500_000,
+                     batch_size=DEFAULT_BATCH_SIZE, profile="baseline", repeat=20):
+    directory = os.path.join(workdir, f"sf{scale_factor}")
+    os.makedirs(directory, exist_ok=True)
+    print(f"=== SF{scale_factor}: generating ===")
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        generated = executor.submit(_generate, directory, scale_factor, seed, chunk_size, fmt).result()
+
+    print(f"=== SF{scale_factor}: loading into {backend} ===")
+    database = os.path.join(directory, f"bench.{backend}")
+    if os.path.exists(database):
+        os.remove(database)
+    with ConnectionPool(backend, database, size=1) as pool:
+        with pool.connection() as conn:
+            drop_tables(conn)
+            create_tables(conn, profile=profile)
+            tables = load_table_files(conn, batch_size=batch_size, fmt=fmt, directory=directory)
+            started = time.perf_counter()
+            create_indexes(conn, profile)
+            index_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            rebuild_rollups(conn, batch_size)
+            build_member_features(conn)
+            derived_seconds = time.perf_counter() - started
+
+        print(f"=== SF{scale_factor}: timing queries ===")
+        runner = QueryRunner(pool)
+        timings = time_queries(runner, list(runner.catalog), repeat)
+
+    rows = sum(stats["rows"] for stats in tables.values())
+    seconds = sum(stats["seconds"] for stats in tables.values())
+    return {
+        "generate": generated,
+        "load": {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds else None,
+                 "index_seconds": index_seconds, "derived_seconds": derived_seconds, "tables": tables},
+        "queries": {name: {"p50_ms": t["median_ms"], "p95_ms": t["p95_ms"]} for name, t in timings.items()},
+    }
+
+
+def flatten_metrics(results, path=()):
+    # {("sf1", "load", "tables", "Visits", "rows_per_sec"): 123.0, ...}
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten_metrics(value, path + (key,)))
+        elif key in METRICS and isinstance(value, (int, float)):
+            flat[path + (key,)] = value
+    return flat
+
+
+def compare_results(old, new, threshold=0.10, min_ms=1.0):
+    # Metrics present in both runs that moved the wrong way by > threshold.
+    # Latencies also need to move by at least min_ms, to ignore timer noise.
+    old_flat, new_flat = flatten_metrics(old["results"]), flatten_metrics(new["results"])
+    regressions = []
+    for path in sorted(old_flat.keys() & new_flat.keys()):
+        before, after = old_flat[path], new_flat[path]
+        if not before:
+            continue
+        change = (after - before) / before
+        higher_is_better = METRICS[path[-1]]
+        worse = change < -threshold if higher_is_better else change > threshold
+        if worse and path[-1].endswith("_ms") and after - before < min_ms:
+            worse = False
+        if worse:
+            regressions.append({"metric": "/".join(path), "before": before, "after": after, "change": change})
+    return regressions
+
+
+def print_summary(results):
+    for sf, result in results["results"].items():
+        generated, load = result["generate"], result["load"]
+        print(f"{sf}: generated {generated['rows']:,} rows at {generated['rows_per_sec']:,.0f} rows/sec "
+              f"(peak RSS {generated['peak_rss_mb']:.0f} MB); loaded at {load['rows_per_sec']:,.0f} rows/sec")
+        for table, stats in load["tables"].items():
+            print(f"    {table:<12} {stats['rows']:>10,} rows {stats['rows_per_sec'] or 0:>12,.0f} rows/sec")
+        for name, timing in result["queries"].items():
+            print(f"    {name:<30} p50 {timing['p50_ms']:>9.1f} ms   p95 {timing['p95_ms']:>9.1f} ms")
+
+
+def print_regressions(regressions):
+    if not regressions:
+        print("✅ No regressions.")
+        return
+    print(f"❌ {len(regressions)} regression(s):")
+    for r in regressions:
+        print(f"    {r['metric']}: {r['before']:,.2f} -> {r['after']:,.2f} ({r['change']:+.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark generation, loading and queries across scale factors.")
+    parser.add_argument("--scale-factors", type=int, nargs="+", default=[1, 10], help="e.g. 1 10 100")
+    parser.add_argument("--backend", choices=LOCAL_BACKENDS, default="sqlite")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--schema-profile", choices=SCHEMA_PROFILES, default="baseline")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=500_000)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query")
+    parser.add_argument("--workdir", default="bench_runs", help="generated files and databases, one folder per SF")
+    parser.add_argument("--output", default="scale_benchmark.json")
+    parser.add_argument("--baseline", default=None, help="earlier results to check this run against")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change that counts as a regression")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="ignore latency changes smaller than this")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f_old, open(args.compare[1]) as f_new:
+            regressions = compare_results(json.load(f_old), json.load(f_new), args.threshold, args.min_ms)
+        print_regressions(regressions)
+        raise SystemExit(1 if regressions else 0)
+
+    results = {
+        "meta": {"started": datetime.now().isoformat(timespec="seconds"), "backend": args.backend,
+                 "format": args.format, "schema_profile": args.schema_profile, "seed": args.seed,
+                 "repeat": args.repeat, "python": platform.python_version(), "machine": platform.platform()},
+        "results": {},
+    }
+    for scale_factor in args.scale_factors:
+        results["results"][f"sf{scale_factor}"] = run_scale_factor(
+            scale_factor, args.workdir, args.backend, args.format, args.seed, args.chunk_size,
+            args.batch_size, args.schema_profile, args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print()
+    print_summary(results)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_results(json.load(f), results, args.threshold, args.min_ms)
+        print_regressions(regressions)
+        raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+import re
+from db import backend_name
+from dataset_io import EXTENSIONS
+
+# -------------------------------------------------------
+# Table definitions shared by the loaders
+#   - TABLES is in foreign key order: parents before children
+#   - DDL is written for SQL Server; local backends get small type tweaks
+#   - Schema profiles add secondary indexes, built after the bulk load:
+#       baseline     primary keys only
+#       rowstore     covering nonclustered indexes on the FK / date columns
+#       columnstore  clustered columnstore on Visits and Sales (SQL Server;
+#                    DuckDB is columnar already, SQLite has no equivalent)
+#       partitioned  rowstore indexes, with Visits and Sales range-partitioned
+#                    by month on SQL Server (see partitions.py)
+# -------------------------------------------------------
+
+TABLES = ["Customers", "Members", "Visits", "Day_Passes", "Day_Pass_Guests", "Sales"]
+
+# Pre-aggregated tables derived from Visits and Sales
+ROLLUP_TABLES = ["Visits_Daily", "Sales_Daily", "Visits_Occupancy"]
+
+# Parent tables each table's foreign keys point at
+TABLE_DEPENDENCIES = {
+    "Customers": [],
+    "Members": ["Customers"],
+    "Visits": ["Members"],
+    "Day_Passes": ["Customers"],
+    "Day_Pass_Guests": ["Day_Passes"],
+    "Sales": ["Customers"],
+}
+
+FOREIGN_KEY_COLUMNS = {
+    "Customers": [],
+    "Members": ["customer_id"],
+    "Visits": ["member_id"],
+    "Day_Passes": ["purchaser_id"],
+    "Day_Pass_Guests": ["day_pass_id"],
+    "Sales": ["customer_id"],
+}
+
+PRIMARY_KEYS = {
+    "Customers": "customer_id",
+    "Members": "member_id",
+    "Visits": "visit_id",
+    "Day_Passes": "day_pass_id",
+    "Day_Pass_Guests": "guest_id",
+    "Sales": "sale_id",
+}
+
+# Column that only moves forward as new activity is recorded (None for tables
+# without one); used with the primary key as the incremental-load watermark
+DATE_COLUMNS = {
+    "Customers": None,
+    "Members": "join_date",
+    "Visits": "date",
+    "Day_Passes": "date",
+    "Day_Pass_Guests": None,
+    "Sales": "date",
+}
+
+CSV_FILES = {
+    "Customers": "customers.csv",
+    "Members": "members.csv",
+    "Visits": "visits.csv",
+    "Day_Passes": "day_passes.csv",
+    "Day_Pass_Guests": "day_pass_guests.csv",
+    "Sales": "sales.csv",
+}
+
+
+
+def data_file(table, fmt="csv"):
+    # customers.csv / customers.parquet / customers.arrow
+    return CSV_FILES[table].replace(".csv", EXTENSIONS[fmt])
+
+
+CREATE_TABLES = {
+    "Customers": """
+CREATE TABLE Customers (
+    customer_id INT PRIMARY KEY,
+    name VARCHAR(50),
+    age INT
+)""",
+    "Members": """
+CREATE TABLE Members (
+    member_id INT PRIMARY KEY,
+    customer_id INT,
+    name VARCHAR(50),
+    age INT,
+    join_date DATE,
+    is_active BIT,
+    FOREIGN KEY (customer_id) REFERENCES Customers(customer_id)
+)""",
+    "Visits": """
+CREATE TABLE Visits (
+    visit_id INT PRIMARY KEY,
+    member_id INT,
+    date DATE,
+    time TIME,
+    duration INT,
+    FOREIGN KEY (member_id) REFERENCES Members(member_id)
+)""",
+    "Day_Passes": """
+CREATE TABLE Day_Passes (
+    day_pass_id INT PRIMARY KEY,
+    purchaser_id INT,
+    date DATE,
+    pass_type VARCHAR(20),
+    FOREIGN KEY (purchaser_id) REFERENCES Customers(customer_id)
+)""",
+    # One row per person admitted on a day pass; guest_number 1 is the purchaser
+    "Day_Pass_Guests": """
+CREATE TABLE Day_Pass_Guests (
+    guest_id INT PRIMARY KEY,
+    day_pass_id INT,
+    guest_number INT,
+    age INT,
+    FOREIGN KEY (day_pass_id) REFERENCES Day_Passes(day_pass_id)
+)""",
+    "Sales": """
+CREATE TABLE Sales (
+    sale_id INT PRIMARY KEY,
+    customer_id INT,
+    member_id INT NULL,
+    date DATE,
+    item VARCHAR(50),
+    price DECIMAL(10,2),
+    FOREIGN KEY (customer_id) REFERENCES Customers(customer_id)
+)""",
+    # High-water marks of what has been loaded into each table
+    "Load_Watermarks": """
+CREATE TABLE Load_Watermarks (
+    table_name VARCHAR(50) PRIMARY KEY,
+    max_id INT,
+    max_date DATE
+)""",
+    # Changes whenever a loader modifies the table; keys the query cache
+    "Table_Versions": """
+CREATE TABLE Table_Versions (
+    table_name VARCHAR(50) PRIMARY KEY,
+    version VARCHAR(32)
+)""",
+    # Rollups kept up to date by the loaders (see rollups.py)
+    "Visits_Daily": """
+CREATE TABLE Visits_Daily (
+    visit_date DATE,
+    member_id INT,
+    visit_count INT,
+    total_duration INT,
+    PRIMARY KEY (visit_date, member_id)
+)""",
+    "Sales_Daily": """
+CREATE TABLE Sales_Daily (
+    sale_date DATE,
+    item VARCHAR(50),
+    sale_count INT,
+    revenue DECIMAL(12,2),
+    PRIMARY KEY (sale_date, item)
+)""",
+    "Visits_Occupancy": """
+CREATE TABLE Visits_Occupancy (
+    weekday INT,
+    hour INT,
+    visit_count INT,
+    total_duration INT,
+    PRIMARY KEY (weekday, hour)
+)""",
+    # One HyperLogLog / t-digest per day and metric (see sketches.py)
+    "Daily_Sketches": """
+CREATE TABLE Daily_Sketches (
+    sketch_date DATE,
+    metric VARCHAR(30),
+    sketch VARBINARY(MAX),
+    PRIMARY KEY (sketch_date, metric)
+)""",
+    # One row per member, rebuilt by the loaders (see member_features.py)
+    "Member_Features": """
+CREATE TABLE Member_Features (
+    member_id INT PRIMARY KEY,
+    customer_id INT,
+    total_visits INT,
+    first_visit DATE,
+    last_visit DATE,
+    avg_days_between_visits FLOAT,
+    total_duration INT,
+    total_spending DECIMAL(12,2),
+    transaction_count INT
+)""",
+}
+
+# DuckDB's BIT is a bit string, not a 0/1 flag; sketches are plain BLOBs locally
+TYPE_OVERRIDES = {
+    "duckdb": {" BIT,": " BOOLEAN,", " VARBINARY(MAX),": " BLOB,"},
+    "sqlite": {" VARBINARY(MAX),": " BLOB,"},
+}
+
+SCHEMA_PROFILES = ("baseline", "rowstore", "columnstore", "partitioned")
+
+# (name, table, key columns, included columns). Local backends have no
+# INCLUDE, so the included columns are appended to the key instead.
+ROWSTORE_INDEXES = [
+    ("IX_Visits_member_date", "Visits", ["member_id", "date"], ["duration"]),
+    ("IX_Visits_date", "Visits", ["date"], ["member_id", "time"]),
+    ("IX_Sales_customer", "Sales", ["customer_id"], ["price"]),
+    ("IX_Sales_member", "Sales", ["member_id"], ["price"]),
+    ("IX_Sales_date", "Sales", ["date"], ["item", "price"]),
+    ("IX_Day_Passes_purchaser", "Day_Passes", ["purchaser_id"], []),
+    ("IX_Day_Pass_Guests_pass", "Day_Pass_Guests", ["day_pass_id"], ["age"]),
+]
+
+COLUMNSTORE_TABLES = ["Visits", "Sales"]
+
+# Monthly RANGE RIGHT partitions on SQL Server: each boundary is the first day
+# of a month. The primary key takes the date column so every index is aligned
+# with the partitions and a month can be switched in and out.
+PARTITIONED_TABLES = ["Visits", "Sales"]
+PARTITION_FUNCTION = "PF_Monthly"
+PARTITION_SCHEME = "PS_Monthly"
+
+
+def suffix_tables(sql, suffix):
+    # Append suffix to every table name in sql (staging copies: Visits ->
+    # Visits__stage); column names are left alone
+    if not suffix:
+        return sql
+    names = "|".join(sorted(CREATE_TABLES, key=len, reverse=True))
+    return re.sub(rf"\b({names})\b", lambda m: m.group(1) + suffix, sql)
+
+
+def table_ddl(table, backend="sqlserver", profile="baseline", suffix="", foreign_keys=True):
+    ddl = CREATE_TABLES[table]
+    # Types first: the overrides match on the comma a foreign key follows
+    for old, new in TYPE_OVERRIDES.get(backend, {}).items():
+        ddl = ddl.replace(old, new)
+    if not foreign_keys:
+        ddl = re.sub(r",\s*FOREIGN KEY \(\w+\) REFERENCES \w+\(\w+\)", "", ddl)
+    if profile == "columnstore" and backend == "sqlserver" and table in COLUMNSTORE_TABLES:
+        # The clustered columnstore index takes the clustered slot
+        key = PRIMARY_KEYS[table]
+        ddl = ddl.replace(f"{key} INT PRIMARY KEY,", f"{key} INT PRIMARY KEY NONCLUSTERED,")
+    if profile == "partitioned" and backend == "sqlserver" and table in PARTITIONED_TABLES:
+        key, date_col = PRIMARY_KEYS[table], DATE_COLUMNS[table]
+        ddl = ddl.replace(f"{key} INT PRIMARY KEY,", f"{key} INT NOT NULL,")
+        ddl = ddl.replace(f"{date_col} DATE,", f"{date_col} DATE NOT NULL,")
+        ddl = ddl[:ddl.rindex(")")].rstrip() + f",\n    PRIMARY KEY ({key}, {date_col})\n)" + partition_clause(table)
+    return suffix_tables(ddl, suffix)
+
+
+def partition_clause(table):
+    return f" ON {PARTITION_SCHEME}({DATE_COLUMNS[table]})"
+
+
+def create_partition_scheme(conn, boundaries=()):
+    # SQL Server only: the monthly partition function and scheme, if they
+    # don't exist yet. partitions.add_months() splits in later months.
+    if backend_name(conn) != "sqlserver":
+        return False
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sys.partition_functions WHERE name = ?", PARTITION_FUNCTION)
+    if cursor.fetchone():
+        cursor.close()
+        return False
+    values = ", ".join(f"'{boundary}'" for boundary in sorted(boundaries))
+    cursor.execute(f"CREATE PARTITION FUNCTION {PARTITION_FUNCTION} (DATE) AS RANGE RIGHT FOR VALUES ({values})")
+    cursor.execute(f"CREATE PARTITION SCHEME {PARTITION_SCHEME} AS PARTITION {PARTITION_FUNCTION} ALL TO ([PRIMARY])")
+    conn.commit()
+    cursor.close()
+    return True
+
+
+def index_ddl(name, table, keys, include, backend="sqlserver"):
+    if backend == "sqlserver":
+        ddl = f"CREATE NONCLUSTERED INDEX {name} ON {table} ({', '.join(keys)})"
+        return ddl + (f" INCLUDE ({', '.join(include)})" if include else "")
+    return f"CREATE INDEX {name} ON {table} ({', '.join(keys + include)})"
+
+
+def profile_indexes(profile):
+    if profile == "rowstore":
+        return ROWSTORE_INDEXES
+    if profile == "partitioned":
+        return ROWSTORE_INDEXES  # aligned with the partitions by default
+    if profile == "columnstore":
+        # Columnstore tables are scanned by segment; the rest stay row-store
+        return [index for index in ROWSTORE_INDEXES if index[1] not in COLUMNSTORE_TABLES]
+    return []
+
+
+def create_indexes(conn, profile="baseline", suffix="", index_suffix=""):
+    # Run after the bulk load: building an index once is cheaper than
+    # maintaining it row by row during the inserts. suffix picks the
+    # (staging) tables; index_suffix keeps index names unique on SQLite,
+    # where they are database-wide.
+    backend = backend_name(conn)
+    statements = [index_ddl(name + index_suffix, table + suffix, keys, include, backend=backend)
+                  for name, table, keys, include in profile_indexes(profile)]
+    if profile == "columnstore" and backend == "sqlserver":
+        statements += [f"CREATE CLUSTERED COLUMNSTORE INDEX CCI_{table} ON {table}{suffix}"
+                       for table in COLUMNSTORE_TABLES]
+    if backend == "sqlite":
+        statements.append("ANALYZE")  # planner statistics for the new indexes
+    cursor = conn.cursor()
+    for statement in statements:
+        cursor.execute(statement)
+    conn.commit()
+    cursor.close()
+    return statements
+
+
+def disable_foreign_keys(conn, tables=TABLES):
+    # For a bulk load of data that validation.py has already checked. Only
+    # SQL Server can switch them off per table; SQLite connections don't
+    # enforce them unless asked to, and DuckDB always does.
+    if backend_name(conn) != "sqlserver":
+        return False
+    cursor = conn.cursor()
+    for table in tables:
+        cursor.execute(f"ALTER TABLE {table} NOCHECK CONSTRAINT ALL")
+    conn.commit()
+    cursor.close()
+    return True
+
+
+def enable_foreign_keys(conn, tables=TABLES):
+    # Re-check every row against its constraints. WITH CHECK also makes SQL
+    # Server trust the keys again, so the optimizer can use them.
+    backend = backend_name(conn)
+    cursor = conn.cursor()
+    if backend == "sqlserver":
+        for table in tables:
+            cursor.execute(f"ALTER TABLE {table} WITH CHECK CHECK CONSTRAINT ALL")
+        conn.commit()
+    elif backend == "sqlite":
+        violations = []
+        for table in tables:
+            cursor.execute(f"PRAGMA foreign_key_check({table})")
+            violations += cursor.fetchall()
+        if violations:
+            cursor.close()
+            raise ValueError(f"{len(violations)} foreign key violation(s), e.g. {violations[:5]}")
+    cursor.close()
+
+
+def drop_tables(conn, tables=TABLES):
+    backend = backend_name(conn)
+    cursor = conn.cursor()
+    if backend == "sqlserver":
+        # Drop foreign keys safely
+        cursor.execute("""
+DECLARE @sql NVARCHAR(MAX) = '';
+SELECT @sql += 'ALTER TABLE ' + QUOTENAME(OBJECT_NAME(parent_object_id)) +
+               ' DROP CONSTRAINT ' + QUOTENAME(name) + '; '
+FROM sys.foreign_keys;
+IF @sql <> ''
+    EXEC sp_executesql @sql;
+""")
+    # Drop tables in correct order (children first)
+    for table in reversed(tables):
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.commit()
+
+
+def create_tables(conn, tables=TABLES, if_not_exists=False, profile="baseline", suffix="", foreign_keys=True):
+    backend = backend_name(conn)
+    if profile == "partitioned" and set(tables) & set(PARTITIONED_TABLES):
+        create_partition_scheme(conn)
+    cursor = conn.cursor()
+    for table in tables:
+        ddl = table_ddl(table, backend, profile, suffix, foreign_keys)
+        if if_not_exists:
+            if backend == "sqlserver":
+                ddl = f"IF OBJECT_ID(N'{table}{suffix}', N'U') IS NULL\n{ddl}"
+            else:
+                ddl = ddl.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1)
+        cursor.execute(ddl)
+    conn.commit()
@@ -0,0 +1,315 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from bulk_loader import DEFAULT_BATCH_SIZE, insert_dataframe
+from db import BACKENDS, DEFAULT_BACKEND, connect_with_retry, query_frame
+from schema import create_tables
+from table_versions import bump_table_versions
+
+# -------------------------------------------------------
+# Approximate analytics from mergeable per-day sketches
+#   - HyperLogLog (2^12 registers, ~1.6% standard error) for distinct
+#     visitors and buyers; t-digest (merging variant, k1 scale) for visit
+#     duration and sale price percentiles, with an exact count / sum
+#   - Daily_Sketches holds one sketch per day and metric. rebuild_rollups()
+#     rebuilds it with the other rollups; incremental loads merge the new
+#     rows into the stored days
+#   - Queries read the days in a sargable date range and merge them:
+#     register-wise max for HLL, re-compressed centroids for t-digest. The
+#     cost follows the number of days, not rows
+#   - Every estimate comes with bounds: 3 standard errors for HLL, the
+#     percentiles RANK_ERROR either side for t-digest
+#   - exact_kpis() answers the same KPIs from the base tables;
+#     tests/test_sketches.py checks every estimate against it
+# -------------------------------------------------------
+
+SKETCH_TABLE = "Daily_Sketches"
+
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_ERROR = 1.04 / np.sqrt(HLL_REGISTERS)  # relative standard error
+
+TDIGEST_COMPRESSION = 100
+RANK_ERROR = 0.01  # quantile bounds: the estimates at q - / + this
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Source table -> metric -> (sketch kind, column)
+SKETCHES = {
+    "Visits": {"visitors": ("hll", "member_id"), "visit_duration": ("tdigest", "duration")},
+    "Sales": {"buyers": ("hll", "customer_id"), "sale_price": ("tdigest", "price")},
+}
+
+
+# ---------- HyperLogLog ----------
+
+def hash64(values):
+    # splitmix64 finalizer over int64 ids; uint64 arithmetic wraps
+    with np.errstate(over="ignore"):
+        z = np.asarray(values, dtype=np.int64).astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def _leading_zeros(x):
+    n = np.zeros(x.shape, dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        small = x < (np.uint64(1) << np.uint64(64 - shift))
+        n[small] += shift
+        x = np.where(small, x << np.uint64(shift), x)
+    return n + (x == 0)
+
+
+def hll_registers(values, groups=None, n_groups=1):
+    # One register array per group (e.g. per day): shape (n_groups, m)
+    h = hash64(values)
+    index = (h >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+    rank = np.minimum(_leading_zeros(h << np.uint64(HLL_PRECISION)) + 1, 64 - HLL_PRECISION + 1).astype(np.uint8)
+    registers = np.zeros((n_groups, HLL_REGISTERS), dtype=np.uint8)
+    np.maximum.at(registers, (np.zeros(len(h), dtype=np.int64) if groups is None else groups, index), rank)
+    return registers
+
+
+def hll_estimate(registers):
+    m = registers.size
+    raw = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * m and zeros:
+        return m * np.log(m / zeros)  # linear counting for small sets
+    return raw
+
+
+def hll_merge(blobs):
+    if not blobs:
+        return np.zeros(HLL_REGISTERS, dtype=np.uint8)
+    return np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(-1, HLL_REGISTERS).max(axis=0)
+
+
+# ---------- t-digest ----------
+
+class TDigest:
+    # Centroids (mean, weight) plus the exact min, max and sum
+    def __init__(self, means=(), weights=(), low=np.inf, high=-np.inf, total=0.0, compression=TDIGEST_COMPRESSION):
+        self.means = np.asarray(means, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.low, self.high, self.total = float(low), float(high), float(total)
+        self.compression = compression
+
+    @classmethod
+    def from_values(cls, values, compression=TDIGEST_COMPRESSION):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return cls(compression=compression)
+        means, counts = np.unique(values, return_counts=True)
+        return cls(means, counts, means[0], means[-1], values.sum(), compression).compress()
+
+    @classmethod
+    def merge(cls, digests, compression=TDIGEST_COMPRESSION):
+        digests = [d for d in digests if len(d.means)]
+        if not digests:
+            return cls(compression=compression)
+        return cls(np.concatenate([d.means for d in digests]), np.concatenate([d.weights for d in digests]),
+                   min(d.low for d in digests), max(d.high for d in digests),
+                   sum(d.total for d in digests), compression).compress()
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def compress(self):
+        # Neighbouring centroids whose midpoints share a k1 bucket become one;
+        # buckets are narrow near q = 0 and 1, so the tails stay precise
+        order = np.argsort(self.means, kind="stable")
+        means, weights = self.means[order], self.weights[order]
+        q = (np.cumsum(weights) - weights / 2) / weights.sum()
+        k = np.floor(self.compression * (np.arcsin(2 * q - 1) / np.pi + 0.5))
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(weights * means, starts) / self.weights
+        return self
+
+    def quantile(self, q):
+        if not len(self.means):
+            return np.nan
+        mid = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        return float(np.interp(q, np.r_[0.0, mid, 1.0], np.r_[self.low, self.means, self.high]))
+
+    def to_bytes(self):
+        header = np.array([self.compression, self.low, self.high, self.total], dtype=np.float64)
+        return header.tobytes() + np.stack([self.means, self.weights]).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        values = np.frombuffer(bytes(data), dtype=np.float64)
+        compression, low, high, total = values[:4]
+        means, weights = values[4:].reshape(2, -1)
+        return cls(means, weights, low, high, total, int(compression))
+
+
+# ---------- building the per-day sketches ----------
+
+def sketch_rows(table, df):
+    # One row per day and metric of table, for the given source rows
+    columns = ["sketch_date", "metric", "sketch"]
+    if not len(df):
+        return pd.DataFrame(columns=columns)
+    codes, days = pd.factorize(pd.to_datetime(df["date"]).dt.normalize(), sort=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(1, len(days)))
+    rows = []
+    for metric, (kind, column) in SKETCHES[table].items():
+        values = pd.to_numeric(df[column], errors="coerce")
+        if kind == "hll":
+            known = values.notna().to_numpy()
+            registers = hll_registers(values[known].astype(np.int64), codes[known], len(days))
+            sketches = [bytes(r) for r in registers]
+        else:
+            per_day = np.split(values.fillna(0).to_numpy(dtype=np.float64)[order], bounds)
+            sketches = [TDigest.from_values(v).to_bytes() for v in per_day]
+        rows.append(pd.DataFrame({"sketch_date": days.values, "metric": metric, "sketch": sketches}))
+    return pd.concat(rows, ignore_index=True)[columns]
+
+
+def rebuild_sketches(conn, batch_size=DEFAULT_BATCH_SIZE, suffix=""):
+    # Every day's sketches from the base tables already in the database
+    create_tables(conn, [SKETCH_TABLE], if_not_exists=True, suffix=suffix)
+    cursor = conn.cursor()
+    cursor.execute(f"DELETE FROM {SKETCH_TABLE}{suffix}")
+    conn.commit()
+    cursor.close()
+    rows = 0
+    for table, metrics in SKETCHES.items():
+        columns = sorted({"date"} | {column for _, column in metrics.values()})
+        source = query_frame(conn, f"SELECT {', '.join(columns)} FROM {table}{suffix}")
+        rows += insert_dataframe(conn, SKETCH_TABLE, sketch_rows(table, source), batch_size, suffix=suffix)
+    print(f"Rebuilt {SKETCH_TABLE} ({rows} rows)")
+    if not suffix:
+        bump_table_versions(conn, [SKETCH_TABLE])
+    return rows
+
+
+def _day_key(values):
+    return pd.to_datetime(pd.Series(values)).dt.strftime("%Y-%m-%d").tolist()
+
+
+def merged_sketch_rows(conn, table, df):
+    # Sketches of new source rows merged into the stored ones for the same
+    # days, ready to upsert (incremental_loader)
+    new = sketch_rows(table, df)
+    if not len(new):
+        return new
+    days = _day_key(new["sketch_date"])
+    metrics = ", ".join(f"'{metric}'" for metric in SKETCHES[table])
+    stored = query_frame(conn, f"""
+SELECT sketch_date, metric, sketch FROM {SKETCH_TABLE}
+WHERE sketch_date >= '{min(days)}' AND sketch_date <= '{max(days)}' AND metric IN ({metrics})""")
+    stored = dict(zip(zip(_day_key(stored["sketch_date"]), stored["metric"]), stored["sketch"]))
+    merged = []
+    for day, metric, sketch in zip(days, new["metric"], new["sketch"]):
+        old = stored.get((day, metric))
+        if old is not None:
+            if SKETCHES[table][metric][0] == "hll":
+                sketch = bytes(hll_merge([bytes(old), sketch]))
+            else:
+                sketch = TDigest.merge([TDigest.from_bytes(old), TDigest.from_bytes(sketch)]).to_bytes()
+        merged.append(sketch)
+    return new.assign(sketch=merged)
+
+
+# ---------- approximate answers ----------
+
+def date_range(column, start=None, end=None):
+    # Sargable [start, end) filter on column
+    clauses = ([f"{column} >= '{start}'"] if start else []) + ([f"{column} < '{end}'"] if end else [])
+    return " AND ".join(clauses) or "1 = 1"
+
+
+def read_sketches(conn, start=None, end=None):
+    df = query_frame(conn, f"SELECT metric, sketch FROM {SKETCH_TABLE} WHERE {date_range('sketch_date', start, end)}")
+    sketches = {metric: [] for metrics in SKETCHES.values() for metric in metrics}
+    for metric, sketch in zip(df["metric"], df["sketch"]):
+        sketches[metric].append(bytes(sketch))
+    return sketches
+
+
+def approximate_kpis(conn, start=None, end=None, quantiles=QUANTILES):
+    # [{kpi, estimate, low, high}] for days in [start, end)
+    sketches = read_sketches(conn, start, end)
+    kpis = []
+
+    def add(kpi, estimate, low, high):
+        kpis.append({"kpi": kpi, "estimate": float(estimate), "low": float(low), "high": float(high)})
+
+    visitors, buyers = hll_merge(sketches["visitors"]), hll_merge(sketches["buyers"])
+    counts = {"visitors": hll_estimate(visitors), "buyers": hll_estimate(buyers),
+              "either": hll_estimate(np.maximum(visitors, buyers))}
+    for kpi, name in (("distinct_visitors", "visitors"), ("distinct_buyers", "buyers")):
+        add(kpi, counts[name], counts[name] * (1 - 3 * HLL_ERROR), counts[name] * (1 + 3 * HLL_ERROR))
+    # Buyer ids with no visit under the same id (buyers_who_never_visited):
+    # |buyers or visitors| - |visitors|, so both errors add up
+    never = max(counts["either"] - counts["visitors"], 0.0)
+    spread = 3 * HLL_ERROR * (counts["either"] + counts["visitors"])
+    add("buyers_never_visited", never, max(never - spread, 0.0), never + spread)
+
+    for metric in ("visit_duration", "sale_price"):
+        digest = TDigest.merge([TDigest.from_bytes(s) for s in sketches[metric]])
+        mean = digest.total / digest.count if digest.count else np.nan
+        add(f"{metric}_mean", mean, mean, mean)  # exact: count and sum are kept
+        for q in quantiles:
+            add(f"{metric}_p{round(q * 100)}", digest.quantile(q),
+                digest.quantile(max(q - RANK_ERROR, 0.0)), digest.quantile(min(q + RANK_ERROR, 1.0)))
+    return kpis
+
+
+# ---------- accuracy check ----------
+
+def exact_kpis(conn, start=None, end=None, quantiles=QUANTILES):
+    # ({kpi: exact answer}, {metric: sorted values}) from the base tables
+    where = date_range("date", start, end)
+    exact = {
+        "distinct_visitors": query_frame(conn, f"SELECT COUNT(DISTINCT member_id) AS n FROM Visits WHERE {where}"),
+        "distinct_buyers": query_frame(conn, f"SELECT COUNT(DISTINCT customer_id) AS n FROM Sales WHERE {where}"),
+        "buyers_never_visited": query_frame(conn, f"""
+SELECT COUNT(DISTINCT s.customer_id) AS n FROM Sales s
+WHERE {date_range("s.date", start, end)}
+  AND NOT EXISTS (SELECT 1 FROM Visits v WHERE v.member_id = s.customer_id AND {date_range("v.date", start, end)})"""),
+    }
+    exact = {kpi: float(df["n"].iloc[0]) for kpi, df in exact.items()}
+    values = {}
+    for metric, table, column in (("visit_duration", "Visits", "duration"), ("sale_price", "Sales", "price")):
+        values[metric] = np.sort(pd.to_numeric(
+            query_frame(conn, f"SELECT {column} FROM {table} WHERE {where}")[column]).fillna(0).to_numpy(np.float64))
+        exact[f"{metric}_mean"] = float(values[metric].mean()) if len(values[metric]) else np.nan
+        for q in quantiles:
+            exact[f"{metric}_p{round(q * 100)}"] = float(np.quantile(values[metric], q)) if len(values[metric]) else np.nan
+    return exact, values
+
+
+def print_kpis(rows):
+    print(f"{'kpi':<24} {'estimate':>12} {'low':>12} {'high':>12}")
+    for row in rows:
+        print(f"{row['kpi']:<24} {row['estimate']:>12,.2f} {row['low']:>12,.2f} {row['high']:>12,.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Approximate KPIs from the per-day sketches.")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--database", default=None, help="database file for the sqlite/duckdb backends")
+    parser.add_argument("--since", default=None, metavar="YYYY-MM-DD", help="first day to include")
+    parser.add_argument("--until", default=None, metavar="YYYY-MM-DD", help="first day to leave out")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the sketches from Visits / Sales first")
+    args = parser.parse_args()
+
+    conn = connect_with_retry(args.backend, args.database)
+    if args.rebuild:
+        rebuild_sketches(conn)
+    started = time.perf_counter()
+    rows = approximate_kpis(conn, args.since, args.until)
+    print(f"{len(rows)} KPIs in {(time.perf_counter() - started) * 1000:.1f} ms")
+    print_kpis(rows)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
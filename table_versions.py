@@ -0,0 +1,43 @@
+import uuid
+from db import query_frame
+from schema import create_tables
+
+# -------------------------------------------------------
+# Table versions
+#   - Every time a loader changes a table it stamps it with a fresh token
+#   - Readers (the query cache) compare tokens to know when results are stale
+#   - Tokens are random, so they never repeat even if this table is rebuilt
+# -------------------------------------------------------
+
+
+def write_table_versions(cursor, tables):
+    # New tokens inside the caller's transaction, e.g. the one that swaps
+    # tables in, so the old tokens stop validating at the same commit
+    for table in tables:
+        token = uuid.uuid4().hex
+        cursor.execute("DELETE FROM Table_Versions WHERE table_name = ?", (table,))
+        cursor.execute("INSERT INTO Table_Versions (table_name, version) VALUES (?, ?)", (table, token))
+
+
+def create_table_versions(conn):
+    # Once per process (loader start, runner start); reads assume the table
+    create_tables(conn, ["Table_Versions"], if_not_exists=True)
+
+
+def bump_table_versions(conn, tables):
+    if not tables:
+        return
+    create_table_versions(conn)
+    cursor = conn.cursor()
+    write_table_versions(cursor, tables)
+    conn.commit()
+    cursor.close()
+
+
+def read_table_versions(conn, tables=None):
+    # A plain SELECT: cache lookups stay read-only
+    df = query_frame(conn, "SELECT table_name, version FROM Table_Versions")
+    versions = dict(zip(df["table_name"], df["version"]))
+    if tables is None:
+        return versions
+    return {table: versions.get(table) for table in tables}
@@ -1,54 +1,34 @@
-import pyodbc
-
-# Database connection parameters
-# server = '192.168.1.226'  # Your SQL Server instance
-# database = 'test_db'        # Target database
-# username = 'climbing_user'  # Created SQL user
-# password = 'hoosierheights' # Assigned password
-# driver = '{ODBC Driver 18 for SQL Server}'  # Ensure this driver is installed
-
-server = '127.0.0.1'         # Or your Docker container's IP
-port = '1433'
-database = 'test_db'
-username = 'climbing_user'
-password = 'hoosierheights'
-# username = 'sa'
-# password = 'H00S13Rheights'
-driver = '/opt/homebrew/lib/libtdsodbc.so'  # FreeTDS .so driver
-
-# Construct the connection string
-# conn_str = f'''
-#     DRIVER={driver};
-#     SERVER={server};
-#     DATABASE={database};
-#     UID={username};
-#     PWD={password};
-#     TrustServerCertificate=yes;
-#     Encrypt=yes;
-# '''
-
-conn_str = (
-    f"DRIVER={driver};"
-    f"SERVER={server};"
-    f"PORT={port};"
-    f"DATABASE={database};"
-    f"UID={username};"
-    f"PWD={password};"
-    f"TDS_Version=7.4;"
-)
-
-try:
-    # Establish the connection
-    conn = pyodbc.connect(conn_str)
-    cursor = conn.cursor()
-
-    # Test the connection by retrieving the current user
-    cursor.execute("SELECT USER_NAME();")
-    row = cursor.fetchone()
-    print(f"Connected successfully! Logged in as: {row[0]}")
-
-    # Close the connection
-    cursor.close()
-    conn.close()
-except Exception as e:
-    print(f"Error: {e}")
+import argparse
+from db import BACKENDS, DEFAULT_BACKEND, DEFAULT_LOCAL_DATABASE, SQLSERVER_SETTINGS, connect_with_retry
+
+# Connection settings live in db.py. Override them with environment variables
+# instead of editing code:
+#   CLIMBING_DB_SERVER, CLIMBING_DB_PORT, CLIMBING_DB_NAME, CLIMBING_DB_USER,
+#   CLIMBING_DB_PASSWORD, CLIMBING_DB_DRIVER (FreeTDS .so driver path)
+#   CLIMBING_DB_BACKEND=sqlite|duckdb with CLIMBING_DB_PATH for a local file
+
+parser = argparse.ArgumentParser(description="Check that the database is reachable.")
+parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+parser.add_argument("--database", default=None)
+args = parser.parse_args()
+
+try:
+    # Establish the connection (retried with backoff)
+    conn = connect_with_retry(args.backend, args.database)
+    cursor = conn.cursor()
+
+    # Test the connection by retrieving the current user
+    if args.backend == "sqlserver":
+        cursor.execute("SELECT USER_NAME();")
+        row = cursor.fetchone()
+        print(f"Connected successfully to {SQLSERVER_SETTINGS['SERVER']}! Logged in as: {row[0]}")
+    else:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        print(f"Connected successfully to {args.database or DEFAULT_LOCAL_DATABASE[args.backend]} ({args.backend})")
+
+    # Close the connection
+    cursor.close()
+    conn.close()
+except Exception as e:
+    print(f"Error: {e}")
@@ -0,0 +1,12 @@
+import pytest
+import data_generation_2 as gen
+
+SEED = 42
+
+
+@pytest.fixture(scope="session")
+def dataset_dir(tmp_path_factory):
+    # One seeded SF1 dataset (vectorized visits, Parquet) shared by the suite
+    directory = tmp_path_factory.mktemp("dataset")
+    gen.generate(seed=SEED, fmt="parquet", vectorized=True, directory=str(directory))
+    return directory
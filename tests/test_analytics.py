@@ -0,0 +1,26 @@
+import pytest
+from analytics import QUERIES, AnalyticsEngine, frames_match, is_ordered, sqlite_results
+
+# -------------------------------------------------------
+# Every pandas twin against its catalog query run on SQLite
+#   - Same seeded dataset loaded into both engines
+#   - ORDER BY queries are compared row by row, so tie order and the rows
+#     a LIMIT keeps must agree too
+# -------------------------------------------------------
+
+
+@pytest.fixture(scope="module")
+def engine(dataset_dir):
+    return AnalyticsEngine(fmt="parquet", directory=str(dataset_dir))
+
+
+@pytest.fixture(scope="module")
+def expected(engine):
+    return sqlite_results(engine)
+
+
+@pytest.mark.parametrize("name", sorted(QUERIES))
+def test_twin_matches_catalog_query(name, engine, expected):
+    sql, frame = expected[name]
+    assert len(frame) > 0
+    assert frames_match(frame, engine.run(name), ordered=is_ordered(sql))
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bulk_loader import load_table_files
+from db import connect_with_retry, query_frame
+from schema import create_indexes, create_tables
+from sketches import HLL_ERROR, RANK_ERROR, approximate_kpis, exact_kpis, rebuild_sketches
+
+# -------------------------------------------------------
+# Sketch estimates against the exact SQL answers
+#   - Same seeded dataset, loaded into SQLite with the rowstore indexes and
+#     its Daily_Sketches
+#   - Over all days and over the last 30 days only, so merging a subset of
+#     the days is covered too
+#   - Distinct counts within 3 HLL standard errors of the exact count;
+#     each percentile's rank among the exact values within RANK_ERROR of q
+# -------------------------------------------------------
+
+WINDOWS = ["all", "last_30_days"]
+
+
+@pytest.fixture(scope="module")
+def conn(dataset_dir):
+    conn = connect_with_retry("sqlite", ":memory:")
+    create_tables(conn)
+    load_table_files(conn, fmt="parquet", directory=str(dataset_dir))
+    create_indexes(conn, "rowstore")
+    rebuild_sketches(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope="module", params=WINDOWS)
+def kpis(request, conn):
+    start = end = None
+    if request.param == "last_30_days":
+        last = pd.Timestamp(query_frame(conn, "SELECT MAX(date) AS last FROM Visits")["last"].iloc[0])
+        start, end = f"{last - pd.Timedelta(days=29):%Y-%m-%d}", f"{last + pd.Timedelta(days=1):%Y-%m-%d}"
+    exact, values = exact_kpis(conn, start, end)
+    return {kpi["kpi"]: kpi for kpi in approximate_kpis(conn, start, end)}, exact, values
+
+
+@pytest.mark.parametrize("name", ["distinct_visitors", "distinct_buyers"])
+def test_distinct_count_within_three_standard_errors(name, kpis):
+    approx, exact, _ = kpis
+    assert exact[name] > 0
+    assert abs(approx[name]["estimate"] - exact[name]) <= 3 * HLL_ERROR * exact[name]
+    assert approx[name]["low"] <= exact[name] <= approx[name]["high"]
+
+
+def test_buyers_never_visited_within_bounds(kpis):
+    approx, exact, _ = kpis
+    kpi = approx["buyers_never_visited"]
+    assert kpi["low"] <= exact["buyers_never_visited"] <= kpi["high"]
+
+
+@pytest.mark.parametrize("metric", ["visit_duration", "sale_price"])
+def test_quantiles_within_rank_error(metric, kpis):
+    approx, exact, values = kpis
+    sample = values[metric]
+    assert len(sample) > 0
+    assert np.isclose(approx[f"{metric}_mean"]["estimate"], exact[f"{metric}_mean"], rtol=1e-9)
+    for name, kpi in approx.items():
+        if not name.startswith(f"{metric}_p"):
+            continue
+        q = int(name.rpartition("_p")[2]) / 100
+        estimate = kpi["estimate"]
+        rank = (np.searchsorted(sample, estimate, "left") + np.searchsorted(sample, estimate, "right")) / 2
+        assert abs(rank / len(sample) - q) <= RANK_ERROR, name
+        assert kpi["low"] <= estimate <= kpi["high"], name
@@ -1,21 +1,15 @@
-import pyodbc
+import argparse
+from db import BACKENDS, DEFAULT_BACKEND, connect
+from schema import TABLES, drop_tables
 
-conn = pyodbc.connect(
-    "DRIVER=/opt/homebrew/lib/libtdsodbc.so;"
-    "SERVER=127.0.0.1;"  # or your IP like '192.168.1.xxx'
-    "PORT=1433;"
-    "DATABASE=test_db;"
-    "UID=climbing_user;"
-    "PWD=hoosierheights;"
-    "TDS_Version=7.4;"
-)
-cursor = conn.cursor()
+parser = argparse.ArgumentParser(description="Drop the gym tables.")
+parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+parser.add_argument("--database", default=None)
+args = parser.parse_args()
 
-cursor.execute("""
-DROP TABLE Sales;
-DROP TABLE Day_Passes;
-DROP TABLE Visits;
-DROP TABLE Members;
-DROP TABLE Customers;
-""")
-conn.commit()
\ No newline at end of file
+conn = connect(args.backend, args.database)
+
+# Children first, after dropping the foreign keys on SQL Server
+drop_tables(conn, TABLES)
+conn.close()
+print(f"Dropped {', '.join(TABLES)}.")
@@ -0,0 +1,122 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from schema import DATE_COLUMNS, FOREIGN_KEY_COLUMNS, PRIMARY_KEYS, TABLE_DEPENDENCIES, TABLES
+
+# -------------------------------------------------------
+# Pre-load validation of whole tables
+#   - Runs on the DataFrames before anything is inserted, so a bad row fails
+#     the load up front instead of deep into it
+#   - Primary keys: present and unique
+#   - Foreign keys: every child key is in the parent's key set (np.isin over
+#     whole columns), including Sales.member_id, which has no declared FK;
+#     0 / blank there is the generators' "not a member" value
+#   - Nulls and value ranges on age, duration, price, flags
+#   - With a clean report the loaders can insert with FK checks off and
+#     re-check every constraint once at the end (schema.enable_foreign_keys)
+# -------------------------------------------------------
+
+Problem = namedtuple("Problem", "table check column count sample")
+
+# (table, column) -> inclusive (low, high)
+RANGES = {
+    ("Customers", "age"): (0, 120),
+    ("Members", "age"): (0, 120),
+    ("Members", "is_active"): (0, 1),
+    ("Visits", "duration"): (1, 24 * 60),
+    ("Day_Pass_Guests", "guest_number"): (1, 100),
+    ("Day_Pass_Guests", "age"): (0, 120),
+    ("Sales", "price"): (0, 10_000),
+}
+
+# Child column -> (parent table, parent column) for every foreign key
+FOREIGN_KEYS = {
+    ("Members", "customer_id"): ("Customers", "customer_id"),
+    ("Visits", "member_id"): ("Members", "member_id"),
+    ("Day_Passes", "purchaser_id"): ("Customers", "customer_id"),
+    ("Day_Pass_Guests", "day_pass_id"): ("Day_Passes", "day_pass_id"),
+    ("Sales", "customer_id"): ("Customers", "customer_id"),
+}
+
+# Optional references: null or this value means "none"
+SOFT_FOREIGN_KEYS = {
+    ("Sales", "member_id"): (("Members", "member_id"), 0),
+}
+
+SAMPLE_SIZE = 5
+
+
+def _problem(table, check, column, mask, values):
+    count = int(mask.sum())
+    if not count:
+        return None
+    return Problem(table, check, column, count, values[mask].head(SAMPLE_SIZE).tolist())
+
+
+def _numbers(values):
+    # Numeric view of a column as read from any file format; unparseable
+    # values become NaN
+    return pd.to_numeric(values, errors="coerce")
+
+
+def check_table(table, df):
+    problems = []
+    key = PRIMARY_KEYS[table]
+    keys = df[key]
+    problems.append(_problem(table, "primary key is null", key, keys.isna(), keys))
+    problems.append(_problem(table, "duplicate primary key", key, keys.duplicated(keep="first") & keys.notna(), keys))
+
+    required = FOREIGN_KEY_COLUMNS[table] + ([DATE_COLUMNS[table]] if DATE_COLUMNS[table] else [])
+    for column in required:
+        problems.append(_problem(table, "null", column, df[column].isna(), df[column]))
+
+    for (range_table, column), (low, high) in RANGES.items():
+        if range_table != table or column not in df.columns:
+            continue
+        values = _numbers(df[column])
+        problems.append(_problem(table, "not a number", column, values.isna() & df[column].notna(), df[column]))
+        if column == "price":
+            problems.append(_problem(table, "null", column, df[column].isna(), df[column]))
+        problems.append(_problem(table, f"outside {low}..{high}", column, (values < low) | (values > high), values))
+    return [p for p in problems if p is not None]
+
+
+def check_references(frames):
+    problems = []
+    for (table, column), (parent, parent_column) in FOREIGN_KEYS.items():
+        if table not in frames or parent not in frames:
+            continue
+        values = frames[table][column]
+        present = values.notna()
+        missing = present & ~np.isin(values, frames[parent][parent_column].dropna().to_numpy())
+        problems.append(_problem(table, f"not in {parent}.{parent_column}", column, missing, values))
+    for (table, column), ((parent, parent_column), none_value) in SOFT_FOREIGN_KEYS.items():
+        if table not in frames or parent not in frames:
+            continue
+        values = _numbers(frames[table][column])
+        referenced = values.notna() & (values != none_value)
+        missing = referenced & ~np.isin(values, frames[parent][parent_column].dropna().to_numpy())
+        problems.append(_problem(table, f"not in {parent}.{parent_column}", column, missing, values))
+    return [p for p in problems if p is not None]
+
+
+def validate_frames(frames):
+    # frames: {table: DataFrame} as read from the data files, before
+    # prepare_table() coerces anything. Returns a list of Problems.
+    problems = []
+    for table in TABLES:
+        if table in frames:
+            problems += check_table(table, frames[table])
+    missing_parents = {parent for table in frames for parent in TABLE_DEPENDENCIES[table] if parent not in frames}
+    if missing_parents:
+        print(f"⚠️ Foreign keys into {', '.join(sorted(missing_parents))} not checked: table not loaded")
+    return problems + check_references(frames)
+
+
+def print_problems(problems):
+    if not problems:
+        print("✅ Validation passed.")
+        return
+    print(f"❌ Validation found {len(problems)} problem(s):")
+    for p in problems:
+        print(f"    {p.table}.{p.column}: {p.count:,} row(s) {p.check}, e.g. {p.sample}")